@@ -0,0 +1,335 @@
+#!/usr/bin/env python3
+"""
+Master-List Extractor Benchmark
+Runs every create_master_excel generation over the same fixture corpus and scores speed, memory and accuracy.
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from multiprocessing import get_context
+from pathlib import Path
+
+import pandas as pd
+
+from generate_payment_workbooks import default_options, generate_corpus
+from source_manifest import load_manifest, resolve_sources
+
+
+# name -> (module, input kind). v1/v2 read the per-sheet CSV exports, v3 reads the xlsx directly
+EXTRACTORS = {
+    'v1': ('create_master_excel', 'csv'),
+    'v2': ('create_master_excel_v2', 'csv'),
+    'v3_complete': ('create_master_excel_v3_complete', 'xlsx'),
+    'v3_fixed': ('create_master_excel_v3_fixed', 'xlsx'),
+    'v3_validated': ('create_master_excel_v3_validated', 'xlsx'),
+}
+
+# Fields scored on matched records
+SCORED_FIELDS = ['full_name', 'bank_name', 'account_number', 'days_worked', 'total_payment']
+MONEY_TOLERANCE = 0.01
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MB (ru_maxrss is KB on Linux, bytes on macOS)."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == 'darwin':
+        return peak / (1024 * 1024)
+    return peak / 1024
+
+
+def export_csv(sources, csv_dir):
+    """
+    Export every sheet to CSV the way excel_to_csv_converter.py does (v1/v2 input).
+
+    Returns: list of (csv_path, source_file, source_sheet)
+    """
+    csv_dir = Path(csv_dir)
+    csv_dir.mkdir(parents=True, exist_ok=True)
+
+    exported = []
+    for source in sources:
+        path = Path(source['path'])
+        sheets = pd.read_excel(path, sheet_name=None)
+        for sheet_name, df in sheets.items():
+            safe_sheet = ''.join('_' if ch in '<>:"/\\|?*' else ch for ch in sheet_name).strip()
+            csv_path = csv_dir / f"{path.stem}_{safe_sheet}.csv"
+            if not csv_path.exists():
+                df.to_csv(csv_path, index=False, encoding='utf-8')
+            exported.append((str(csv_path), path.name, sheet_name))
+    return exported
+
+
+def run_extractor(name, sources, csv_files, quiet=True):
+    """
+    Run one extractor over the corpus (called in a fresh child process).
+
+    Returns: dict with records, seconds, sheets and memory figures
+    """
+    module_name, kind = EXTRACTORS[name]
+    module = __import__(module_name)
+    rss_before = peak_rss_mb()
+
+    records = []
+    output = io.StringIO() if quiet else sys.stdout
+    start = time.perf_counter()
+
+    with contextlib.redirect_stdout(output):
+        if kind == 'csv':
+            for csv_path, source_file, source_sheet in csv_files:
+                for record in module.process_csv_file(csv_path):
+                    # v1/v2 only know the CSV name - tag records with the sheet they came from
+                    record.setdefault('source_file', source_file)
+                    record.setdefault('source_sheet', source_sheet)
+                    records.append(record)
+            sheets = len(csv_files)
+        else:
+            sheets = 0
+            for source in sources:
+                if name == 'v3_fixed':
+                    # Columnar (DataFrame) - kept as is until the memory reading below
+                    result = [module.process_excel_fixed(source['path'], source['month'])]
+                elif name == 'v3_validated':
+                    result, _ = module.process_excel_file_with_validation(source['path'])
+                else:
+                    result = module.process_excel_complete(source['path'])
+                records.extend(result)
+                sheets += len(pd.ExcelFile(source['path']).sheet_names)
+
+    seconds = time.perf_counter() - start
+    rss_peak = peak_rss_mb()
+
+    if records and hasattr(records[0], 'columns'):
+        records = [record for df in records for record in module.frame_records(df)]
+
+    return {
+        'records': records,
+        'seconds': seconds,
+        'sheets': sheets,
+        'rss_import_mb': rss_before,
+        'rss_peak_mb': rss_peak
+    }
+
+
+def run_isolated(name, sources, csv_files, quiet=True):
+    """Run an extractor in its own spawned process so peak RSS is not shared between runs."""
+    with ProcessPoolExecutor(max_workers=1, mp_context=get_context('spawn')) as pool:
+        return pool.submit(run_extractor, name, sources, csv_files, quiet).result()
+
+
+def _number(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def fields_match(field, expected, actual):
+    """Compare one field: names case-insensitively, numbers within a tolerance, the rest as text."""
+    if expected in (None, '') and actual in (None, ''):
+        return True
+
+    if field in ('days_worked', 'total_payment'):
+        exp_num, act_num = _number(expected), _number(actual)
+        return exp_num is not None and act_num is not None and abs(exp_num - act_num) <= MONEY_TOLERANCE
+
+    if field == 'full_name':
+        return ' '.join(str(expected).split()).lower() == ' '.join(str(actual or '').split()).lower()
+
+    return str(expected).strip() == str(actual or '').strip()
+
+
+def score_records(expected, actual):
+    """
+    Score extracted records against the golden file.
+
+    Records are paired on (source_file, source_sheet, ic_number); a promoter
+    listed twice on one sheet is paired in order of appearance.
+    """
+    expected_by_key = defaultdict(list)
+    for record in expected:
+        expected_by_key[(record['source_file'], record['source_sheet'], record['ic_number'])].append(record)
+
+    actual_by_key = defaultdict(list)
+    for record in actual:
+        ic = str(record.get('ic_number') or '').strip()
+        actual_by_key[(record.get('source_file'), record.get('source_sheet'), ic)].append(record)
+
+    matched = 0
+    field_hits = {field: 0 for field in SCORED_FIELDS}
+    for key, exp_records in expected_by_key.items():
+        for exp, act in zip(exp_records, actual_by_key.get(key, [])):
+            matched += 1
+            for field in SCORED_FIELDS:
+                if fields_match(field, exp.get(field), act.get(field)):
+                    field_hits[field] += 1
+
+    return {
+        'expected': len(expected),
+        'extracted': len(actual),
+        'matched': matched,
+        'recall': round(matched / len(expected), 4) if expected else 0.0,
+        'precision': round(matched / len(actual), 4) if actual else 0.0,
+        'field_accuracy': {
+            field: round(hits / matched, 4) if matched else 0.0
+            for field, hits in field_hits.items()
+        }
+    }
+
+
+def git_revision():
+    """Current commit, so results can be lined up against history."""
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=Path(__file__).resolve().parent).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def load_expected(corpus_dir):
+    """Read expected_records.jsonl."""
+    with open(Path(corpus_dir) / 'expected_records.jsonl', 'r', encoding='utf-8') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def print_results(results, previous=None):
+    """Print the comparison table (with deltas against a previous run if given)."""
+    print(f"\n{'Extractor':<14} {'Wall (s)':>9} {'Peak RSS':>10} {'Sheets/s':>9} {'Records/s':>10} "
+          f"{'Recall':>7} {'Precision':>9} {'Name':>6} {'Account':>8} {'Payment':>8}")
+    print("-"*120)
+
+    for name, result in results.items():
+        if 'error' in result:
+            print(f"{name:<14} ✗ {result['error']}")
+            continue
+        acc = result['accuracy']
+        fields = acc['field_accuracy']
+        print(f"{name:<14} {result['seconds']:>9.2f} {result['rss_peak_mb']:>8.0f}MB "
+              f"{result['sheets_per_second']:>9.1f} {result['records_per_second']:>10.0f} "
+              f"{acc['recall']:>7.1%} {acc['precision']:>9.1%} {fields['full_name']:>6.0%} "
+              f"{fields['account_number']:>8.0%} {fields['total_payment']:>8.0%}")
+
+        old = (previous or {}).get(name)
+        if old and 'error' not in old:
+            speed = (result['records_per_second'] / old['records_per_second'] - 1) if old['records_per_second'] else 0
+            recall = acc['recall'] - old['accuracy']['recall']
+            print(f"{'':<14} vs {previous_label(old)}: records/s {speed:+.1%}, recall {recall:+.1%}, "
+                  f"peak RSS {result['rss_peak_mb'] - old['rss_peak_mb']:+.0f}MB")
+
+
+def previous_label(result):
+    return result.get('revision') or 'previous'
+
+
+def main():
+    """Main CLI entry point."""
+    parser = argparse.ArgumentParser(
+        description='Benchmark the master-list extractors on a fixture corpus.',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  # Generate the default corpus (if missing) and benchmark every extractor
+  python3 scripts/benchmark_extractors.py
+
+  # Only the v3 generations, compared with an earlier run
+  python3 scripts/benchmark_extractors.py --extractors v3_fixed v3_validated --compare old.json
+        """
+    )
+    parser.add_argument('corpus', nargs='?', default='benchmark_fixtures/small',
+                        help='Fixture corpus from generate_payment_workbooks.py (generated if missing)')
+    parser.add_argument('--extractors', nargs='+', choices=list(EXTRACTORS), default=list(EXTRACTORS))
+    parser.add_argument('--repeat', type=int, default=1, help='Runs per extractor (best wall time is kept)')
+    parser.add_argument('--output', help='Results JSON (default: <corpus>/results/extractors_<timestamp>.json)')
+    parser.add_argument('--compare', help='Previous results JSON to compare against')
+    parser.add_argument('--verbose', action='store_true', help='Show extractor output')
+    args = parser.parse_args()
+
+    print("="*120)
+    print(" "*40 + "MASTER-LIST EXTRACTOR BENCHMARK")
+    print("="*120)
+
+    corpus = Path(args.corpus)
+    if not (corpus / 'expected_records.jsonl').exists():
+        print(f"\n📦 Generating fixture corpus: {corpus}")
+        generate_corpus(corpus, default_options())
+
+    sources = resolve_sources(load_manifest(corpus / 'payment_sources.json'))
+    expected = load_expected(corpus)
+    print(f"\n📂 Corpus: {corpus} ({len(sources)} workbook(s), {len(expected):,} expected record(s))")
+
+    csv_files = []
+    if any(EXTRACTORS[name][1] == 'csv' for name in args.extractors):
+        start = time.perf_counter()
+        csv_files = export_csv(sources, corpus / 'csv')
+        print(f"   CSV export for v1/v2: {len(csv_files)} sheet(s) in {time.perf_counter() - start:.1f}s (not timed)")
+
+    revision = git_revision()
+    results = {}
+
+    for name in args.extractors:
+        print(f"\n⏱️  {name} ({EXTRACTORS[name][0]}.py)...")
+        best = None
+        try:
+            for _ in range(max(1, args.repeat)):
+                run = run_isolated(name, sources, csv_files, quiet=not args.verbose)
+                print(f"   {run['seconds']:.2f}s, {len(run['records']):,} record(s), peak RSS {run['rss_peak_mb']:.0f}MB")
+                if best is None or run['seconds'] < best['seconds']:
+                    best = run
+        except Exception as e:
+            print(f"   ✗ Failed: {e}")
+            results[name] = {'error': str(e)}
+            continue
+
+        seconds = best['seconds'] or 1e-9
+        results[name] = {
+            'module': EXTRACTORS[name][0],
+            'input': EXTRACTORS[name][1],
+            'revision': revision,
+            'seconds': round(best['seconds'], 3),
+            'sheets': best['sheets'],
+            'records': len(best['records']),
+            'sheets_per_second': round(best['sheets'] / seconds, 2),
+            'records_per_second': round(len(best['records']) / seconds, 1),
+            'rss_import_mb': round(best['rss_import_mb'], 1),
+            'rss_peak_mb': round(best['rss_peak_mb'], 1),
+            'accuracy': score_records(expected, best['records'])
+        }
+
+    previous = None
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            previous = json.load(f).get('results')
+
+    print_results(results, previous)
+
+    output = Path(args.output) if args.output else corpus / 'results' / f"extractors_{datetime.now():%Y%m%d_%H%M%S}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    report = {
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'revision': revision,
+        'corpus': str(corpus),
+        'workbooks': len(sources),
+        'expected_records': len(expected),
+        'python': sys.version.split()[0],
+        'pandas': pd.__version__,
+        'cpu_count': os.cpu_count(),
+        'results': results
+    }
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+
+    print(f"\n💾 Results saved: {output}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
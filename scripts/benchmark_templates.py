@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""
+Payment Template Benchmark
+Renders a batch of DuitNow/ECP files with each template strategy and compares speed and output.
+"""
+
+import argparse
+import json
+import random
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+import openpyxl
+
+from benchmark_extractors import git_revision
+from payment_templates import START_ROW, SerializedTemplate, WorkbookTemplate
+
+
+PAYMENT_DIR = Path(__file__).resolve().parent.parent / 'Payment'
+TEMPLATES = {
+    'duitnow': PAYMENT_DIR / 'DUITNOW ECP' / 'duitnow-ecp-excel-template 2.xlsx',
+    'ecp': PAYMENT_DIR / 'IBG ECP' / 'ecp-excel-template.xlsx',
+}
+
+
+class ReloadedTemplate:
+    """Baseline: openpyxl.load_workbook for every output file (the pre-cache behaviour)."""
+
+    def __init__(self, path, start_row=START_ROW):
+        self.path = Path(path)
+        self.start_row = start_row
+
+    def render(self, output_path, rows, cells=None):
+        wb = openpyxl.load_workbook(self.path)
+        ws = wb.active
+        for ref, value in (cells or {}).items():
+            ws[ref] = value
+        for row_num, row in enumerate(rows, self.start_row):
+            for col_num, value in enumerate(row, 1):
+                if value is not None and value != '':
+                    ws.cell(row=row_num, column=col_num, value=value)
+        wb.save(output_path)
+        return output_path
+
+
+# name -> template class; every one takes (path, start_row) and has render(output_path, rows, cells)
+STRATEGIES = {
+    'reload': ReloadedTemplate,
+    'workbook': WorkbookTemplate,
+    'serialized': SerializedTemplate,
+}
+
+
+def fake_rows(kind, count, rng):
+    """Payment rows shaped like fill-duitnow-template.py / ecp_export.py output."""
+    rows = []
+    for i in range(count):
+        ic = f"{rng.randint(60, 99)}{rng.randint(1, 12):02d}{rng.randint(1, 28):02d}{rng.randint(1, 14):02d}{rng.randint(0, 9999):04d}"
+        amount = round(rng.uniform(50, 2500), 2)
+        reference = f"BAITO {rng.choice(['Jan', 'Feb', 'Mar', 'Apr'])}"
+        if kind == 'duitnow':
+            rows.append(('DTN', 'NI', '', ic, amount, reference, 'PAYROLL', '', '', f"601{rng.randint(10000000, 99999999)}", ''))
+        else:
+            account = f"{rng.randint(0, 10 ** 12 - 1):012d}"
+            rows.append(('IBG', account, 'MBBEMYKL', f"Candidate {i}", 'NI', ic, amount, reference, 'PAYROLL')
+                        + ('',) * 12)
+    return rows
+
+
+def check_output(path, rows, cells, start_row=START_ROW):
+    """Mismatched cells (data rows and header cells) between a written file and its input."""
+    ws = openpyxl.load_workbook(path).active
+    errors = 0
+    for ref, value in cells.items():
+        errors += ws[ref].value != value
+    for row_num, row in enumerate(rows, start_row):
+        for col_num, value in enumerate(row, 1):
+            actual = ws.cell(row=row_num, column=col_num).value
+            errors += (actual if actual is not None else '') != (value if value is not None else '')
+    return errors
+
+
+def run_strategy(name, template_path, batches, out_dir, cells):
+    """Load once, render every batch; returns timings and the first/last outputs for checking."""
+    start = time.perf_counter()
+    template = STRATEGIES[name](template_path)
+    loaded = time.perf_counter()
+    paths = []
+    for i, rows in enumerate(batches, 1):
+        paths.append(template.render(out_dir / f"{name}_{i:03d}.xlsx", rows, cells))
+    done = time.perf_counter()
+
+    errors = sum(check_output(paths[i], batches[i], cells) for i in {0, len(batches) - 1})
+    total_rows = sum(len(rows) for rows in batches)
+    render = done - loaded
+    return {
+        'load_seconds': round(loaded - start, 4),
+        'render_seconds': round(render, 3),
+        'ms_per_file': round(render / len(batches) * 1000, 2),
+        'files_per_second': round(len(batches) / render, 1),
+        'rows_per_second': round(total_rows / render, 1),
+        'mean_file_kb': round(sum(Path(p).stat().st_size for p in paths) / len(paths) / 1024, 1),
+        'checked_cell_errors': int(errors),
+    }
+
+
+def main():
+    """Main CLI entry point."""
+    parser = argparse.ArgumentParser(
+        description='Benchmark per-file template reloads against the cached template strategies.',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  # 100 files of 40 payments, both templates, every strategy
+  python3 scripts/benchmark_templates.py
+
+  # Larger files, ECP only, skipping the slow baseline
+  python3 scripts/benchmark_templates.py --templates ecp --rows 500 --strategies workbook serialized
+        """
+    )
+    parser.add_argument('--files', type=int, default=100, help='Output files per strategy (default: 100)')
+    parser.add_argument('--rows', type=int, default=40, help='Mean payments per file (default: 40)')
+    parser.add_argument('--templates', nargs='+', choices=list(TEMPLATES), default=list(TEMPLATES))
+    parser.add_argument('--strategies', nargs='+', choices=list(STRATEGIES), default=list(STRATEGIES))
+    parser.add_argument('--seed', type=int, default=7)
+    parser.add_argument('--output', help='Results JSON (default: benchmark_fixtures/results/templates_<timestamp>.json)')
+    parser.add_argument('--keep', action='store_true', help='Keep the generated files (printed path)')
+    args = parser.parse_args()
+
+    print("="*120)
+    print(" "*42 + "PAYMENT TEMPLATE BENCHMARK")
+    print("="*120)
+
+    rng = random.Random(args.seed)
+    cells = {'B1': datetime.now().strftime('%d/%m/%Y')}
+    out_dir = Path(tempfile.mkdtemp(prefix='template_bench_'))
+    results = {}
+
+    try:
+        for kind in args.templates:
+            # Per-project splits: file sizes vary around the mean
+            batches = [fake_rows(kind, max(1, int(rng.uniform(0.5, 1.5) * args.rows)), rng) for _ in range(args.files)]
+            print(f"\n📄 {kind}: {TEMPLATES[kind].name} - {args.files} file(s), {sum(map(len, batches)):,} payment(s)")
+            results[kind] = {}
+            for name in args.strategies:
+                result = run_strategy(name, TEMPLATES[kind], batches, out_dir, cells)
+                results[kind][name] = result
+                check = '✓' if not result['checked_cell_errors'] else f"✗ {result['checked_cell_errors']} cell(s) differ"
+                print(f"   {name:<11} load {result['load_seconds'] * 1000:>7.1f}ms  render {result['render_seconds']:>7.2f}s  "
+                      f"{result['ms_per_file']:>8.1f} ms/file  {result['rows_per_second']:>9,.0f} rows/s  "
+                      f"{result['mean_file_kb']:>7.1f} KB  {check}")
+
+            baseline = results[kind].get('reload')
+            if baseline:
+                for name, result in results[kind].items():
+                    if name != 'reload':
+                        print(f"   {name} vs reload: {baseline['render_seconds'] / result['render_seconds']:.1f}x faster")
+    finally:
+        if args.keep:
+            print(f"\n📁 Files kept in {out_dir}")
+        else:
+            shutil.rmtree(out_dir, ignore_errors=True)
+
+    output = Path(args.output) if args.output else Path('benchmark_fixtures') / 'results' / f"templates_{datetime.now():%Y%m%d_%H%M%S}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump({
+            'created': datetime.now().isoformat(timespec='seconds'),
+            'revision': git_revision(),
+            'files': args.files,
+            'rows': args.rows,
+            'python': sys.version.split()[0],
+            'openpyxl': openpyxl.__version__,
+            'results': results
+        }, f, indent=2)
+
+    print(f"\n💾 Results saved: {output}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -10,12 +10,19 @@ from pathlib import Path
 import re
 from datetime import datetime
 
+from source_manifest import load_manifest, resolve_sources, source_file_index, locate_source
+from run_metrics import span, add_arguments, metrics_session
+import validation_cache
+from validation_cache import ValidationCache, run_incremental
+from payment_store import read_master, save_validation_results, store_source_index
+
 
 class RecordValidator:
     """Validates a single record by reasoning through original Excel data."""
 
     def __init__(self, source_dir):
-        self.source_dir = Path(source_dir)
+        # Directory, or {file name: path} from source_manifest.source_file_index()
+        self.source_dir = source_dir if isinstance(source_dir, dict) else Path(source_dir)
         self.validation_log = []
 
     def clean_ic(self, ic):
@@ -29,13 +36,15 @@ class RecordValidator:
         Find the candidate in the original Excel sheet.
         Returns: (found, raw_rows, reasoning)
         """
-        excel_file = self.source_dir / record['source_file']
+        excel_file = locate_source(self.source_dir, record['source_file'])
         if not excel_file.exists():
             return False, [], f"Excel file not found: {excel_file}"
 
         try:
             # Read the specific sheet
-            df = pd.read_excel(excel_file, sheet_name=record['source_sheet'], header=None)
+            with span('validate.read_sheet', sheet=record['source_sheet']) as s:
+                df = pd.read_excel(excel_file, sheet_name=record['source_sheet'], header=None)
+                s['rows'] = len(df)
 
             # Search for IC number
             target_ic = self.clean_ic(record['ic_number'])
@@ -178,7 +187,30 @@ class RecordValidator:
         return result
 
 
-def validate_masterlist(masterlist_path, source_dir, sample_size=None):
+def validate_records(validator, df):
+    """Validate each record in df. Returns results in df order."""
+    results = []
+
+    for n, (idx, record) in enumerate(df.iterrows()):
+        if n > 0 and n % 100 == 0:
+            print(f"  Progress: {n}/{len(df)} records validated...")
+
+        try:
+            with span('validate.comprehensive', sheet=record['source_sheet']) as s:
+                result = validator.validate_record(record)
+                s['result'] = result['status']
+            results.append(result)
+        except Exception as e:
+            results.append({
+                'full_name': record['full_name'],
+                'status': 'ERROR',
+                'issues': [str(e)]
+            })
+
+    return results
+
+
+def validate_masterlist(masterlist_path, source_dir, sample_size=None, cache=None):
     """
     Validate the entire masterlist.
 
@@ -186,6 +218,7 @@ def validate_masterlist(masterlist_path, source_dir, sample_size=None):
         masterlist_path: Path to baito_2025_COMPLETE_v3.xlsx
         source_dir: Directory containing original Excel files
         sample_size: If set, only validate this many records (for testing)
+        cache: ValidationCache - only records whose fields or source sheet changed are re-validated
     """
     print("="*120)
     print(" "*40 + "COMPREHENSIVE MASTERLIST VALIDATION")
@@ -193,7 +226,7 @@ def validate_masterlist(masterlist_path, source_dir, sample_size=None):
 
     # Read masterlist
     print(f"\n📂 Loading masterlist: {masterlist_path}")
-    df = pd.read_excel(masterlist_path, sheet_name='All Candidates', dtype={'account_number': str})
+    df = read_master(masterlist_path)
 
     total_records = len(df)
     if sample_size:
@@ -206,28 +239,19 @@ def validate_masterlist(masterlist_path, source_dir, sample_size=None):
     validator = RecordValidator(source_dir)
 
     # Validate each record
-    results = []
     status_counts = {'VALID': 0, 'MISMATCH': 0, 'NOT_FOUND': 0, 'ERROR': 0}
 
     print(f"\n{'─'*120}")
     print("VALIDATION IN PROGRESS...")
     print(f"{'─'*120}\n")
 
-    for idx, record in df.iterrows():
-        if idx > 0 and idx % 100 == 0:
-            print(f"  Progress: {idx}/{len(df)} records validated...")
+    results = run_incremental(cache, df, lambda records: validate_records(validator, records),
+                              prune=not sample_size)
+    for result in results:
+        status_counts[result['status']] += 1
 
-        try:
-            result = validator.validate_record(record)
-            results.append(result)
-            status_counts[result['status']] += 1
-        except Exception as e:
-            results.append({
-                'full_name': record['full_name'],
-                'status': 'ERROR',
-                'issues': [str(e)]
-            })
-            status_counts['ERROR'] += 1
+    # Master loaded from the payment store: keep the results with the records
+    save_validation_results(masterlist_path, 'comprehensive_validator', df, results)
 
     # Summary
     print(f"\n{'='*120}")
@@ -278,7 +302,8 @@ def validate_masterlist(masterlist_path, source_dir, sample_size=None):
 
     report_df = pd.DataFrame(report_data)
 
-    with pd.ExcelWriter(report_file, engine='openpyxl') as writer:
+    with span('validate.write_report', file=report_file, rows=len(report_df)), \
+            pd.ExcelWriter(report_file, engine='openpyxl') as writer:
         # All results
         report_df.to_excel(writer, sheet_name='All Validations', index=False)
 
@@ -305,12 +330,24 @@ def validate_masterlist(masterlist_path, source_dir, sample_size=None):
 
 
 if __name__ == '__main__':
-    masterlist_path = 'baito_2025_COMPLETE_v3.xlsx'
-    source_dir = '/Users/baito.kevin/Downloads/PROMOTER PAYMENT & CLAIMS 2025/Baito Promoter 2025/'
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Re-validate masterlist records against the source workbooks.')
+    parser.add_argument('masterlist', nargs='?', default='baito_2025_COMPLETE_v3.xlsx')
+    add_arguments(parser)
+    validation_cache.add_arguments(parser)
+    args = parser.parse_args()
+
+    masterlist_path = args.masterlist
+    # Source workbooks come from the store, or the manifest (payment_sources.json), looked up by file name
+    source_dir = store_source_index(masterlist_path) or source_file_index(resolve_sources(load_manifest()))
+    cache = ValidationCache('comprehensive_validator', source_dir, __file__, cache_dir=args.cache_dir,
+                            enabled=not args.revalidate)
 
     # For testing, validate a sample first
     print("Starting validation with SAMPLE (100 records)...\n")
-    results, stats = validate_masterlist(masterlist_path, source_dir, sample_size=100)
+    with metrics_session(args.metrics, profile=args.profile):
+        results, stats = validate_masterlist(masterlist_path, source_dir, sample_size=100, cache=cache)
 
     # If sample looks good, offer to validate all
     if stats['VALID'] / 100 > 0.8:  # If >80% valid
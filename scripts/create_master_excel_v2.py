@@ -13,6 +13,13 @@ import pandas as pd
 import numpy as np
 from collections import defaultdict
 
+from header_layouts import HeaderLayouts, SheetText
+
+
+# Column mapping per header layout (see header_layouts.RULES['v2'])
+COLUMN_LAYOUTS = HeaderLayouts('v2')
+COLUMN_LAYOUTS.preload()
+
 
 def clean_ic_number(ic):
     """Clean and normalize IC number."""
@@ -144,12 +151,11 @@ def extract_project_metadata(csv_path, raw_df):
 
 def find_header_rows(df_raw):
     """Find all rows that contain 'Name' and 'IC' (headers)."""
-    header_rows = []
-    for idx, row in df_raw.iterrows():
-        row_str = ' '.join([str(val) for val in row if pd.notna(val)]).lower()
-        if ('name' in row_str and 'ic' in row_str) or ('name' in row_str and 'account' in row_str):
-            header_rows.append(idx)
-    return header_rows
+    text = SheetText(df_raw)
+    # 'account' instead of 'ic' also counts; both are only tested on rows that mention a name
+    named = text.rows_with('name')
+    rows = np.union1d(text.rows_with('ic', rows=named), text.rows_with('account', rows=named))
+    return df_raw.index[rows].tolist()
 
 
 def extract_date_columns(df):
@@ -187,44 +193,28 @@ def extract_section_data(csv_path, header_row_idx, next_header_idx, project_name
         # Clean column names
         section_df.columns = [str(col).strip() for col in section_df.columns]
 
-        # Identify columns
-        name_cols = [col for col in section_df.columns if 'name' in col.lower() and 'bank' not in col.lower()]
-        ic_cols = [col for col in section_df.columns if 'ic' in col.lower() and ('number' in col.lower() or col.lower() == 'ic')]
-        bank_cols = [col for col in section_df.columns if 'bank name' in col.lower() or col.lower() == 'bank']
-        # Fix: Look for "Bank Account" or "Account" columns
-        account_cols = [col for col in section_df.columns if 'account' in col.lower()]
-        # If we found both "Bank Name" and "Bank Account", use "Bank Account"
-        if len(account_cols) > 1:
-            account_cols = [col for col in account_cols if 'bank account' in col.lower()]
-        position_cols = [col for col in section_df.columns if col.lower() in ['position', 'role']]
-
-        # Payment columns
-        day_cols = [col for col in section_df.columns if col.lower() in ['day', 'days']]
-        date_cols = [col for col in section_df.columns if col.lower() == 'date']
-        wage_cols = [col for col in section_df.columns if col.lower() in ['wages', 'wage']]
-        ot_cols = [col for col in section_df.columns if col.lower() in ['ot', 'overtime']]
-        allowance_cols = [col for col in section_df.columns if 'allowance' in col.lower()]
-        claim_cols = [col for col in section_df.columns if col.lower() in ['claim', 'claims']]
-        total_cols = [col for col in section_df.columns if col.lower() in ['total', 'payment', 'total wages']]
+        # Identify columns (first match per role, computed once per header layout;
+        # with both "Bank Name" and "Bank Account", the account is "Bank Account")
+        columns = COLUMN_LAYOUTS.map_columns(section_df.columns)
 
         # Roster/date columns (columns that are dates)
         roster_date_cols = extract_date_columns(section_df)
 
-        if not name_cols or not ic_cols:
+        if columns['name_col'] is None or columns['ic_col'] is None:
             return []
 
-        name_col = name_cols[0]
-        ic_col = ic_cols[0]
-        bank_col = bank_cols[0] if bank_cols else None
-        account_col = account_cols[0] if account_cols else None
-        position_col = position_cols[0] if position_cols else None
-        day_col = day_cols[0] if day_cols else None
-        date_col = date_cols[0] if date_cols else None
-        wage_col = wage_cols[0] if wage_cols else None
-        ot_col = ot_cols[0] if ot_cols else None
-        allowance_col = allowance_cols[0] if allowance_cols else None
-        claim_col = claim_cols[0] if claim_cols else None
-        total_col = total_cols[0] if total_cols else None
+        name_col = columns['name_col']
+        ic_col = columns['ic_col']
+        bank_col = columns['bank_col']
+        account_col = columns['account_col']
+        position_col = columns['position_col']
+        day_col = columns['day_col']
+        date_col = columns['date_col']
+        wage_col = columns['wage_col']
+        ot_col = columns['ot_col']
+        allowance_col = columns['allowance_col']
+        claim_col = columns['claim_col']
+        total_col = columns['total_col']
 
         # Extract candidate records
         candidates = {}
@@ -14,6 +14,8 @@ import numpy as np
 from collections import defaultdict
 import openpyxl
 
+from workbook_reader import clean_account, read_text_grid, overlay_text_columns
+
 
 def clean_ic_number(ic):
     """Clean and normalize IC number."""
@@ -54,28 +56,6 @@ def clean_bank_name(bank):
     return str(bank).strip() if str(bank).strip() else None
 
 
-def clean_account(account):
-    """Clean and normalize account number - NO .0"""
-    if pd.isna(account):
-        return None
-
-    account_str = str(account).strip()
-
-    # Handle scientific notation
-    try:
-        if 'e' in account_str.lower() or '.' in account_str:
-            account_num = float(account_str)
-            account_str = str(int(account_num))
-    except:
-        pass
-
-    # Remove spaces, hyphens, .0
-    account_str = account_str.replace(' ', '').replace('-', '')
-    account_str = account_str.replace('.0', '').replace('.', '')
-
-    return account_str if account_str and account_str.isdigit() else None
-
-
 def safe_float(value):
     """Safely convert to float."""
     if pd.isna(value):
@@ -159,7 +139,6 @@ def process_excel_complete(excel_path):
     try:
         wb = openpyxl.load_workbook(excel_path, read_only=True, data_only=True)
         sheet_names = wb.sheetnames
-        wb.close()
 
         print(f"   Found {len(sheet_names)} sheet(s)")
 
@@ -181,6 +160,9 @@ def process_excel_complete(excel_path):
                 if not header_rows:
                     continue
 
+                # Raw cell text for account/IC columns (never coerced to float)
+                text_grid = read_text_grid(wb[sheet_name])
+
                 # Process each section
                 for idx_pos, header_row_idx in enumerate(header_rows):
                     # Only read until next header row (not 200 rows blindly)
@@ -221,6 +203,9 @@ def process_excel_complete(excel_path):
                     if not name_cols or not ic_cols:
                         continue
 
+                    overlay_text_columns(section_df, text_grid, header_row_idx + 1,
+                                         [ic_cols[0], account_cols[0] if account_cols else None])
+
                     # Extract candidates
                     current_candidate = None
                     candidates = {}
@@ -428,6 +413,8 @@ def process_excel_complete(excel_path):
                 print(f"   ⚠️  Error in sheet '{sheet_name}': {e}")
                 continue
 
+        wb.close()
+
         print(f"   ✓ Extracted {len(all_data)} record(s)")
         return all_data
 
@@ -7,13 +7,27 @@ Fixes continuation row aggregation and column mapping issues
 import os
 import glob
 import re
+import sys
+import argparse
 from pathlib import Path
 from datetime import datetime
+from dataclasses import dataclass, field
 import pandas as pd
 import numpy as np
-from collections import defaultdict
 import openpyxl
 
+from workbook_reader import clean_account, read_text_grid, overlay_text_columns
+from master_writer import MASTER_COLUMNS, write_master_workbook
+from source_manifest import DEFAULT_MANIFEST, load_manifest, resolve_sources, run_sources, parse_month
+from run_metrics import span, start_span, end_span, incr, add_arguments, metrics_session
+from payment_store import PaymentStore
+from header_layouts import HeaderLayouts, SheetText, find_header_rows
+
+
+# Column mapping per header layout; known layouts are pre-registered (header_layouts.py)
+COLUMN_LAYOUTS = HeaderLayouts('v3')
+COLUMN_LAYOUTS.preload()
+
 
 def clean_ic_number(ic):
     """Clean and normalize IC number."""
@@ -54,28 +68,6 @@ def clean_bank_name(bank):
     return str(bank).strip() if str(bank).strip() else None
 
 
-def clean_account(account):
-    """Clean and normalize account number - NO .0"""
-    if pd.isna(account):
-        return None
-
-    account_str = str(account).strip()
-
-    # Handle scientific notation
-    try:
-        if 'e' in account_str.lower() or '.' in account_str:
-            account_num = float(account_str)
-            account_str = str(int(account_num))
-    except:
-        pass
-
-    # Remove spaces, hyphens, .0
-    account_str = account_str.replace(' ', '').replace('-', '')
-    account_str = account_str.replace('.0', '').replace('.', '')
-
-    return account_str if account_str and account_str.isdigit() else None
-
-
 def safe_float(value):
     """Safely convert to float."""
     if pd.isna(value):
@@ -86,10 +78,15 @@ def safe_float(value):
         return 0.0
 
 
-def extract_project_metadata(excel_path, sheet_name):
-    """Extract project-level metadata from sheet."""
+def extract_project_metadata(excel_path, sheet_name, text=None):
+    """
+    Extract project-level metadata from sheet.
+
+    text: SheetText of the sheet if the caller already read it (otherwise the first 10 rows are read)
+    """
     try:
-        df = pd.read_excel(excel_path, sheet_name=sheet_name, header=None, nrows=10)
+        if text is None:
+            text = SheetText(pd.read_excel(excel_path, sheet_name=sheet_name, header=None, nrows=10))
 
         metadata = {
             'project_date_range': None,
@@ -98,31 +95,34 @@ def extract_project_metadata(excel_path, sheet_name):
             'time_schedule': None
         }
 
-        for idx in range(min(10, len(df))):
-            row = df.iloc[idx]
-            row_str = ' '.join([str(val) for val in row if pd.notna(val)])
-            row_str_lower = row_str.lower()
+        # Metadata rows are among the first 10; only rows with a keyword are joined and searched
+        top = range(min(10, len(text.df)))
+        hits = {keyword: set(text.rows_with(keyword, rows=top).tolist())
+                for keyword in ('date:', 'payment', 'location:', 'time:')}
+
+        for idx in sorted(set().union(*hits.values())):
+            row_str = text.row_text(idx)
 
             # Extract date range
-            if 'date:' in row_str_lower and not metadata['project_date_range']:
+            if idx in hits['date:'] and not metadata['project_date_range']:
                 date_match = re.search(r'date:\\s*(.+?)(?:payment|time|$)', row_str, re.IGNORECASE)
                 if date_match:
                     metadata['project_date_range'] = date_match.group(1).strip().strip(',')
 
             # Extract payment due date
-            if 'payment' in row_str_lower and not metadata['payment_due_date']:
+            if idx in hits['payment'] and not metadata['payment_due_date']:
                 payment_match = re.search(r'payment\\s+(?:by\\s+)?(.+?)(?:\\s{2,}|$)', row_str, re.IGNORECASE)
                 if payment_match:
                     metadata['payment_due_date'] = payment_match.group(1).strip().strip(',')
 
             # Extract location
-            if 'location:' in row_str_lower and not metadata['location']:
+            if idx in hits['location:'] and not metadata['location']:
                 loc_match = re.search(r'location:\\s*(.+?)(?:\\s{2,}|$)', row_str, re.IGNORECASE)
                 if loc_match:
                     metadata['location'] = loc_match.group(1).strip().strip(',')
 
             # Extract time
-            if 'time:' in row_str_lower and not metadata['time_schedule']:
+            if idx in hits['time:'] and not metadata['time_schedule']:
                 time_match = re.search(r'time:\\s*(.+?)(?:payment|$)', row_str, re.IGNORECASE)
                 if time_match:
                     metadata['time_schedule'] = time_match.group(1).strip().strip(',')
@@ -138,100 +138,90 @@ def extract_project_metadata(excel_path, sheet_name):
 
 
 def extract_month_from_path(path):
-    """Extract month from file path."""
-    path_str = str(path).lower()
-    months = ['jan', 'feb', 'march', 'april', 'may', 'june', 'july', 'aug', 'sep', 'oct', 'nov', 'dec']
-    for month in months:
-        if month in path_str:
-            return month.capitalize()
-    return 'Unknown'
+    """Extract month from file path (whole-word match on the file name)."""
+    return parse_month(path)[1]
 
 
 def identify_columns(df):
     """
     Identify column purposes with better mapping.
     Returns dict of column purposes.
+
+    Sections share a few header layouts, so the mapping is computed once per
+    layout (see header_layouts.RULES['v3'] for the rules).
+    """
+    return COLUMN_LAYOUTS.map_columns(df.columns)
+
+
+# Per-sheet values repeated on every record; stored once per sheet and expanded as categoricals
+SHEET_FIELDS = ['month', 'source_file', 'source_sheet', 'project_name', 'project_date_range', 'payment_due_date',
+                'location', 'time_schedule']
+
+# Per-record columns with few distinct values
+CATEGORICAL_FIELDS = ['bank_name', 'position']
+
+
+@dataclass(slots=True)
+class CandidateRecord:
+    """One candidate being aggregated from its row and continuation rows (sheet-level fields live on the sheet)."""
+    full_name: str
+    alternate_name: str
+    ic_number: str
+    bank_name: str
+    account_number: str
+    position: str
+    # Sheet rows (1-based, as shown in Excel) the candidate spans
+    first_row: int
+    last_row: int
+    days_worked: float = 0
+    total_wages: float = 0.0
+    total_ot: float = 0.0
+    total_allowance: float = 0.0
+    total_claim: float = 0.0
+    total_payment: float = 0.0
+    # Insertion-ordered sets: {value: None}
+    work_dates: dict = field(default_factory=dict)
+    roster: dict = field(default_factory=dict)  # {(date, shift code): None} - roster_info is a preview
+
+
+def records_frame(sheets):
+    """
+    Columnar master rows for one workbook.
+
+    Args:
+        sheets: [(sheet fields dict, [CandidateRecord, ...]), ...]
+
+    Returns: DataFrame with MASTER_COLUMNS plus roster, first_row and last_row; sheet-level and
+    low-cardinality strings are categoricals, list fields are joined as in the master
     """
-    cols = {col: str(col).lower().strip() for col in df.columns}
-
-    mapping = {
-        'name_col': None,
-        'ic_col': None,
-        'bank_col': None,
-        'account_col': None,
-        'position_col': None,
-        'days_col': None,
-        'date_col': None,
-        'wage_col': None,
-        'payment_col': None,
-        'ot_col': None,
-        'allowance_col': None,
-        'transport_col': None,
-        'claim_col': None,
-        'total_col': None,
-        'date_pattern_cols': []
-    }
-
-    for col, col_lower in cols.items():
-        # Name column
-        if 'name' in col_lower and 'bank' not in col_lower and not mapping['name_col']:
-            mapping['name_col'] = col
-
-        # IC column
-        elif 'ic' in col_lower and not mapping['ic_col']:
-            mapping['ic_col'] = col
-
-        # Bank name
-        elif ('bank name' in col_lower or col_lower == 'bank') and not mapping['bank_col']:
-            mapping['bank_col'] = col
-
-        # Account number
-        elif 'account' in col_lower and not mapping['account_col']:
-            mapping['account_col'] = col
-
-        # Position
-        elif col_lower in ['position', 'role'] and not mapping['position_col']:
-            mapping['position_col'] = col
-
-        # Days column - CRITICAL FIX
-        elif col_lower in ['day', 'days'] and not mapping['days_col']:
-            mapping['days_col'] = col
-
-        # Date column
-        elif col_lower == 'date' and not mapping['date_col']:
-            mapping['date_col'] = col
-
-        # Wages column
-        elif col_lower in ['wages', 'wage', 'salary'] and not mapping['wage_col']:
-            mapping['wage_col'] = col
-
-        # Payment column (separate from wages)
-        elif col_lower in ['payment'] and not mapping['payment_col']:
-            mapping['payment_col'] = col
-
-        # OT column
-        elif col_lower in ['ot', 'overtime'] and not mapping['ot_col']:
-            mapping['ot_col'] = col
-
-        # Transport/Allowance
-        elif col_lower in ['transport', 'transportation'] and not mapping['transport_col']:
-            mapping['transport_col'] = col
-        elif 'allowance' in col_lower and not mapping['allowance_col']:
-            mapping['allowance_col'] = col
-
-        # Claim column
-        elif col_lower in ['claim', 'claims'] and not mapping['claim_col']:
-            mapping['claim_col'] = col
-
-        # Total column - USE THIS VALUE
-        elif col_lower in ['total', 'total wages', 'total payment'] and not mapping['total_col']:
-            mapping['total_col'] = col
-
-        # Date pattern columns (for roster)
-        elif re.match(r'\\d{4}-\\d{2}-\\d{2}', str(col)):
-            mapping['date_pattern_cols'].append(col)
-
-    return mapping
+    counts = [len(records) for _, records in sheets]
+    records = [record for _, sheet_records in sheets for record in sheet_records]
+    columns = {}
+    for name in SHEET_FIELDS:
+        values = np.empty(len(sheets), dtype=object)
+        values[:] = [fields[name] for fields, _ in sheets]
+        columns[name] = pd.Categorical(np.repeat(values, counts))
+
+    for name in ('full_name', 'alternate_name', 'ic_number', 'bank_name', 'account_number', 'position', 'days_worked',
+                 'total_wages', 'total_ot', 'total_allowance', 'total_claim', 'total_payment', 'first_row', 'last_row'):
+        columns[name] = [getattr(record, name) for record in records]
+    for name in CATEGORICAL_FIELDS:
+        columns[name] = pd.Categorical(columns[name])
+
+    # Empty lists become None, as the store and the master writer expect for blank cells
+    columns['work_dates'] = [', '.join(record.work_dates) or None for record in records]
+    # Same "date: code" entries as the preview, so the store can parse either
+    rosters = [[f"{day}: {code}" for day, code in record.roster] for record in records]
+    columns['roster_info'] = ['; '.join(entries[:5]) or None for entries in rosters]
+    columns['roster'] = ['; '.join(entries) or None for entries in rosters]
+    columns['notes'] = columns['project_notes'] = pd.Categorical([None] * len(records), categories=[''])
+
+    return pd.DataFrame(columns)[MASTER_COLUMNS + ['roster', 'first_row', 'last_row']]
+
+
+def frame_records(df):
+    """records_frame rows as dicts (None for missing), for code that takes extractor records."""
+    return df.astype(object).where(df.notna(), None).to_dict('records')
 
 
 def is_continuation_row(row, prev_row, col_map):
@@ -266,40 +256,65 @@ def is_continuation_row(row, prev_row, col_map):
     return False
 
 
-def process_excel_fixed(excel_path):
+def process_excel_fixed(excel_path, month=None, raise_errors=False):
     """
     Process Excel file with FIXED continuation row handling.
+
+    month comes from the source manifest; falls back to the file name.
+    raise_errors: re-raise a workbook that cannot be read instead of returning no records
     """
     print(f"\\n📂 Processing: {Path(excel_path).name}")
 
-    month = extract_month_from_path(excel_path)
-    all_data = []
+    month = month or extract_month_from_path(excel_path)
+    sheets = []
+    record_count = 0
+    file_span = start_span('extract.file', file=Path(excel_path).name, month=month)
 
     try:
         wb = openpyxl.load_workbook(excel_path, read_only=True, data_only=True)
         sheet_names = wb.sheetnames
-        wb.close()
 
         print(f"   Found {len(sheet_names)} sheet(s)")
+        file_span['sheets'] = len(sheet_names)
 
         for sheet_name in sheet_names:
+            sheet_span = start_span('extract.sheet', file=Path(excel_path).name, sheet=sheet_name)
             try:
-                # Get project metadata
-                metadata = extract_project_metadata(excel_path, sheet_name)
-
                 # Read sheet
-                df = pd.read_excel(excel_path, sheet_name=sheet_name, header=None)
+                with span('extract.read_sheet', sheet=sheet_name) as s:
+                    df = pd.read_excel(excel_path, sheet_name=sheet_name, header=None)
+                    s['rows'] = len(df)
 
-                # Find header rows
-                header_rows = []
-                for idx, row in df.iterrows():
-                    row_str = ' '.join([str(val) for val in row if pd.notna(val)]).lower()
-                    if 'name' in row_str and 'ic' in row_str:
-                        header_rows.append(idx)
+                # Find header rows (lowercased cell text is shared with the metadata scan)
+                with span('extract.headers', sheet=sheet_name) as s:
+                    text = SheetText(df)
+                    header_rows = find_header_rows(df, text=text)
+                    s['sections'] = len(header_rows)
+
+                # Get project metadata
+                with span('extract.metadata', sheet=sheet_name):
+                    metadata = extract_project_metadata(excel_path, sheet_name, text=text)
 
                 if not header_rows:
+                    end_span(sheet_span, records=0)
                     continue
 
+                # Raw cell text for account/IC columns (never coerced to float)
+                with span('extract.text_grid', sheet=sheet_name) as s:
+                    text_grid = read_text_grid(wb[sheet_name])
+                    s['rows'] = len(text_grid)
+                sheet_fields = {
+                    'month': month,
+                    'source_file': Path(excel_path).name,
+                    'source_sheet': sheet_name,
+                    'project_name': sheet_name,
+                    'project_date_range': metadata['project_date_range'],
+                    'payment_due_date': metadata['payment_due_date'],
+                    'location': metadata['location'],
+                    'time_schedule': metadata['time_schedule'],
+                }
+                sheet_records = []
+
                 # Process each section (FIXED: prevent overlap)
                 for section_idx, header_row_idx in enumerate(header_rows):
                     # Calculate correct nrows to avoid reading into next section
@@ -309,12 +324,14 @@ def process_excel_fixed(excel_path):
                     else:
                         nrows = 200  # Last section, read all remaining
                     
-                    section_df = pd.read_excel(
-                        excel_path,
-                        sheet_name=sheet_name,
-                        skiprows=header_row_idx,
-                        nrows=nrows
-                    )
+                    with span('extract.section_read', sheet=sheet_name, section=section_idx) as s:
+                        section_df = pd.read_excel(
+                            excel_path,
+                            sheet_name=sheet_name,
+                            skiprows=header_row_idx,
+                            nrows=nrows
+                        )
+                        s['rows'] = len(section_df)
 
                     section_df.columns = [str(col).strip() for col in section_df.columns]
 
@@ -324,9 +341,15 @@ def process_excel_fixed(excel_path):
                     if not col_map['name_col'] or not col_map['ic_col']:
                         continue
 
+                    overlay_text_columns(section_df, text_grid, header_row_idx + 1,
+                                         [col_map['ic_col'], col_map['account_col']])
+
+                    aggregate_span = start_span('extract.aggregate', sheet=sheet_name, section=section_idx,
+                                                rows=len(section_df))
+
                     # Extract candidates with FIXED aggregation
-                    current_candidate = None
-                    candidates = {}
+                    candidate = None
+                    candidates = []
                     prev_row = None
 
                     for idx, row in section_df.iterrows():
@@ -342,281 +365,233 @@ def process_excel_fixed(excel_path):
 
                                 ic_number = clean_ic_number(row[col_map['ic_col']])
                                 if not ic_number or len(ic_number) < 6:
+                                    incr('ic_rejected')
                                     prev_row = row
                                     continue
 
                                 full_name = clean_name(row[col_map['name_col']])
                                 if not full_name:
+                                    incr('name_rejected')
                                     prev_row = row
                                     continue
 
-                                key = f"{ic_number}_{sheet_name}_{idx}"
-                                current_candidate = key
-
-                                candidates[key] = {
-                                    'month': month,
-                                    'source_file': Path(excel_path).name,
-                                    'source_sheet': sheet_name,
-                                    'project_name': sheet_name,
-                                    'full_name': full_name,
-                                    'alternate_name': extract_alternate_name(row[col_map['name_col']]),
-                                    'ic_number': ic_number,
-                                    'bank_name': clean_bank_name(row.get(col_map['bank_col'])) if col_map['bank_col'] else None,
-                                    'account_number': clean_account(row.get(col_map['account_col'])) if col_map['account_col'] else None,
-                                    'position': str(row.get(col_map['position_col'])).strip() if col_map['position_col'] and pd.notna(row.get(col_map['position_col'])) else None,
-                                    'days_worked': 0,
-                                    'total_wages': 0.0,
-                                    'total_ot': 0.0,
-                                    'total_allowance': 0.0,
-                                    'total_claim': 0.0,
-                                    'total_payment': 0.0,
-                                    'work_dates': [],
-                                    'project_date_range': metadata['project_date_range'],
-                                    'payment_due_date': metadata['payment_due_date'],
-                                    'location': metadata['location'],
-                                    'time_schedule': metadata['time_schedule'],
-                                    'roster_info': [],
-                                    'notes': [],
-                                    'project_notes': [],
-                                    'payment_components': []  # Track for debugging
-                                }
+                                bank = clean_bank_name(row.get(col_map['bank_col'])) if col_map['bank_col'] else None
+                                position = str(row.get(col_map['position_col'])).strip() if col_map['position_col'] and pd.notna(row.get(col_map['position_col'])) else None
+                                candidate = CandidateRecord(
+                                    full_name=full_name,
+                                    alternate_name=extract_alternate_name(row[col_map['name_col']]),
+                                    ic_number=ic_number,
+                                    # A handful of banks and positions across thousands of records
+                                    bank_name=sys.intern(bank) if bank else bank,
+                                    account_number=clean_account(row.get(col_map['account_col'])) if col_map['account_col'] else None,
+                                    position=sys.intern(position) if position else position,
+                                    first_row=header_row_idx + 2 + idx,
+                                    last_row=header_row_idx + 2 + idx
+                                )
+                                candidates.append(candidate)
 
                         # Aggregate data from this row (whether new or continuation)
-                        if current_candidate and current_candidate in candidates:
+                        if candidate is not None:
+                            if row.notna().any():
+                                candidate.last_row = header_row_idx + 2 + idx
+
                             # Days
                             if col_map['days_col'] and pd.notna(row.get(col_map['days_col'])):
-                                days_val = safe_float(row[col_map['days_col']])
-                                candidates[current_candidate]['days_worked'] += days_val
+                                candidate.days_worked += safe_float(row[col_map['days_col']])
 
                             # Wages
                             if col_map['wage_col'] and pd.notna(row.get(col_map['wage_col'])):
-                                wage_val = safe_float(row[col_map['wage_col']])
-                                candidates[current_candidate]['total_wages'] += wage_val
-                                candidates[current_candidate]['payment_components'].append(f"Wage: {wage_val}")
+                                candidate.total_wages += safe_float(row[col_map['wage_col']])
 
                             # Payment (if separate from wages)
                             if col_map['payment_col'] and pd.notna(row.get(col_map['payment_col'])):
-                                payment_val = safe_float(row[col_map['payment_col']])
-                                candidates[current_candidate]['total_wages'] += payment_val
-                                candidates[current_candidate]['payment_components'].append(f"Payment: {payment_val}")
+                                candidate.total_wages += safe_float(row[col_map['payment_col']])
 
                             # OT
                             if col_map['ot_col'] and pd.notna(row.get(col_map['ot_col'])):
-                                ot_val = safe_float(row[col_map['ot_col']])
-                                candidates[current_candidate]['total_ot'] += ot_val
-                                candidates[current_candidate]['payment_components'].append(f"OT: {ot_val}")
+                                candidate.total_ot += safe_float(row[col_map['ot_col']])
 
                             # Transport/Allowance
                             if col_map['transport_col'] and pd.notna(row.get(col_map['transport_col'])):
-                                transport_val = safe_float(row[col_map['transport_col']])
-                                candidates[current_candidate]['total_allowance'] += transport_val
-                                candidates[current_candidate]['payment_components'].append(f"Transport: {transport_val}")
+                                candidate.total_allowance += safe_float(row[col_map['transport_col']])
 
                             if col_map['allowance_col'] and pd.notna(row.get(col_map['allowance_col'])):
-                                allowance_val = safe_float(row[col_map['allowance_col']])
-                                candidates[current_candidate]['total_allowance'] += allowance_val
-                                candidates[current_candidate]['payment_components'].append(f"Allowance: {allowance_val}")
+                                candidate.total_allowance += safe_float(row[col_map['allowance_col']])
 
                             # Claim
                             if col_map['claim_col'] and pd.notna(row.get(col_map['claim_col'])):
-                                claim_val = safe_float(row[col_map['claim_col']])
-                                candidates[current_candidate]['total_claim'] += claim_val
-                                candidates[current_candidate]['payment_components'].append(f"Claim: {claim_val}")
+                                candidate.total_claim += safe_float(row[col_map['claim_col']])
 
                             # Total - USE THIS if available, it's authoritative
                             if col_map['total_col'] and pd.notna(row.get(col_map['total_col'])):
                                 total_val = safe_float(row[col_map['total_col']])
                                 # Use the FIRST non-zero total we see
-                                if total_val > 0 and candidates[current_candidate]['total_payment'] == 0:
-                                    candidates[current_candidate]['total_payment'] = total_val
-                                    candidates[current_candidate]['payment_components'].append(f"Total (from sheet): {total_val}")
+                                if total_val > 0 and candidate.total_payment == 0:
+                                    candidate.total_payment = total_val
 
                             # Date column
                             if col_map['date_col'] and pd.notna(row.get(col_map['date_col'])):
-                                date_str = str(row[col_map['date_col']])
-                                if date_str not in candidates[current_candidate]['work_dates']:
-                                    candidates[current_candidate]['work_dates'].append(date_str)
+                                candidate.work_dates[str(row[col_map['date_col']])] = None
 
                             # Roster info from date pattern columns
                             for date_col in col_map['date_pattern_cols']:
                                 if pd.notna(row.get(date_col)):
                                     roster_val = str(row[date_col]).strip()
                                     if roster_val and len(roster_val) < 50:
-                                        info = f"{date_col}: {roster_val}"
-                                        if info not in candidates[current_candidate]['roster_info']:
-                                            candidates[current_candidate]['roster_info'].append(info)
+                                        candidate.roster[(str(date_col)[:10], roster_val)] = None
 
                         prev_row = row
 
                     # Post-process candidates
-                    for key, candidate in candidates.items():
+                    for candidate in candidates:
                         # Calculate total from components if not set
                         component_sum = (
-                            candidate['total_wages'] +
-                            candidate['total_ot'] +
-                            candidate['total_allowance'] +
-                            candidate['total_claim']
+                            candidate.total_wages +
+                            candidate.total_ot +
+                            candidate.total_allowance +
+                            candidate.total_claim
                         )
 
                         # If we didn't get a total from the "Total" column, use component sum
-                        if candidate['total_payment'] == 0 and component_sum > 0:
-                            candidate['total_payment'] = component_sum
+                        if candidate.total_payment == 0 and component_sum > 0:
+                            candidate.total_payment = component_sum
 
                         # If component sum is larger (shouldn't happen, but just in case)
-                        if component_sum > candidate['total_payment']:
-                            candidate['total_payment'] = component_sum
-
-                        # Limit roster info
-                        candidate['roster_info'] = candidate['roster_info'][:5]
+                        if component_sum > candidate.total_payment:
+                            candidate.total_payment = component_sum
 
-                        # Remove debugging field
-                        candidate.pop('payment_components', None)
+                    sheet_records.extend(candidates)
+                    end_span(aggregate_span, candidates=len(candidates))
 
-                        all_data.append(candidate)
+                if sheet_records:
+                    sheets.append((sheet_fields, sheet_records))
+                    record_count += len(sheet_records)
+                end_span(sheet_span, records=len(sheet_records))
 
             except Exception as e:
                 print(f"   ⚠️  Error in sheet '{sheet_name}': {e}")
+                end_span(sheet_span, error=str(e))
                 continue
 
-        print(f"   ✓ Extracted {len(all_data)} record(s)")
-        return all_data
+        wb.close()
+
+        print(f"   ✓ Extracted {record_count} record(s)")
+        end_span(file_span, records=record_count)
+        return records_frame(sheets)
 
     except Exception as e:
         print(f"   ✗ Error: {e}")
-        return []
+        end_span(file_span, error=str(e))
+        if raise_errors:
+            raise
+        return records_frame([])
 
 
-def main():
-    """Main function."""
-    print("="*120)
-    print(" "*30 + "FIXED EXTRACTION V3.2 - CONTINUATION ROW FIX")
-    print("="*120)
-
-    source_dir = "/Users/baito.kevin/Downloads/PROMOTER PAYMENT & CLAIMS 2025/Baito Promoter 2025/"
-
-    months_ordered = [
-        ('jan', 'Baito Jan Payment Details 2025.xlsx'),
-        ('feb', 'Baito Feb Payment Details 2025.xlsx'),
-        ('march', 'Baito March Payment Details 2025.xlsx'),
-        ('april', 'Baito April Payment Details 2025.xlsx'),
-        ('may', 'Baito May Payment Details 2025.xlsx'),
-        ('june', 'Baito June Payment Details 2025.xlsx'),
-        ('july', 'Baito July Payment Details 2025.xlsx'),
-        ('aug', 'Baito Aug Payment Details 2025.xlsx'),
-        ('sep', 'Baito Sep Payment Details 2025.xlsx')
-    ]
-
-    all_data = []
-
-    for month_name, filename in months_ordered:
-        excel_path = Path(source_dir) / filename
-
-        if not excel_path.exists():
-            print(f"\\n⊘ {month_name.capitalize()}: File not found")
-            continue
-
-        data = process_excel_fixed(str(excel_path))
-        all_data.extend(data)
-
-    print(f"\\n{'='*120}")
-    print(f"Total records extracted: {len(all_data)}")
-    print(f"{'='*120}")
-
-    # Create DataFrame
-    df = pd.DataFrame(all_data)
-
-    # Format list columns
-    df['work_dates'] = df['work_dates'].apply(lambda x: ', '.join(x) if x else '')
-    df['roster_info'] = df['roster_info'].apply(lambda x: '; '.join(x) if x else '')
-    df['notes'] = df['notes'].apply(lambda x: '; '.join(x) if x else '')
-    df['project_notes'] = df['project_notes'].apply(lambda x: '; '.join(x) if x else '')
-
-    # Month ordering for sorting
-    month_order = {m.capitalize(): i for i, (m, _) in enumerate(months_ordered)}
-    df['month_order'] = df['month'].map(month_order)
+def write_master(all_data, output_file):
+    """Sort, format and write one partition of the master list."""
+    # Columnar records from process_excel_fixed - list fields are already joined
+    # Month ordering for sorting (multi-month labels sort by their first month)
+    df = all_data.assign(month_order=all_data['month'].map(lambda m: parse_month(m)[0] or 99).astype(int))
 
     # Sort by month (Jan to Dec), then file, then sheet
     df = df.sort_values(['month_order', 'source_file', 'source_sheet', 'full_name'])
     df = df.drop('month_order', axis=1)
 
     # Column order (ALL FIELDS)
-    column_order = [
-        'month',
-        'source_file',
-        'source_sheet',
-        'project_name',
-        'full_name',
-        'alternate_name',
-        'ic_number',
-        'bank_name',
-        'account_number',
-        'position',
-        'days_worked',
-        'total_wages',
-        'total_ot',
-        'total_allowance',
-        'total_claim',
-        'total_payment',
-        'work_dates',
-        'project_date_range',
-        'payment_due_date',
-        'location',
-        'time_schedule',
-        'roster_info',
-        'notes',
-        'project_notes'
-    ]
+    column_order = MASTER_COLUMNS
 
     df = df[column_order]
 
-    # Fix account numbers as strings
+    # Account numbers are already raw text from the workbook reader
     df['account_number'] = df['account_number'].astype('object')
 
     # Save
-    output_file = 'baito_2025_FIXED_v3.2.xlsx'
     print(f"\\n💾 Saving to: {output_file}")
 
-    with pd.ExcelWriter(output_file, engine='openpyxl') as writer:
-        df.to_excel(writer, sheet_name='All Candidates', index=False)
-
-        # Format account_number column as text
-        worksheet = writer.sheets['All Candidates']
-        for row in range(2, len(df) + 2):
-            cell = worksheet.cell(row=row, column=9)  # Column I (account_number)
-            if cell.value:
-                cell.number_format = '@'
-                cell.value = str(cell.value)
-
-        # Monthly summary
-        monthly = df.groupby('month').agg({
-            'project_name': 'nunique',
-            'full_name': 'count',
-            'total_payment': 'sum'
-        }).rename(columns={
-            'project_name': 'Projects',
-            'full_name': 'Records',
-            'total_payment': 'Total Payment (RM)'
-        })
-        monthly.to_excel(writer, sheet_name='Monthly Summary')
+    # Streamed in write-only mode: All Candidates + Monthly Summary in one pass
+    with span('write.master', file=output_file) as s:
+        s['rows'] = write_master_workbook(df.itertuples(index=False, name=None), output_file, column_order)
 
     print(f"\\n✅ COMPLETE!")
     print(f"   File: {output_file}")
     print(f"   Records: {len(df):,}")
     print(f"   Columns: {len(df.columns)} (ALL metadata included)")
-    print(f"   Sorted: Jan → Sep")
-
-    # Verification for Chan Chiu Ling
-    print(f"\\n🔍 VERIFICATION - Chan Chiu Ling (from Blackmores):")
-    chan_records = df[(df['full_name'] == 'Chan Chiu Ling') & (df['source_sheet'] == 'Blackmores')]
-    if len(chan_records) > 0:
-        for idx, record in chan_records.iterrows():
-            print(f"   Days: {record['days_worked']}")
-            print(f"   Wages: {record['total_wages']}")
-            print(f"   Total: {record['total_payment']}")
-            print(f"   Expected: days=5, total=650")
-    else:
-        print("   ⚠️ Chan Chiu Ling not found in extraction")
-    print()
+    print(f"   Sorted: {df['month'].iloc[0]} → {df['month'].iloc[-1]}")
+
+    return df
+
+
+def save_to_store(store_path, sources, partitions):
+    """Replace each source workbook's records in the payment store."""
+    by_file = {}
+    for df in partitions.values():
+        for source_file, group in df.groupby('source_file', sort=False, observed=True):
+            by_file[source_file] = frame_records(group)
+
+    with span('write.store', file=store_path) as s, PaymentStore(store_path) as store:
+        s['rows'] = sum(store.save_extraction(source, by_file.get(Path(source['path']).name, []))
+                        for source in sources)
+
+    print(f"\n📦 Stored {s['rows']:,} record(s) from {len(sources)} workbook(s) in {store_path}")
+
+
+def main():
+    """Main function."""
+    parser = argparse.ArgumentParser(description='Extract master lists for every workbook in the source manifest.')
+    parser.add_argument('--manifest', default=str(DEFAULT_MANIFEST), help='Source manifest JSON (default: payment_sources.json)')
+    parser.add_argument('--company', help='Only process this company (e.g. Baito, Zenevento)')
+    parser.add_argument('--year', type=int, help='Only process this year')
+    parser.add_argument('--workers', type=int, default=None, help='Worker processes (default: one per core)')
+    parser.add_argument('--store', help='Also save records to this SQLite payment store (e.g. payments.db)')
+    add_arguments(parser)
+    args = parser.parse_args()
+
+    with metrics_session(args.metrics, profile=args.profile):
+        run(args)
+
+
+def run(args):
+    """Extract every manifest source and write one master per company and year."""
+
+    print("="*120)
+    print(" "*30 + "FIXED EXTRACTION V3.2 - CONTINUATION ROW FIX")
+    print("="*120)
+
+    sources = resolve_sources(load_manifest(args.manifest), company=args.company, year=args.year)
+    print(f"\n📋 {len(sources)} source workbook(s) in {args.manifest}")
+
+    # cProfile only sees the main process
+    workers = 1 if args.profile else args.workers
+
+    # One partition (and one output file) per company and year
+    partitions = run_sources(sources, process_excel_fixed, workers=workers)
+
+    if args.store:
+        save_to_store(args.store, sources, partitions)
+
+    for (company, year), all_data in partitions.items():
+        print(f"\n{'='*120}")
+        print(f"{company} {year}: total records extracted: {len(all_data)}")
+        print(f"{'='*120}")
+
+        if all_data.empty:
+            continue
+
+        output_file = f"{company.lower()}_{year}_FIXED_v3.2.xlsx"
+        df = write_master(all_data, output_file)
+
+        # Verification for Chan Chiu Ling
+        print(f"\n🔍 VERIFICATION - Chan Chiu Ling (from Blackmores):")
+        chan_records = df[(df['full_name'] == 'Chan Chiu Ling') & (df['source_sheet'] == 'Blackmores')]
+        if len(chan_records) > 0:
+            for idx, record in chan_records.iterrows():
+                print(f"   Days: {record['days_worked']}")
+                print(f"   Wages: {record['total_wages']}")
+                print(f"   Total: {record['total_payment']}")
+                print(f"   Expected: days=5, total=650")
+        else:
+            print("   ⚠️ Chan Chiu Ling not found in extraction")
+        print()
 
 
 if __name__ == '__main__':
@@ -14,6 +14,8 @@ import numpy as np
 from collections import defaultdict
 import openpyxl
 
+from workbook_reader import clean_account, read_text_grid, overlay_text_columns
+
 
 def clean_ic_number(ic):
     """Clean and normalize IC number."""
@@ -45,30 +47,6 @@ def clean_bank_name(bank):
     return bank_str if bank_str else None
 
 
-def clean_account(account):
-    """Clean and normalize account number - FIX .0 issue."""
-    if pd.isna(account):
-        return None
-
-    # Convert to string first
-    account_str = str(account).strip()
-
-    # Handle scientific notation (e.g., 1.234567e+11)
-    try:
-        if 'e' in account_str.lower() or '.' in account_str:
-            # Convert to float first, then to int to remove decimals
-            account_num = float(account_str)
-            account_str = str(int(account_num))
-    except:
-        pass
-
-    # Remove spaces, hyphens, and any remaining .0
-    account_str = account_str.replace(' ', '').replace('-', '')
-    account_str = account_str.replace('.0', '').replace('.', '')
-
-    return account_str if account_str and account_str.isdigit() else None
-
-
 def safe_float(value):
     """Safely convert to float."""
     if pd.isna(value):
@@ -279,7 +257,6 @@ def process_excel_file_with_validation(excel_path):
         # Load workbook to get sheet names
         wb = openpyxl.load_workbook(excel_path, read_only=True, data_only=True)
         sheet_names = wb.sheetnames
-        wb.close()
 
         print(f"   Found {len(sheet_names)} sheet(s)")
 
@@ -298,6 +275,9 @@ def process_excel_file_with_validation(excel_path):
                 if not header_rows:
                     continue
 
+                # Raw cell text for account/IC columns (never coerced to float)
+                text_grid = read_text_grid(wb[sheet_name])
+
                 # Process each section in the sheet
                 for section_idx, header_row_idx in enumerate(header_rows):
                     # Read with proper headers
@@ -327,6 +307,9 @@ def process_excel_file_with_validation(excel_path):
                     if not name_cols or not ic_cols:
                         continue
 
+                    overlay_text_columns(section_df, text_grid, header_row_idx + 1,
+                                         [ic_cols[0], account_cols[0] if account_cols else None])
+
                     # Extract candidates
                     current_candidate = None
                     candidates = {}
@@ -408,6 +391,8 @@ def process_excel_file_with_validation(excel_path):
                 print(f"   ⚠️  Error in sheet '{sheet_name}': {e}")
                 continue
 
+        wb.close()
+
         print(f"   ✓ Extracted {len(all_data)} record(s)")
         if validation_log:
             print(f"   ⚠️  {len(validation_log)} validation issues (auto-corrected)")
@@ -0,0 +1,338 @@
+#!/usr/bin/env python3
+"""
+Payment Overlap Detector
+Flags double payments (same IC, project and dates in more than one place) and impossible schedules across the master list.
+"""
+
+import argparse
+import heapq
+import re
+import sys
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+import pandas as pd
+
+from mykad import decode_ics
+from source_manifest import MONTH_ALIASES, parse_month, parse_year
+from payment_store import read_master
+from run_metrics import span, start_span, end_span, add_arguments as add_metrics_arguments, metrics_session
+
+
+# "24-26th Jan 2025", "8 Feb- 2 March", "31May 2025", "9th July 2025 (Wednesday)"
+DAY = r'(\d{1,2})(?:st|nd|rd|th)?'
+MONTH = r'(' + '|'.join(sorted(MONTH_ALIASES, key=len, reverse=True)) + r')\.?'
+YEAR = r'(\d{4})'
+RANGE_PATTERN = re.compile(
+    rf'^{DAY}\s*(?:{MONTH})?\s*(?:{YEAR})?\s*(?:-|–|to)\s*{DAY}\s*(?:{MONTH})?\s*(?:{YEAR})?$', re.IGNORECASE)
+SINGLE_PATTERN = re.compile(rf'^{DAY}\s*(?:{MONTH})?\s*(?:{YEAR})?$', re.IGNORECASE)
+ISO_PATTERN = re.compile(r'^(\d{4})-(\d{1,2})-(\d{1,2})(?:[ T][\d:.]+)?$')
+SLASH_PATTERN = re.compile(r'^(\d{1,2})/(\d{1,2})(?:/(\d{2,4}))?$')
+NOISE_PATTERN = re.compile(r'\([^)]*\)|\bevery\s+\w+day\b|\bdate\s*:', re.IGNORECASE)
+
+# Longest plausible single booking; anything longer is a parse error, not a schedule
+MAX_INTERVAL_DAYS = 120
+
+
+def ic_keys(values):
+    """
+    Partition keys for a column of ICs: mykad.decode_ics' normalized text, None if too short to identify anyone.
+
+    Each distinct IC is normalized once, the same way as the store's IC index,
+    so a MyKad that lost its leading zero in Excel still meets its other records.
+    """
+    text = decode_ics(values)['ic']
+    return text.where(text.str.len() >= 6, None).tolist()
+
+
+def normalize_project(name):
+    """Case- and spacing-insensitive project key."""
+    if name is None or (isinstance(name, float) and name != name):
+        return ''
+    return ' '.join(str(name).lower().split())
+
+
+def _make_date(year, month, day):
+    try:
+        return date(int(year), int(month), int(day))
+    except (TypeError, ValueError):
+        return None
+
+
+def _parse_part(part, year, month):
+    """
+    Parse one date or range.
+
+    Returns: (start, end, month_seen) - dates may be None if month is still unknown;
+    month_seen tells the caller which month this part named (for '26 & 27 April').
+    """
+    iso = ISO_PATTERN.match(part)
+    if iso:
+        d = _make_date(*iso.groups())
+        return d, d, None
+
+    slash = SLASH_PATTERN.match(part)
+    if slash:
+        day, mon, yr = slash.groups()
+        yr = int(yr) + 2000 if yr and len(yr) == 2 else (yr or year)
+        d = _make_date(yr, mon, day)
+        return d, d, None
+
+    match = RANGE_PATTERN.match(part)
+    if match:
+        d1, m1, y1, d2, m2, y2 = match.groups()
+        mon2 = MONTH_ALIASES[m2.lower()] if m2 else month
+        mon1 = MONTH_ALIASES[m1.lower()] if m1 else mon2
+        yr2 = int(y2 or y1 or year)
+        yr1 = int(y1 or yr2)
+        if mon1 and mon2 and mon1 > mon2 and not y1:
+            yr1 = yr2 - 1  # "29 Dec - 2 Jan 2026"
+        return _make_date(yr1, mon1, d1), _make_date(yr2, mon2, d2), mon2 if m2 else None
+
+    match = SINGLE_PATTERN.match(part)
+    if match:
+        d1, m1, y1 = match.groups()
+        mon = MONTH_ALIASES[m1.lower()] if m1 else month
+        d = _make_date(y1 or year, mon, d1)
+        return d, d, MONTH_ALIASES[m1.lower()] if m1 else None
+
+    return None, None, None
+
+
+def parse_intervals(text, year, month=None):
+    """
+    Parse a work_dates or project_date_range cell into date intervals.
+
+    Args:
+        text: e.g. "2025-01-09, 2025-01-24", "29 June & 3-6 July (5 days)", "8 Feb- 2 March"
+        year: Year for dates that do not state one
+        month: Month number for bare days ("Date: 3")
+
+    Returns: list of (start, end) dates; unparseable parts are skipped
+    """
+    if text is None or (isinstance(text, float) and text != text) or not year:
+        return []
+
+    cleaned = NOISE_PATTERN.sub(' ', str(text))
+    parts = [' '.join(p.split()) for p in re.split(r'[,&;]|\band\b', cleaned, flags=re.IGNORECASE)]
+    parts = [p for p in parts if p]
+
+    # A part naming no month borrows the next part's month: "26 & 27 April"
+    parsed = [_parse_part(p, year, None) for p in parts]
+    intervals = []
+    for i, (start, end, _) in enumerate(parsed):
+        if start is None:
+            borrowed = next((m for _, _, m in parsed[i + 1:] if m), month)
+            start, end, _ = _parse_part(parts[i], year, borrowed)
+        if start and end and start <= end and (end - start).days <= MAX_INTERVAL_DAYS:
+            intervals.append((start, end))
+    return intervals
+
+
+def build_intervals(df, default_year):
+    """
+    Explode records into intervals.
+
+    Exact work_dates are used when present (precise=True); otherwise the
+    sheet's project_date_range, which only bounds when the person worked.
+
+    Returns: DataFrame with pos, ic, project, start, end, precise
+    """
+    cache = {}
+    rows = []
+
+    for pos, (ic_key, project, source_file, month, work_dates, date_range) in enumerate(zip(
+            ic_keys(df['ic_number']), df['project_name'], df['source_file'], df['month'],
+            df['work_dates'], df['project_date_range'])):
+        if not ic_key:
+            continue
+
+        year = parse_year(source_file) or default_year
+        month_num = parse_month(month)[0] if isinstance(month, str) else None
+
+        precise = True
+        key = (work_dates, year, month_num)
+        if key not in cache:
+            cache[key] = parse_intervals(work_dates, year, month_num)
+        intervals = cache[key]
+
+        if not intervals:
+            precise = False
+            key = (date_range, year, month_num)
+            if key not in cache:
+                cache[key] = parse_intervals(date_range, year, month_num)
+            intervals = cache[key]
+
+        project_key = normalize_project(project)
+        for start, end in intervals:
+            rows.append((pos, ic_key, project_key, start, end, precise))
+
+    return pd.DataFrame(rows, columns=['pos', 'ic', 'project', 'start', 'end', 'precise'])
+
+
+def overlapping_pairs(intervals):
+    """
+    Interval-overlap sweep per IC.
+
+    Intervals are hash-partitioned on IC, sorted by start, and swept with a
+    heap of active intervals ordered by end, so each candidate costs
+    O(n log n + overlaps) instead of comparing every pair.
+
+    Yields: (interval_a, interval_b) row positions in intervals, from different records, that overlap
+    """
+    ordered = intervals.sort_values(['ic', 'start', 'end'], kind='mergesort')
+    ics = ordered['ic'].to_numpy()
+    starts = ordered['start'].to_numpy()
+    ends = ordered['end'].to_numpy()
+    positions = ordered['pos'].to_numpy()
+    index = ordered.index.to_numpy()  # build_intervals uses a RangeIndex, so labels are positions
+
+    active = []
+    current_ic = None
+    for i in range(len(ordered)):
+        if ics[i] != current_ic:
+            current_ic = ics[i]
+            active = []
+
+        while active and active[0][0] < starts[i]:
+            heapq.heappop(active)
+
+        for _, j in active:
+            if positions[j] != positions[i]:
+                yield index[j], index[i]
+
+        heapq.heappush(active, (ends[i], i))
+
+
+def detect_overlaps(df, default_year=None):
+    """
+    Find double payments and schedule conflicts.
+
+    Returns: (issues DataFrame with one row per record pair and issue type, intervals DataFrame)
+    """
+    default_year = default_year or datetime.now().year
+    with span('overlaps.intervals', records=len(df)) as s:
+        intervals = build_intervals(df, default_year)
+        s['intervals'] = len(intervals)
+
+    positions = intervals['pos'].tolist()
+    projects = intervals['project'].tolist()
+    starts = intervals['start'].tolist()
+    ends = intervals['end'].tolist()
+    precise = intervals['precise'].tolist()
+    ic_of = dict(zip(positions, intervals['ic'].tolist()))
+
+    sweep = start_span('overlaps.sweep', intervals=len(intervals))
+    pairs = {}
+    for a, b in overlapping_pairs(intervals):
+        if projects[a] == projects[b]:
+            issue_type = 'DOUBLE_PAYMENT'
+        elif precise[a] and precise[b]:
+            issue_type = 'SCHEDULE_CONFLICT'
+        else:
+            continue  # A project's date range does not say which of its days this person worked
+
+        rec_a, rec_b = sorted((positions[a], positions[b]))
+        overlap_start = max(starts[a], starts[b])
+        overlap_end = min(ends[a], ends[b])
+        days = {overlap_start + timedelta(days=n) for n in range((overlap_end - overlap_start).days + 1)}
+
+        entry = pairs.setdefault((rec_a, rec_b, issue_type), {'days': set(), 'precise': True})
+        entry['days'] |= days
+        entry['precise'] = entry['precise'] and precise[a] and precise[b]
+    end_span(sweep, pairs=len(pairs))
+
+    rows = []
+    for (rec_a, rec_b, issue_type), entry in pairs.items():
+        a, b = df.iloc[rec_a], df.iloc[rec_b]
+        cross_file = a['source_file'] != b['source_file']
+
+        if issue_type == 'SCHEDULE_CONFLICT' or entry['precise'] or cross_file:
+            severity = 'HIGH'
+        else:
+            severity = 'MEDIUM'  # Same workbook, overlapping project ranges only
+
+        days = sorted(entry['days'])
+        rows.append({
+            'Type': issue_type,
+            'Severity': severity,
+            'IC': ic_of[rec_a],
+            'Name': a['full_name'],
+            'Overlap_Days': len(days),
+            'Overlap': f"{days[0]} → {days[-1]}" if len(days) > 1 else str(days[0]),
+            'Dates_Basis': 'work dates' if entry['precise'] else 'project date range',
+            'A_Month': a['month'], 'A_File': a['source_file'], 'A_Sheet': a['source_sheet'],
+            'A_Project': a['project_name'], 'A_Payment': a['total_payment'],
+            'B_Month': b['month'], 'B_File': b['source_file'], 'B_Sheet': b['source_sheet'],
+            'B_Project': b['project_name'], 'B_Payment': b['total_payment'],
+            'A_Row': rec_a + 2, 'B_Row': rec_b + 2,  # Row in All Candidates (after the header)
+        })
+
+    issues = pd.DataFrame(rows)
+    if len(issues):
+        issues = issues.sort_values(['Severity', 'Type', 'IC', 'A_Row'], kind='mergesort').reset_index(drop=True)
+    return issues, intervals
+
+
+def main():
+    """Main CLI entry point."""
+    parser = argparse.ArgumentParser(description='Detect double payments and overlapping schedules in the master list.')
+    parser.add_argument('masterlist', nargs='?', default='baito_2025_FIXED_v3.2.xlsx',
+                        help='Master list xlsx or payment store (.db)')
+    parser.add_argument('--year', type=int, help='Year for dates without one (default: from the source file name)')
+    parser.add_argument('--output', default='payment_overlap_report.xlsx')
+    add_metrics_arguments(parser)
+    args = parser.parse_args()
+
+    with metrics_session(args.metrics, args.profile):
+        return run(args)
+
+
+def run(args):
+    """Load the master list, detect overlaps and write the report."""
+    print("="*120)
+    print(" "*38 + "PAYMENT OVERLAP DETECTOR")
+    print("="*120)
+
+    if not Path(args.masterlist).exists():
+        print(f"❌ Error: {args.masterlist} not found!")
+        return 1
+
+    print(f"\n📂 Loading masterlist: {args.masterlist}")
+    df = read_master(args.masterlist).reset_index(drop=True)
+    print(f"   {len(df):,} records")
+
+    start = datetime.now()
+    issues, intervals = detect_overlaps(df, default_year=args.year)
+    elapsed = (datetime.now() - start).total_seconds()
+
+    precise = int(intervals['precise'].sum()) if len(intervals) else 0
+    print(f"\n   Intervals: {len(intervals):,} ({precise:,} from work dates, {len(intervals) - precise:,} from project ranges)")
+    print(f"   Candidates: {intervals['ic'].nunique() if len(intervals) else 0:,}")
+    print(f"   Checked in {elapsed:.2f}s")
+
+    print(f"\n{'='*120}")
+    print("RESULTS")
+    print(f"{'='*120}")
+    if not len(issues):
+        print("\n🎉 No double payments or schedule conflicts found.")
+        return 0
+
+    for (issue_type, severity), count in issues.groupby(['Type', 'Severity']).size().items():
+        print(f"   {'✗' if severity == 'HIGH' else '?'} {issue_type:20} {severity:8} {count:>5}")
+
+    print(f"\n  Sample (first 10):")
+    for r in issues.head(10).itertuples():
+        print(f"   {r.Type:18} {r.Name} ({r.IC}) {r.Overlap}: {r.A_Project} [{r.A_File}] ↔ {r.B_Project} [{r.B_File}]")
+
+    print(f"\n💾 Saving report: {args.output}")
+    with pd.ExcelWriter(args.output, engine='openpyxl') as writer:
+        issues.to_excel(writer, sheet_name='All Issues', index=False)
+        for issue_type, group in issues.groupby('Type'):
+            group.to_excel(writer, sheet_name=issue_type.title().replace('_', ' '), index=False)
+    print(f"   ✓ Report saved!")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
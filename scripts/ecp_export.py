@@ -0,0 +1,413 @@
+#!/usr/bin/env python3
+"""
+ECP Exporter
+Builds IBG/RENTAS ECP payment files from the master list, resolving free-text bank names to BIC codes.
+"""
+
+import argparse
+import re
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from source_manifest import parse_month
+from payment_store import read_master, parse_month_filter
+from payment_preflight import preflight, print_errors
+from payment_templates import START_ROW, load_template, part_path
+from run_metrics import span, add_arguments as add_metrics_arguments, metrics_session
+
+
+DEFAULT_TEMPLATE = Path(__file__).resolve().parent.parent / 'Payment' / 'IBG ECP' / 'ecp-excel-template.xlsx'
+
+# Payer is on Public Bank: its own accounts go intrabank, everything else IBG or RENTAS
+INTRABANK_BIC = 'PBBEMYKL'
+
+# (name, IBG BIC, RENTAS BIC, savings/current account lengths, aliases)
+# From ibg-members-bic-codes.pdf and rentas-members-bic-codes.pdf; aliases are what shows up in timesheets.
+BANKS = [
+    ('Public Bank Berhad', 'PBBEMYKL', 'PBBEMYKL', (10,), ['PUBLIC', 'PBB', 'PBE']),
+    ('Public Islamic Bank Berhad', 'PUIBMYKL', 'PUIBMYKL', (10,), ['PUBLIC ISLAMIC', 'PIBB', 'PB ISLAMIC', 'PBB ISLAMIC', 'PBE ISLAMIC']),
+    ('Affin Bank Berhad', 'PHBMMYKL', 'PHBMMYKL', (12,), ['AFFIN', 'ABB']),
+    ('Affin Islamic Bank Berhad', 'AIBBMYKL', 'AIBBMYKL', (12,), ['AFFIN ISLAMIC', 'ABB ISLAMIC']),
+    ('Agrobank Berhad', 'AGOBMYK1', 'AGOBMYKL', (16,), ['AGRO', 'AGROBANK', 'BPM', 'PERTANIAN']),
+    ('Alliance Bank Malaysia Berhad', 'MFBBMYKL', 'MFBBMYKL', (15,), ['ALLIANCE', 'ABMB']),
+    ('Alliance Islamic Bank Malaysia Berhad', 'ALSRMYK1', 'ALSRMYKL', (15,), ['ALLIANCE ISLAMIC', 'ABMB ISLAMIC']),
+    ('Al Rajhi Bank (Malaysia) Berhad', 'RJHIMYKL', 'RJHIMYKL', (15,), ['AL RAJHI', 'RAJHI']),
+    ('AmBank (M) Berhad', 'ARBKMYKL', 'ARBKMYKL', (13,), ['AMBANK', 'AMB']),
+    ('AmIslamic Bank (M) Berhad', 'AISLMYKL', 'AISLMYKL', (13,), ['AMISLAMIC', 'AMBANK ISLAMIC', 'AM ISLAMIC', 'AMB ISLAMIC']),
+    ('Bangkok Bank Berhad', 'BKKBMYKL', 'BKKBMYKL', (13,), ['BANGKOK']),
+    ('Bank Islam Malaysia Berhad', 'BIMBMYKL', 'BIMBMYKL', (14,), ['ISLAM', 'BIMB', 'BANK ISLAM']),
+    ('Bank Kerjasama Rakyat Malaysia Berhad', 'BKRMMYKL', 'BKRMMYKL', (12,), ['RAKYAT', 'KERJASAMA RAKYAT', 'BKRM']),
+    ('Bank Muamalat (Malaysia) Berhad', 'BMMBMYKL', 'BMMBMYKL', (14,), ['MUAMALAT', 'BMMB']),
+    ('Bank of America (Malaysia) Berhad', 'BOFAMY2X', 'BOFAMY2X', range(5, 18), ['AMERICA', 'BOFA']),
+    ('Bank of China (Malaysia) Berhad', 'BKCHMYKL', 'BKCHMYKL', (13, 15), ['CHINA', 'BOC']),
+    ('MUFG Bank (Malaysia) Berhad', 'BOTKMYKX', 'BOTKMYKX', (6,), ['MUFG']),
+    ('Bank Simpanan Nasional', 'BSNAMYK1', 'BSNAMYK1', (16,), ['BSN', 'SIMPANAN NASIONAL']),
+    ('BNP Paribas Malaysia Berhad', 'BNPAMYKL', 'BNPAMYKL', range(6, 17), ['BNP', 'PARIBAS', 'BNP PARIBAS']),
+    ('China Construction Bank (Malaysia) Berhad', 'PCBCMYKL', 'PCBCMYKL', (12,), ['CCB', 'CHINA CONSTRUCTION']),
+    ('CIMB Bank Berhad', 'CIBBMYKL', 'CIBBMYKL', (10, 14), ['CIMB', 'CIMB CLICKS']),
+    ('CIMB Islamic Bank Berhad', 'CTBBMYKL', 'CTBBMYKL', (10, 14), ['CIMB ISLAMIC']),
+    ('Citibank Berhad', 'CITIMYKL', 'CITIMYKL', range(9, 17), ['CITI', 'CITIBANK']),
+    ('Deutsche Bank (Malaysia) Berhad', 'DEUTMYKL', 'DEUTMYKL', range(10, 18), ['DEUTSCHE']),
+    ('Hong Leong Bank Berhad', 'HLBBMYKL', 'HLBBMYKL', (11, 13), ['HONG LEONG', 'HLB', 'HLBB']),
+    ('Hong Leong Islamic Bank Berhad', 'HLIBMYKL', 'HLIBMYKL', (11, 13), ['HONG LEONG ISLAMIC', 'HLISB', 'HLIB', 'HLB ISLAMIC', 'HLBB ISLAMIC']),
+    ('HSBC Bank Malaysia Berhad', 'HBMBMYKL', 'HBMBMYKL', (12, 13, 14, 15, 17), ['HSBC']),
+    ('HSBC Amanah Malaysia Berhad', 'HMABMYKL', 'HMABMYKL', (12, 13, 14, 15, 17), ['HSBC AMANAH', 'AMANAH']),
+    ('Industrial and Commercial Bank of China (Malaysia) Berhad', 'ICBKMYKL', 'ICBKMYKL', (19,), ['ICBC']),
+    ('JP Morgan Chase Bank Berhad', 'CHASMYKX', 'CHASMYKX', range(10, 18), ['JP MORGAN', 'JPMORGAN', 'CHASE']),
+    ('Kuwait Finance House (Malaysia) Berhad', 'KFHOMYKL', 'KFHOMYKL', (12,), ['KUWAIT FINANCE HOUSE', 'KFH']),
+    ('Malayan Banking Berhad', 'MBBEMYKL', 'MBBEMYKL', (12,), ['MAYBANK', 'MBB', 'MALAYAN', 'MAYBANK2U', 'M2U']),
+    ('Maybank Islamic Berhad', 'MBISMYKL', 'MBISMYKL', (12,), ['MAYBANK ISLAMIC', 'MBB ISLAMIC', 'MIB']),
+    ('MBSB Bank Berhad', 'AFBQMYKL', 'AFBQMYKL', (16,), ['MBSB']),
+    ('Mizuho Bank (Malaysia) Berhad', 'MHCBMYKA', 'MHCBMYKA', (10,), ['MIZUHO']),
+    ('OCBC Bank (Malaysia) Berhad', 'OCBCMYKL', 'OCBCMYKL', range(9, 18), ['OCBC']),
+    ('OCBC Al-Amin Bank Berhad', 'OABBMYKL', 'OABBMYKL', range(9, 18), ['OCBC AL AMIN', 'AL AMIN']),
+    ('RHB Bank Berhad', 'RHBBMYKL', 'RHBBMYKL', (14,), ['RHB']),
+    ('RHB Islamic Bank Berhad', 'RHBAMYKL', 'RHBAMYKL', (14,), ['RHB ISLAMIC']),
+    ('Standard Chartered Bank (Malaysia) Berhad', 'SCBLMYKX', 'SCBLMYKX', range(5, 18), ['STANDARD CHARTERED', 'SCB', 'STANCHART']),
+    ('Standard Chartered Saadiq Berhad', 'SCSRMYK1', 'SCSRMYKK', range(5, 18), ['STANDARD CHARTERED SAADIQ', 'SAADIQ']),
+    ('Sumitomo Mitsui Banking Corporation Malaysia Berhad', 'SMBCMYKL', 'SMBCMYKL', (8,), ['SUMITOMO', 'SMBC']),
+    ('United Overseas Bank (Malaysia) Berhad', 'UOVBMYKL', 'UOVBMYKL', (7, 9, 10, 11, 12, 13, 14, 17), ['UOB', 'UNITED OVERSEAS']),
+]
+
+# Words that never tell two banks apart
+NOISE_WORDS = {'BANK', 'BANKING', 'BERHAD', 'BHD', 'MALAYSIA', 'MSIA', 'M', 'MY', 'THE', 'OF', 'AND', 'LTD',
+               'LIMITED', 'CORPORATION', 'CORP', 'CO', 'SDN'}
+
+# ECP template columns A-U
+ECP_COLUMNS = ['payment_type', 'account', 'bic', 'name', 'id_type', 'id_number', 'amount', 'reference', 'details',
+               'email1', 'email2', 'mobile1', 'mobile2', 'joint_name', 'joint_id', 'joint_id_type',
+               'email_line1', 'email_line2', 'email_line3', 'email_line4', 'email_line5']
+
+NAME_LIMIT = 120
+REFERENCE_LIMIT = 20
+
+
+def bank_tokens(text):
+    """Significant words of a bank name: upper-case, '&' -> AND, punctuation and noise words dropped."""
+    words = re.sub(r'[^A-Z0-9]+', ' ', str(text).upper().replace('&', ' AND ')).split()
+    return tuple(w for w in words if w not in NOISE_WORDS)
+
+
+class BankDirectory:
+    """
+    Free-text bank name -> bank, through an index of normalized names, aliases and BICs.
+
+    Exact keys are a dict lookup. Otherwise the longest alias whose words all
+    appear in the name wins ('CIMB Islamic Bank Bhd' -> CIMB Islamic, not
+    CIMB), found through a word -> aliases index. Results are cached per raw
+    string, so a master list costs one resolution per distinct spelling.
+    """
+
+    def __init__(self, banks=BANKS):
+        self.banks = []
+        self.ibg_bics = set()
+        self.rentas_bics = set()
+        self.exact = {}
+        self.by_word = {}
+        for name, ibg_bic, rentas_bic, lengths, aliases in banks:
+            bank = {'name': name, 'ibg_bic': ibg_bic, 'rentas_bic': rentas_bic, 'lengths': frozenset(lengths)}
+            self.banks.append(bank)
+            self.ibg_bics.add(ibg_bic)
+            self.rentas_bics.add(rentas_bic)
+            for alias in [name, *aliases]:
+                tokens = bank_tokens(alias)
+                if not tokens:
+                    continue
+                self.exact.setdefault(' '.join(tokens), bank)
+                self.exact.setdefault(''.join(tokens), bank)
+                entry = (frozenset(tokens), len(''.join(tokens)), bank)
+                for word in tokens:
+                    self.by_word.setdefault(word, []).append(entry)
+            for bic in {ibg_bic, rentas_bic}:
+                self.exact.setdefault(bic, bank)
+        self._cache = {}
+
+    def resolve(self, text):
+        """Bank dict for a free-text bank name or BIC, or None."""
+        if text is None or (isinstance(text, float) and text != text):
+            return None
+        if text in self._cache:
+            return self._cache[text]
+
+        tokens = bank_tokens(text)
+        bank = self.exact.get(' '.join(tokens)) or self.exact.get(''.join(tokens))
+        if bank is None and len(''.join(tokens)) in (8, 11):
+            bank = self.exact.get(''.join(tokens)[:8])
+        if bank is None and tokens:
+            words = set(tokens)
+            best = None
+            for word in words:
+                for alias_words, size, candidate in self.by_word.get(word, ()):
+                    if alias_words <= words and (best is None or (len(alias_words), size) > best[:2]):
+                        best = (len(alias_words), size, candidate)
+            bank = best[2] if best else None
+
+        self._cache[text] = bank
+        return bank
+
+    def lengths(self, bic):
+        """Valid savings/current account lengths for a bank's BIC."""
+        return self.exact[bic]['lengths']
+
+
+def account_digits(values):
+    """Account numbers as digit strings ('1234-5678 90' -> '1234567890', 1.2e9 floats -> integers)."""
+    text = values.astype(object).where(values.notna(), '')
+    text = text.map(lambda v: str(int(v)) if isinstance(v, float) and v.is_integer() else str(v))
+    return text.str.replace(r'\.0$', '', regex=True).str.replace(r'\D', '', regex=True)
+
+
+def clean_text(values, limit):
+    """
+    Letters, digits and spaces only, single-spaced and cut to the template's field length.
+
+    Names, projects and months repeat, so each distinct value is cleaned once.
+    """
+    codes, uniques = pd.factorize(values.fillna('').astype(str))
+    cleaned = (pd.Series(uniques, dtype=object).str.replace(r'[^A-Za-z0-9 ]+', ' ', regex=True)
+               .str.replace(r'\s+', ' ', regex=True).str.strip().str[:limit].str.strip())
+    return pd.Series(cleaned.to_numpy(dtype=object)[codes], index=values.index, dtype=object)
+
+
+def id_type(id_numbers):
+    """ECP ID type: NI for 12-digit MyKad numbers, PP for other IDs, blank when missing."""
+    return np.select([id_numbers.str.fullmatch(r'\d{12}'), id_numbers != ''], ['NI', 'PP'], '')
+
+
+def build_payments(df, per='candidate'):
+    """
+    One payment per candidate (IC + account, summed over projects) or per master-list record.
+
+    Returns: DataFrame with ic, name, bank_name, account, amount, reference, details
+             (plus record_ids, space-separated, when the master came from the store)
+    """
+    ic = df['ic_number'].fillna('').astype(str).str.replace(r'[\s\-]', '', regex=True).str.replace(r'\.0$', '', regex=True)
+    frame = pd.DataFrame({
+        # 11 digits is a MyKad that lost its leading zero in Excel
+        'ic': ic.str.replace(r'^(\d{11})$', r'0\1', regex=True),
+        'name': df['full_name'],
+        'bank_name': df['bank_name'],
+        'account': account_digits(df['account_number']),
+        'amount': pd.to_numeric(df['total_payment'], errors='coerce').fillna(0),
+        'project': df['project_name'].fillna('').astype(str),
+        'month': df['month'].fillna('').astype(str),
+    })
+    if 'record_id' in df.columns:
+        frame['record_ids'] = df['record_id'].astype('Int64').astype(str)
+    if per == 'candidate':
+        keys = ['ic', 'account']
+        aggregates = dict(
+            name=('name', 'first'), bank_name=('bank_name', 'first'), amount=('amount', 'sum'),
+            project=('project', 'first'), projects=('project', 'nunique'), month=('month', 'first'))
+        if 'record_ids' in frame.columns:
+            aggregates['record_ids'] = ('record_ids', 'first')
+        grouped = frame.groupby(keys, sort=False).agg(**aggregates)
+        grouped.loc[grouped['projects'] > 1, 'project'] = ''
+        # Built-in aggregates only; month labels and record ids are joined just for candidates with several records
+        months = frame.drop_duplicates(keys + ['month'])
+        months = months[months.duplicated(keys, keep=False)]
+        if len(months):
+            joined = months.groupby(keys, sort=False)['month'].agg(' '.join)
+            grouped.loc[joined.index, 'month'] = joined
+        if 'record_ids' in frame.columns:
+            several = frame[frame.duplicated(keys, keep=False)]
+            if len(several):
+                joined = several.groupby(keys, sort=False)['record_ids'].agg(' '.join)
+                grouped.loc[joined.index, 'record_ids'] = joined
+        frame = grouped.drop(columns='projects').reset_index()
+    frame['amount'] = frame['amount'].round(2)
+    frame['reference'] = clean_text(frame['project'].where(frame['project'] != '', 'BAITO ' + frame['month']), REFERENCE_LIMIT)
+    frame['details'] = clean_text('PAYROLL ' + frame['month'], REFERENCE_LIMIT)
+    return frame
+
+
+def prepare_ecp(payments, directory, rentas_above=None):
+    """
+    Resolve banks, validate accounts and lay payments out as ECP rows.
+
+    Args:
+        payments: build_payments() output
+        directory: BankDirectory
+        rentas_above: Amounts above this go by RENTAS instead of IBG
+
+    Returns: (rows DataFrame in ECP_COLUMNS order, rejected DataFrame with a reason per payment),
+             both indexed like payments
+    """
+    distinct = payments['bank_name'].drop_duplicates()
+    resolved = dict(zip(distinct, map(directory.resolve, distinct)))
+    banks = payments['bank_name'].map(resolved)
+
+    known = banks.notna()
+    rentas = (payments['amount'] > rentas_above) if rentas_above else pd.Series(False, index=payments.index)
+    ibg_bic = banks.map(lambda b: b['ibg_bic'] if b else None)
+    bic = ibg_bic.where(~rentas, banks.map(lambda b: b['rentas_bic'] if b else None))
+
+    # Length check per bank: a handful of groups, each a vectorized isin
+    length = payments['account'].str.len()
+    length_ok = pd.Series(False, index=payments.index)
+    for code, index in ibg_bic[known].groupby(ibg_bic[known]).groups.items():
+        length_ok[index] = length[index].isin(directory.lengths(code))
+
+    reason = np.select(
+        [~known, payments['account'] == '', ~length_ok, payments['amount'] <= 0],
+        ['UNKNOWN_BANK', 'NO_ACCOUNT', 'ACCOUNT_LENGTH', 'NO_AMOUNT'], '')
+    ok = reason == ''
+
+    rejected = payments.loc[~ok, ['ic', 'name', 'bank_name', 'account', 'amount']].copy()
+    rejected['reason'] = reason[~ok]
+    rejected['expected_lengths'] = ibg_bic[~ok].map(
+        lambda code: ', '.join(map(str, sorted(directory.lengths(code)))) if isinstance(code, str) else '')
+
+    good = payments[ok]
+    rows = pd.DataFrame('', index=good.index, columns=ECP_COLUMNS)
+    rows['payment_type'] = np.where(ibg_bic[ok] == INTRABANK_BIC, 'PBB', np.where(rentas[ok], 'REN', 'IBG'))
+    rows['account'] = good['account']
+    rows['bic'] = bic[ok]
+    rows['name'] = clean_text(good['name'], NAME_LIMIT)
+    rows['id_number'] = good['ic']
+    rows['id_type'] = id_type(good['ic'])
+    rows['amount'] = good['amount']
+    rows['reference'] = good['reference']
+    rows['details'] = good['details']
+    return rows, rejected
+
+
+def write_manifest(path, written, rows, payments):
+    """
+    Batch manifest CSV: one line per written payment with its file and sheet row.
+
+    payment_reconcile.py joins bank return files to this, and uses record_ids
+    (store masters only) to write payment statuses back to the records.
+    """
+    manifest = pd.DataFrame({
+        'file': np.repeat([Path(p).name for p, _, _ in written], [n for _, n, _ in written]),
+        'row': np.concatenate([np.arange(START_ROW, START_ROW + n) for _, n, _ in written]),
+        'payment_type': rows['payment_type'].to_numpy(),
+        'recipient_id': rows['id_number'].to_numpy(),
+        'name': rows['name'].to_numpy(),
+        'bic': rows['bic'].to_numpy(),
+        'account': rows['account'].to_numpy(),
+        'amount': rows['amount'].to_numpy(),
+        'reference': rows['reference'].to_numpy(),
+        'record_ids': payments.loc[rows.index, 'record_ids'].to_numpy() if 'record_ids' in payments.columns else '',
+    })
+    manifest.to_csv(path, index=False)
+    return path
+
+
+def write_ecp_files(template_path, output_path, rows, payment_date, max_rows=None):
+    """
+    Write ECP rows into the cached template, split every max_rows payments.
+
+    Returns: list of (path, rows, total) per file written
+    """
+    template = load_template(template_path)
+    records = list(rows.itertuples(index=False, name=None))
+    size = max_rows or len(records) or 1
+    written = []
+
+    for part, first in enumerate(range(0, len(records), size), 1):
+        chunk = records[first:first + size]
+        path = part_path(output_path, part) if max_rows else Path(output_path)
+        with span('ecp.file', part=part, rows=len(chunk)):
+            template.render(path, chunk, {'B1': payment_date})
+        total = round(sum(r[6] for r in chunk), 2)
+        written.append((path, len(chunk), total))
+        print(f"   ✓ {path.name}: {len(chunk):,} payment(s), RM {total:,.2f}")
+
+    return written
+
+
+def main():
+    """Main CLI entry point."""
+    parser = argparse.ArgumentParser(description='Build IBG/RENTAS ECP payment files from the master list.')
+    parser.add_argument('masterlist', nargs='?', default='baito_2025_FIXED_v3.2.xlsx',
+                        help='Master list xlsx or payment store (.db)')
+    parser.add_argument('--output', default='ecp_payments.xlsx', help='Output xlsx (numbered when splitting)')
+    parser.add_argument('--template', default=str(DEFAULT_TEMPLATE), help='ECP Excel template')
+    parser.add_argument('--payment-date', default=datetime.now().strftime('%d/%m/%Y'), help='DD/MM/YYYY (default: today)')
+    parser.add_argument('--month', action='append', help='Only these months (name or Q1-Q4, repeatable)')
+    parser.add_argument('--project', help='Only projects containing this text')
+    parser.add_argument('--per', choices=['candidate', 'record'], default='candidate',
+                        help='One payment per candidate (summed) or per master-list record')
+    parser.add_argument('--rentas-above', type=float, help='Pay amounts above this (RM) by RENTAS instead of IBG')
+    parser.add_argument('--max-rows', type=int, help='Split output after this many payments per file')
+    parser.add_argument('--expected-total', type=float,
+                        help='Control total (RM) the files must add up to (default: master list payroll less rejects)')
+    parser.add_argument('--skip-preflight', action='store_true', help='Write files without the pre-flight checks')
+    add_metrics_arguments(parser)
+    args = parser.parse_args()
+
+    with metrics_session(args.metrics, args.profile):
+        return run(args)
+
+
+def run(args):
+    """Load the master list, resolve banks, validate and write the ECP files."""
+    print("="*120)
+    print(" "*48 + "ECP EXPORTER")
+    print("="*120)
+
+    if not Path(args.masterlist).exists():
+        print(f"❌ Error: {args.masterlist} not found!")
+        return 1
+
+    started = time.perf_counter()
+    print(f"\n📂 Loading masterlist: {args.masterlist}")
+    df = read_master(args.masterlist)
+    if args.month:
+        months = parse_month_filter(args.month)
+        df = df[df['month'].map(lambda label: parse_month(label)[0] in months)]
+    if args.project:
+        df = df[df['project_name'].fillna('').str.contains(args.project, case=False, regex=False)]
+    print(f"   {len(df):,} records")
+
+    with span('ecp.prepare', records=len(df)):
+        payments = build_payments(df, args.per)
+        directory = BankDirectory()
+        rows, rejected = prepare_ecp(payments, directory, args.rentas_above)
+
+    print(f"\n🏦 {len(payments):,} payment(s): {len(rows):,} ready, {len(rejected):,} rejected")
+    for payment_type, group in rows.groupby('payment_type'):
+        print(f"   {payment_type:4} {len(group):>7,}  RM {group['amount'].sum():>14,.2f}")
+    for reason, group in rejected.groupby('reason'):
+        print(f"   ✗ {reason:15} {len(group):>5,}  e.g. {group['bank_name'].iloc[0]} {group['account'].iloc[0]}")
+
+    if not args.skip_preflight and len(rows):
+        expected = args.expected_total
+        if expected is None:
+            expected = round(pd.to_numeric(df['total_payment'], errors='coerce').fillna(0).sum() - rejected['amount'].sum(), 2)
+        with span('ecp.preflight', rows=len(rows)):
+            errors = preflight(rows, 'ecp', args.payment_date, expected, directory=directory)
+        if len(errors):
+            print_errors(errors)
+            errors_path = Path(args.output).with_name(f"{Path(args.output).stem}_preflight.xlsx")
+            errors.to_excel(errors_path, index=False)
+            print(f"\n💾 Error table saved: {errors_path} - no ECP files written")
+            return 1
+        print(f"\n✓ Pre-flight passed: {len(rows):,} row(s), control total RM {expected:,.2f}")
+
+    if len(rows):
+        print(f"\n💾 Writing ECP file(s):")
+        written = write_ecp_files(args.template, args.output, rows, args.payment_date, args.max_rows)
+        manifest_path = write_manifest(Path(args.output).with_name(f"{Path(args.output).stem}_batch.csv"),
+                                       written, rows, payments)
+        print(f"   ✓ {manifest_path.name}: batch manifest for payment_reconcile.py")
+
+    if len(rejected):
+        rejected_path = Path(args.output).with_name(f"{Path(args.output).stem}_rejected.xlsx")
+        rejected.to_excel(rejected_path, index=False)
+        print(f"\n⚠️  Rejected payments saved: {rejected_path}")
+
+    elapsed = time.perf_counter() - started
+    print(f"\n✓ {len(rows):,} payment(s), RM {rows['amount'].sum():,.2f} in {elapsed:.2f}s")
+    return 0 if len(rows) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -19,6 +19,9 @@ from pathlib import Path
 from datetime import datetime
 from typing import Dict, List, Any, Optional
 
+from run_metrics import span, incr, add_arguments, metrics_session
+from payment_store import PaymentStore
+
 # Configuration
 OPENROUTER_API_KEY = os.environ.get('OPENROUTER_API_KEY', '')  # Get from environment variable
 OPENROUTER_URL = "https://openrouter.ai/api/v1/chat/completions"
@@ -68,7 +71,10 @@ def call_gemini(image_data_url: str, prompt: str) -> str:
         }]
     }
 
-    response = requests.post(OPENROUTER_URL, headers=headers, json=payload, timeout=180)
+    with span('http.post', endpoint=OPENROUTER_URL, model=MODEL, vision=True) as s:
+        response = requests.post(OPENROUTER_URL, headers=headers, json=payload, timeout=180)
+        s['status'] = response.status_code
+        s['response_bytes'] = len(response.content)
     response.raise_for_status()
     result = response.json()
     return result['choices'][0]['message']['content']
@@ -76,6 +82,8 @@ def call_gemini(image_data_url: str, prompt: str) -> str:
 
 def extract_json(text: str) -> Any:
     """Extract JSON from AI response (handles markdown)"""
+    incr('json_parses')
+
     # Try markdown code blocks
     json_match = re.search(r'```json\n([\s\S]*?)\n```', text)
     if json_match:
@@ -280,7 +288,10 @@ Return JSON:
         }]
     }
 
-    response = requests.post(OPENROUTER_URL, headers=headers, json=payload, timeout=120)
+    with span('http.post', endpoint=OPENROUTER_URL, model=MODEL, vision=False) as s:
+        response = requests.post(OPENROUTER_URL, headers=headers, json=payload, timeout=120)
+        s['status'] = response.status_code
+        s['response_bytes'] = len(response.content)
     response.raise_for_status()
     result = response.json()
     return extract_json(result['choices'][0]['message']['content'])
@@ -344,25 +355,33 @@ def process_excel_file(filename: str) -> Dict:
 
     try:
         # Extract embedded images (receipts)
-        receipts = extract_images_from_excel(excel_path, RECEIPTS_DIR)
+        with span('vision.receipts', file=filename) as s:
+            receipts = extract_images_from_excel(excel_path, RECEIPTS_DIR)
+            s['images'] = len(receipts)
 
         # Convert screenshot to data URL
         image_data_url = image_to_data_url(image_path)
 
         # Phase 1: Structure Analysis
-        structure = phase1_structure_analysis(image_data_url)
+        with span('vision.phase1_structure', file=filename) as s:
+            structure = phase1_structure_analysis(image_data_url)
+            s['tables'] = structure.get('tableCount', 0)
         print(f"    ✓ Found {structure.get('tableCount', 0)} table(s)")
 
         time.sleep(5)  # Rate limit delay
 
         # Phase 2: Extract Candidates
-        candidates = phase2_extract_candidates(image_data_url, structure)
+        with span('vision.phase2_extract', file=filename) as s:
+            candidates = phase2_extract_candidates(image_data_url, structure)
+            s['records'] = len(candidates)
         print(f"    ✓ Extracted {len(candidates)} candidate(s)")
 
         time.sleep(5)
 
         # Phase 3: Verify
-        verification = phase3_verify_data(candidates)
+        with span('vision.phase3_verify', file=filename) as s:
+            verification = phase3_verify_data(candidates)
+            s['issues'] = len(verification.get('issues') or [])
         print(f"    ✓ Verified: {verification.get('validRecords', 0)}/{verification.get('totalRecords', 0)} valid")
 
         if verification.get('issues'):
@@ -371,7 +390,9 @@ def process_excel_file(filename: str) -> Dict:
             time.sleep(5)
 
             # Phase 4: Auto-correct
-            candidates = phase4_auto_correct(candidates, verification, image_data_url)
+            with span('vision.phase4_correct', file=filename) as s:
+                candidates = phase4_auto_correct(candidates, verification, image_data_url)
+                s['records'] = len(candidates)
             print(f"    ✓ Auto-correction complete")
 
         # Add source tracking
@@ -523,6 +544,21 @@ def generate_masterlist_excel(all_results: List[Dict]):
 
 def main():
     """Main execution"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Extract candidates from Excel screenshots with Gemini vision.')
+    parser.add_argument('--store', help='Also save each result to this SQLite payment store (e.g. payments.db)')
+    add_arguments(parser)
+    args = parser.parse_args()
+
+    with metrics_session(args.metrics, profile=args.profile):
+        run(args.store)
+
+
+def run(store_path=None):
+    """Process every configured file and build the masterlist"""
+    store = PaymentStore(store_path) if store_path else None
+
     print("="*60)
     print("COMPLETE EXCEL EXTRACTION WORKFLOW")
     print("Using: Gemini 2.0 Flash via OpenRouter")
@@ -544,6 +580,9 @@ def main():
         with open(result_file, 'w') as f:
             json.dump(result, f, indent=2)
 
+        if store:
+            store.save_vision_result(result)
+
         time.sleep(15)  # Rate limit delay between files
 
     # Generate masterlist
@@ -569,6 +608,10 @@ def main():
     print(f"\nMasterlist: {MASTERLIST_FILE}")
     print(f"Receipts: {RECEIPTS_DIR}")
 
+    if store:
+        print(f"Store: {store.path}")
+        store.close()
+
 
 if __name__ == '__main__':
     main()
@@ -5,11 +5,76 @@ Fills the Excel template with payment data while preserving ALL formatting
 """
 
 import sys
+import csv
 import json
-import openpyxl
-from openpyxl.utils import get_column_letter
+import itertools
+import time
+import argparse
+from pathlib import Path
 from datetime import datetime
 
+import pandas as pd
+
+from payment_preflight import preflight, print_errors
+from payment_templates import START_ROW, load_template, part_path
+from run_metrics import span, add_arguments as add_metrics_arguments, metrics_session
+
+# Template columns A-K: (payment key, default)
+COLUMNS = [
+    ('paymentType', 'DTN'),     # A: Payment Type
+    ('idType', 'NI'),           # B: ID Type code
+    ('bic', ''),                # C: BIC (empty for DuitNow)
+    ('recipientId', ''),        # D: Recipient's DuitNow ID
+    ('amount', ''),             # E: Payment Amount
+    ('reference', ''),          # F: Recipient Reference
+    ('paymentDetails', ''),     # G: Other Payment Details
+    ('email1', ''),             # H: Email 1
+    ('email2', ''),             # I: Email 2
+    ('mobile1', ''),            # J: Mobile 1
+    ('mobile2', ''),            # K: Mobile 2
+]
+
+READ_CHUNK = 1 << 16
+
+# Batch manifest (<output>_batch.csv) for payment_reconcile.py, one line per payment
+MANIFEST_COLUMNS = ['file', 'row', 'payment_type', 'id_type', 'recipient_id', 'amount', 'reference', 'record_ids']
+
+
+def payment_row(payment):
+    """Template row (columns A-K) for one payment."""
+    return tuple(payment.get(key, default) for key, default in COLUMNS)
+
+
+def payment_record_ids(payment):
+    """Payment store record ids a payment carries ('recordIds': list or space-separated), as manifest text."""
+    ids = payment.get('recordIds') or ''
+    if isinstance(ids, (list, tuple)):
+        ids = ' '.join(str(i) for i in ids)
+    return str(ids)
+
+
+def payment_cents(payment):
+    """Payment amount in sen, so split totals don't drift."""
+    try:
+        return round(float(payment.get('amount') or 0) * 100)
+    except (TypeError, ValueError):
+        return 0
+
+
+def check_batch(payments, payment_date=None, expected_total=None):
+    """Pre-flight errors for a list of payments (empty DataFrame when the batch is clean)."""
+    batch = pd.DataFrame([payment_row(p) for p in payments], columns=[key for key, _ in COLUMNS])
+    return preflight(batch, 'duitnow', payment_date, expected_total)
+
+
+def report_errors(errors, output_path):
+    """Print the error table and save it next to the output that was not written."""
+    print_errors(errors)
+    errors_path = Path(output_path).with_name(f"{Path(output_path).stem}_preflight.xlsx")
+    errors.to_excel(errors_path, index=False)
+    print(f"\n💾 Error table saved: {errors_path} - no DuitNow files written")
+
+
 def fill_duitnow_template(template_path, output_path, payment_data):
     """
     Fill DuitNow template with payment data
@@ -19,70 +84,209 @@ def fill_duitnow_template(template_path, output_path, payment_data):
         output_path: Path where to save the filled Excel
         payment_data: Dict with 'paymentDate' and 'payments' array
     """
-    # Load template (this preserves ALL formatting automatically)
-    wb = openpyxl.load_workbook(template_path)
-    ws = wb.active
+    # Cached template (this preserves ALL formatting automatically)
+    template = load_template(template_path)
 
-    # Fill payment date in A2 (or wherever it should go based on template)
+    # Payment date goes in B1, next to the 'PAYMENT DATE :' label
     payment_date = payment_data.get('paymentDate', datetime.now().strftime('%d/%m/%Y'))
 
-    # Check if B1 exists for payment date
-    if ws['B1'].value is None:
-        ws['A2'] = payment_date
-    else:
-        ws['B1'] = payment_date
+    template.render(output_path, [payment_row(p) for p in payment_data['payments']], {'B1': payment_date})
+    print(f"✓ Successfully created: {output_path}")
+
+
+def iter_payments(stream, meta=None):
+    """
+    Stream payments from a JSON array, JSON lines, or a {'paymentDate', 'payments'} object.
 
-    # Start filling data from row 4 (after headers and specs in rows 1-3)
-    start_row = 4
+    Arrays and JSON lines are decoded one object at a time from fixed-size
+    chunks, so a batch never has to fit in memory as text. A wrapper object's
+    paymentDate is stored in `meta`.
+    """
+    decoder = json.JSONDecoder()
+    buffer = stream.read(READ_CHUNK)
+    pos = 0
+    in_array = False
+    eof = not buffer
 
-    for idx, payment in enumerate(payment_data['payments']):
-        row_num = start_row + idx
+    while True:
+        # Skip whitespace and array punctuation between objects
+        while pos < len(buffer) and buffer[pos] in ' \t\r\n,[]':
+            if buffer[pos] == '[':
+                in_array = True
+            pos += 1
 
-        # Column A: Payment Type
-        ws[f'A{row_num}'] = payment.get('paymentType', 'DTN')
+        if pos >= len(buffer):
+            if eof:
+                return
+            buffer, pos = stream.read(READ_CHUNK), 0
+            eof = not buffer
+            continue
 
-        # Column B: ID Type code
-        ws[f'B{row_num}'] = payment.get('idType', 'NI')
+        try:
+            obj, end = decoder.raw_decode(buffer, pos)
+        except json.JSONDecodeError:
+            # Object split across chunks - read more and retry
+            more = stream.read(READ_CHUNK)
+            if not more:
+                raise
+            buffer, pos = buffer[pos:] + more, 0
+            continue
 
-        # Column C: BIC (empty for DuitNow)
-        ws[f'C{row_num}'] = payment.get('bic', '')
+        pos = end
+        if not in_array and isinstance(obj, dict) and 'payments' in obj:
+            if meta is not None:
+                meta['paymentDate'] = obj.get('paymentDate')
+            yield from obj['payments']
+        else:
+            yield obj
 
-        # Column D: Recipient's DuitNow ID
-        ws[f'D{row_num}'] = payment.get('recipientId', '')
 
-        # Column E: Payment Amount
-        ws[f'E{row_num}'] = payment.get('amount', '')
+def read_payments(stream):
+    """(meta, payments) for a payment stream, primed so meta already holds any paymentDate."""
+    meta = {}
+    payments = iter_payments(stream, meta)
+    first = next(payments, None)
+    if first is None:
+        return meta, iter(())
+    return meta, itertools.chain([first], payments)
 
-        # Column F: Recipient Reference
-        ws[f'F{row_num}'] = payment.get('reference', '')
 
-        # Column G: Other Payment Details
-        ws[f'G{row_num}'] = payment.get('paymentDetails', '')
+def split_batches(payments, max_rows=None, max_amount=None):
+    """
+    Group payments into output files under a row limit and/or amount cap.
 
-        # Column H: Email 1
-        ws[f'H{row_num}'] = payment.get('email1', '')
+    A payment that alone exceeds the amount cap goes into a file by itself.
 
-        # Column I: Email 2
-        ws[f'I{row_num}'] = payment.get('email2', '')
+    Yields: (rows, total_cents, record_ids) per file
+    """
+    cap = round(max_amount * 100) if max_amount else None
+    rows, total, record_ids = [], 0, []
+    for payment in payments:
+        cents = payment_cents(payment)
+        if rows and ((max_rows and len(rows) >= max_rows) or (cap is not None and total + cents > cap)):
+            yield rows, total, record_ids
+            rows, total, record_ids = [], 0, []
+        rows.append(payment_row(payment))
+        record_ids.append(payment_record_ids(payment))
+        total += cents
+    if rows:
+        yield rows, total, record_ids
 
-        # Column J: Mobile 1
-        ws[f'J{row_num}'] = payment.get('mobile1', '')
 
-        # Column K: Mobile 2
-        ws[f'K{row_num}'] = payment.get('mobile2', '')
+def fill_duitnow_batch(template_path, output_path, payments, payment_date=None, max_rows=None, max_amount=None,
+                       manifest_path=None):
+    """
+    Fill one or more DuitNow files from a payment stream.
 
-    # Save the filled template
-    wb.save(output_path)
-    print(f"✓ Successfully created: {output_path}")
+    The template is parsed once per process (payment_templates); with a row
+    limit or amount cap the output is split into <output>_001.xlsx, <output>_002.xlsx, ...
+    With manifest_path, each payment's file, row and record ids are written to
+    a batch manifest as the files go out, so payment_reconcile.py can write
+    bank statuses back to the store.
 
-if __name__ == '__main__':
-    if len(sys.argv) < 4:
-        print("Usage: python3 fill-duitnow-template.py <template_path> <output_path> <json_data>")
-        sys.exit(1)
+    Returns: list of (path, rows, total) per file written
+    """
+    template = load_template(template_path)
+    payment_date = payment_date or datetime.now().strftime('%d/%m/%Y')
+    numbered = bool(max_rows or max_amount)
+    written = []
+    keys = [key for key, _ in COLUMNS]
+    fields = [keys.index(key) for key in ('paymentType', 'idType', 'recipientId', 'amount', 'reference')]
+
+    manifest = open(manifest_path, 'w', newline='', encoding='utf-8') if manifest_path else None
+    try:
+        writer = csv.writer(manifest) if manifest else None
+        if writer:
+            writer.writerow(MANIFEST_COLUMNS)
+
+        for part, (rows, cents, record_ids) in enumerate(split_batches(payments, max_rows, max_amount), 1):
+            path = part_path(output_path, part) if numbered else Path(output_path)
+            with span('duitnow.file', part=part, rows=len(rows)):
+                template.render(path, rows, {'B1': payment_date})
+            if writer:
+                writer.writerows([path.name, row_num, *(row[i] for i in fields), ids]
+                                 for row_num, (row, ids) in enumerate(zip(rows, record_ids), START_ROW))
+            written.append((path, len(rows), cents / 100))
+            print(f"   ✓ {path.name}: {len(rows):,} payment(s), RM {cents / 100:,.2f}")
+    finally:
+        if manifest:
+            manifest.close()
 
-    template_path = sys.argv[1]
-    output_path = sys.argv[2]
-    json_data = sys.argv[3]
+    return written
 
-    payment_data = json.loads(json_data)
-    fill_duitnow_template(template_path, output_path, payment_data)
+
+def run(args):
+    if args.input == '-':
+        stream = sys.stdin
+    else:
+        stream = open(args.input, 'r', encoding='utf-8')
+
+    started = time.perf_counter()
+    try:
+        meta, payments = read_payments(stream)
+        payment_date = args.payment_date or meta.get('paymentDate')
+        if not args.skip_preflight:
+            # Fail fast: the whole batch is checked before the first file is written
+            payments = list(payments)
+            with span('duitnow.preflight', rows=len(payments)):
+                errors = check_batch(payments, payment_date, args.expected_total)
+            if len(errors):
+                report_errors(errors, args.output_path)
+                return 1
+            print(f"✓ Pre-flight passed: {len(payments):,} payment(s)")
+        manifest_path = Path(args.output_path).with_name(f"{Path(args.output_path).stem}_batch.csv")
+        written = fill_duitnow_batch(args.template_path, args.output_path, payments,
+                                     payment_date, args.max_rows, args.max_amount, manifest_path)
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+    elapsed = time.perf_counter() - started
+
+    if not written:
+        print("⚠️  No payments in input - nothing written")
+        return 1
+
+    print(f"   ✓ {manifest_path.name}: batch manifest for payment_reconcile.py")
+    rows = sum(n for _, n, _ in written)
+    total = sum(t for _, _, t in written)
+    print(f"\n✓ {rows:,} payment(s) in {len(written)} file(s), RM {total:,.2f} "
+          f"({elapsed:.2f}s, {rows / elapsed:,.0f} rows/s)")
+    return 0
+
+
+def main():
+    """Main CLI entry point."""
+    parser = argparse.ArgumentParser(description='Fill the DuitNow ECP template with payment data.')
+    parser.add_argument('template_path', help='DuitNow template xlsx')
+    parser.add_argument('output_path', help='Output xlsx (numbered _001, _002, ... when splitting)')
+    parser.add_argument('json_data', nargs='?', help="Inline JSON {'paymentDate', 'payments'} (single file)")
+    parser.add_argument('--input', help="Batch input: JSON array or JSON lines file, or '-' for stdin; "
+                                        "payments may carry store 'recordIds' for the _batch.csv manifest")
+    parser.add_argument('--max-rows', type=int, help='Split output after this many payments per file')
+    parser.add_argument('--max-amount', type=float, help='Split output so no file exceeds this total (RM)')
+    parser.add_argument('--payment-date', help='Payment date DD/MM/YYYY (default: input paymentDate or today)')
+    parser.add_argument('--expected-total', type=float, help='Control total (RM) the batch must add up to')
+    parser.add_argument('--skip-preflight', action='store_true',
+                        help='Stream straight to the files without the pre-flight checks (batch is not held in memory)')
+    add_metrics_arguments(parser)
+    args = parser.parse_args()
+
+    if args.json_data is not None:
+        payment_data = json.loads(args.json_data)
+        if not args.skip_preflight:
+            errors = check_batch(payment_data['payments'], args.payment_date or payment_data.get('paymentDate'),
+                                 args.expected_total)
+            if len(errors):
+                report_errors(errors, args.output_path)
+                return 1
+        fill_duitnow_template(args.template_path, args.output_path, payment_data)
+        return 0
+    if not args.input:
+        parser.error('either json_data or --input is required')
+
+    with metrics_session(args.metrics, args.profile):
+        return run(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
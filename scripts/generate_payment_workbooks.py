@@ -0,0 +1,413 @@
+#!/usr/bin/env python3
+"""
+Synthetic Payment Workbook Generator
+Creates realistic "Baito <Month> Payment Details <Year>" workbooks plus a golden expected-records file for benchmarking.
+"""
+
+import argparse
+import io
+import json
+import random
+import sys
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+import openpyxl
+from openpyxl.utils import get_column_letter
+
+from source_manifest import MONTH_LABELS
+
+try:
+    from PIL import Image, ImageDraw
+    from openpyxl.drawing.image import Image as XLImage
+    HAS_PIL = True
+except ImportError:
+    HAS_PIL = False
+
+
+FIRST_NAMES = [
+    'Ahmad', 'Nur', 'Siti', 'Muhammad', 'Aisyah', 'Farah', 'Hafiz', 'Amirul', 'Izzati', 'Syafiq',
+    'Wei Ling', 'Mei Ling', 'Chiu Ling', 'Jia Hui', 'Kah Wai', 'Zhi Hao', 'Xin Yi', 'Jun Kit',
+    'Kavitha', 'Priya', 'Arjun', 'Deepa', 'Ravi', 'Thanusha', 'Vinod', 'Shalini'
+]
+SURNAMES = [
+    'Bin Abdullah', 'Binti Ismail', 'Bin Hassan', 'Binti Yusof', 'Bin Rahman',
+    'Tan', 'Lim', 'Chan', 'Wong', 'Lee', 'Ng', 'Ong', 'Teoh', 'Goh', 'Chong',
+    'A/L Muthu', 'A/P Raman', 'A/L Subramaniam', 'A/P Krishnan'
+]
+ENGLISH_NAMES = ['Melissa', 'Jason', 'Vivian', 'Kelvin', 'Joanne', 'Daniel', 'Cheryl', 'Ivan']
+
+# Bank name as typed by finance, and the account-number length for that bank
+BANKS = [
+    ('Maybank', 12), ('MBB', 12), ('CIMB Bank', 10), ('CIMB', 14), ('Public Bank', 10),
+    ('RHB Bank', 14), ('Hong Leong Bank', 11), ('AmBank', 13), ('Bank Islam', 14),
+    ('BSN', 16), ('Bank Rakyat', 12), ('Affin Bank', 12), ('Alliance Bank', 15), ('OCBC', 10), ('UOB', 10)
+]
+
+PROJECTS = [
+    'Blackmores', 'Redoxon School', 'Mytown Raya', 'CC Lemon @ IOI Damansara', 'Colgate Serum @ Sunway',
+    'HSBC', 'MAS Matta Fair', 'Pickleball KLGCC', 'Ribena Raya', 'Adidas', 'House of Sephora',
+    'ASEAN Summit', 'Affin', 'CU Mart Instore', 'Lee Instore', 'Roots Grand Hyatt', 'Acson Home Expo',
+    'MCD Danau Kota', 'Warrior Photobooth', 'Spritzer Contest', 'Pandai @ Bamboo Hill', 'Allana Instore',
+    'Fantastic 4 Launching', 'Joanne Photobooth', 'Bites @ LSH33', 'Cotton Candy @ Mr DIY'
+]
+POSITIONS = ['Promoter', 'Crew', 'Usher', 'Supervisor', 'Brand Ambassador', 'Helper']
+LOCATIONS = ['Sunway Pyramid', 'Mid Valley', 'IOI City Mall', 'KLCC', 'Pavilion KL', '1 Utama', 'Aeon Tebrau', 'Gurney Plaza']
+SECTION_TITLES = ['Roadshow Team', 'Instore Crew', 'Roving Team', 'Activation Staff', 'Launching Crew']
+SHIFT_CODES = ['AM', 'PM', 'FULL', 'OFF']
+
+# MyKad place-of-birth codes (states + a few foreign-born codes)
+PLACE_CODES = list(range(1, 17)) + [21, 22, 24, 25, 30, 31, 40, 45, 59, 71, 82, 98]
+
+# Header layouts seen in the real workbooks; roster date columns are appended per section
+LAYOUTS = [
+    ['No', 'Name', 'IC Number', 'Bank Name', 'Bank Account', 'Position', 'Day', 'Date', 'Wages', 'OT', 'Allowance', 'Claim', 'Total'],
+    ['No', 'Name', 'IC', 'Bank', 'Account No', 'Day', 'Wages', 'Transport', 'Total'],
+    ['No', 'Name', 'IC Number', 'Bank Name', 'Bank Account', 'Position', 'Days', 'Payment', 'OT', 'Claims', 'Total Payment'],
+    ['No', 'Name', 'IC Number', 'Bank Name', 'Bank Account', 'Day', 'Date', 'Wages', 'Allowance', 'Total Wages'],
+]
+
+
+def make_ic(rng):
+    """Generate a valid-looking MyKad number (YYMMDD-PB-###G) as 12 digits."""
+    birth = date(1970, 1, 1) + timedelta(days=rng.randint(0, 365 * 36))
+    place = rng.choice(PLACE_CODES)
+    return f"{birth:%y%m%d}{place:02d}{rng.randint(0, 9999):04d}"
+
+
+def make_person(rng):
+    """One promoter: identity and bank details reused across months and projects."""
+    name = f"{rng.choice(FIRST_NAMES)} {rng.choice(SURNAMES)}"
+    bank, length = rng.choice(BANKS)
+    account = str(rng.randint(1, 9)) + ''.join(str(rng.randint(0, 9)) for _ in range(length - 1))
+    if rng.random() < 0.1:
+        account = '0' + account[1:]  # Leading zero - only survives as text or a padded format
+    return {
+        'full_name': name,
+        'alternate_name': rng.choice(ENGLISH_NAMES) if rng.random() < 0.15 else None,
+        'ic_number': make_ic(rng),
+        'bank_name': bank,
+        'account_number': account
+    }
+
+
+def ic_cell(ic, rng):
+    """IC as finance types it: hyphenated text, plain text or a number."""
+    style = rng.random()
+    if style < 0.5:
+        return f"{ic[:6]}-{ic[6:8]}-{ic[8:]}", None
+    if style < 0.8 or ic.startswith('0'):
+        return ic, None
+    return int(ic), None
+
+
+def account_cell(account, rng):
+    """Account as text, a plain number, or a number with a zero-padded format."""
+    if len(account) > 15 or rng.random() < 0.5:
+        return account, None  # Excel cannot hold more than 15 digits as a number
+    if account.startswith('0'):
+        return int(account), '0' * len(account)
+    return int(account), None
+
+
+def make_receipt_png(rng, label):
+    """Small PNG standing in for a photographed receipt."""
+    img = Image.new('RGB', (160, 90), (250, 250, 245))
+    draw = ImageDraw.Draw(img)
+    draw.rectangle([2, 2, 157, 87], outline=(120, 120, 120))
+    draw.text((10, 10), 'RECEIPT', fill=(0, 0, 0))
+    draw.text((10, 35), label, fill=(0, 0, 0))
+    draw.text((10, 60), f"RM {rng.randint(5, 200)}.{rng.randint(0, 99):02d}", fill=(0, 0, 0))
+    buf = io.BytesIO()
+    img.save(buf, format='PNG')
+    buf.seek(0)
+    return buf
+
+
+def write_section(ws, row, layout, roster_dates, members, year, month, rng, opts, expected, meta):
+    """
+    Write one header section starting at `row`.
+
+    Returns: next free row
+    """
+    header = layout + [datetime(d.year, d.month, d.day) for d in roster_dates]
+    for col, value in enumerate(header, 1):
+        ws.cell(row=row, column=col, value=value)
+    row += 1
+
+    pos = {name: i + 1 for i, name in enumerate(layout)}
+    total_col = next(c for c in ('Total', 'Total Payment', 'Total Wages') if c in pos)
+    section_total = 0.0
+
+    for no, person in enumerate(members, 1):
+        n_rows = 1
+        while n_rows < 4 and rng.random() < opts.continuation_rate:
+            n_rows += 1
+
+        rate = rng.choice([80, 100, 120, 130, 150])
+        days = wages = ot = allowance = claim = 0.0
+        work_dates = []
+        first_row = row
+
+        for r in range(n_rows):
+            day_val = rng.choice([1, 1, 2, 3])
+            work_day = date(year, month, rng.randint(1, 28))
+            days += day_val
+            wages += day_val * rate
+
+            if 'Day' in pos:
+                ws.cell(row=row, column=pos['Day'], value=day_val)
+            if 'Days' in pos:
+                ws.cell(row=row, column=pos['Days'], value=day_val)
+            if 'Date' in pos:
+                ws.cell(row=row, column=pos['Date'], value=work_day.isoformat())
+                if work_day.isoformat() not in work_dates:
+                    work_dates.append(work_day.isoformat())
+            for wage_col in ('Wages', 'Payment'):
+                if wage_col in pos:
+                    ws.cell(row=row, column=pos[wage_col], value=day_val * rate)
+            if 'OT' in pos and rng.random() < 0.2:
+                val = rng.choice([10, 20, 30])
+                ot += val
+                ws.cell(row=row, column=pos['OT'], value=val)
+            for allowance_col in ('Allowance', 'Transport'):
+                if allowance_col in pos and rng.random() < 0.3:
+                    val = rng.choice([10, 15, 20])
+                    allowance += val
+                    ws.cell(row=row, column=pos[allowance_col], value=val)
+            for claim_col in ('Claim', 'Claims'):
+                if claim_col in pos and rng.random() < 0.15:
+                    val = round(rng.uniform(5, 80), 2)
+                    claim += val
+                    ws.cell(row=row, column=pos[claim_col], value=val)
+
+            # Roster: shift code per date, only on the candidate's first row
+            if r == 0:
+                for i, _ in enumerate(roster_dates):
+                    if rng.random() < 0.5:
+                        ws.cell(row=row, column=len(layout) + 1 + i, value=rng.choice(SHIFT_CODES))
+            row += 1
+
+        total = round(wages + ot + allowance + claim, 2)
+        section_total += total
+
+        # Identity columns on the first row only; continuation rows leave them empty
+        name_text = person['full_name']
+        if person['alternate_name']:
+            name_text = f"{name_text} ({person['alternate_name']})"
+        ic_value, ic_format = ic_cell(person['ic_number'], rng)
+        account_value, account_format = account_cell(person['account_number'], rng)
+
+        ws.cell(row=first_row, column=pos['No'], value=no)
+        ws.cell(row=first_row, column=pos['Name'], value=name_text)
+        ic_col = pos.get('IC Number') or pos['IC']
+        ws.cell(row=first_row, column=ic_col, value=ic_value)
+        bank_col = pos.get('Bank Name') or pos['Bank']
+        ws.cell(row=first_row, column=bank_col, value=person['bank_name'])
+        account_col = pos.get('Bank Account') or pos['Account No']
+        cell = ws.cell(row=first_row, column=account_col, value=account_value)
+        if account_format:
+            cell.number_format = account_format
+        if 'Position' in pos:
+            ws.cell(row=first_row, column=pos['Position'], value=meta['position'])
+        ws.cell(row=first_row, column=pos[total_col], value=total)
+
+        # Merged name/IC cells across continuation rows
+        if n_rows > 1 and rng.random() < opts.merge_rate:
+            for col in (pos['No'], pos['Name'], ic_col):
+                ws.merge_cells(start_row=first_row, start_column=col, end_row=row - 1, end_column=col)
+
+        expected.append({
+            'month': MONTH_LABELS[month],
+            'source_file': meta['source_file'],
+            'source_sheet': meta['sheet'],
+            'project_name': meta['sheet'],
+            'full_name': person['full_name'],
+            'alternate_name': person['alternate_name'],
+            'ic_number': person['ic_number'],
+            'bank_name': person['bank_name'],
+            'account_number': person['account_number'],
+            'position': meta['position'] if 'Position' in pos else None,
+            'days_worked': days,
+            'total_wages': wages,
+            'total_ot': ot,
+            'total_allowance': allowance,
+            'total_claim': claim,
+            'total_payment': total,
+            'work_dates': work_dates,
+            'first_row': first_row,
+            'last_row': row - 1
+        })
+
+    if opts.total_rows:
+        ws.cell(row=row, column=pos['Name'], value='Total')
+        ws.cell(row=row, column=pos[total_col], value=round(section_total, 2))
+        row += 1
+
+    return row
+
+
+def generate_workbook(path, company, year, month, population, rng, opts, expected):
+    """Generate one monthly workbook. Returns number of sheet rows written."""
+    wb = openpyxl.Workbook()
+    wb.remove(wb.active)
+    rows_written = 0
+
+    projects = rng.sample(PROJECTS, min(opts.sheets, len(PROJECTS)))
+    while len(projects) < opts.sheets:
+        projects.append(f"{rng.choice(PROJECTS)} {len(projects) + 1}"[:31])
+
+    for sheet_name in projects:
+        ws = wb.create_sheet(sheet_name[:31])
+        start_day = rng.randint(1, 20)
+        end_day = min(28, start_day + rng.randint(1, 8))
+        meta = {
+            'source_file': path.name,
+            'sheet': ws.title,
+            'position': rng.choice(POSITIONS)
+        }
+
+        # Metadata block
+        ws.cell(row=1, column=1, value=f"Date: {start_day} {MONTH_LABELS[month]} - {end_day} {MONTH_LABELS[month]} {year}")
+        ws.cell(row=2, column=1, value=f"Location: {rng.choice(LOCATIONS)}")
+        ws.cell(row=3, column=1, value=f"Time: {rng.choice(['10am - 10pm', '9am - 6pm', '11am - 9pm'])}")
+        ws.cell(row=4, column=1, value=f"Payment by {rng.randint(1, 28)} {MONTH_LABELS[month % 12 + 1]} {year}")
+        row = 6
+
+        people = rng.sample(population, min(len(population), opts.sections * opts.candidates))
+        for section in range(opts.sections):
+            members = people[section * opts.candidates:(section + 1) * opts.candidates]
+            if not members:
+                break
+            if section > 0:
+                ws.cell(row=row, column=2, value=f"{rng.choice(SECTION_TITLES)} {section + 1}")
+                row += 2
+
+            layout = rng.choice(LAYOUTS)
+            roster_dates = [date(year, month, d) for d in range(start_day, start_day + rng.randint(0, opts.roster_days))]
+            row = write_section(ws, row, layout, roster_dates, members, year, month, rng, opts, expected, meta)
+            row += 1
+
+        # Embedded receipt images to the right of the table
+        if opts.receipts and HAS_PIL:
+            for i in range(opts.receipts):
+                img = XLImage(make_receipt_png(rng, ws.title[:18]))
+                ws.add_image(img, f"{get_column_letter(len(LAYOUTS[0]) + 10)}{6 + i * 6}")
+
+        rows_written += row - 1
+
+    wb.save(path)
+    return rows_written
+
+
+def generate_corpus(out_dir, opts):
+    """
+    Generate a fixture corpus: one workbook per month, expected_records.jsonl and a manifest.
+
+    Args:
+        out_dir: Output directory
+        opts: Options from build_parser() / default_options()
+
+    Returns: (workbook paths, expected records)
+    """
+    company, year, months = opts.company, opts.year, opts.months
+    rng = random.Random(opts.seed)
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+
+    per_workbook = opts.sheets * opts.sections * opts.candidates
+    population_size = opts.population or max(20, per_workbook * months // 4)
+    population = [make_person(rng) for _ in range(population_size)]
+
+    if opts.receipts and not HAS_PIL:
+        print("   ⚠️  Pillow not installed - receipt images skipped (pip install pillow)")
+
+    paths = []
+    expected = []
+    for month in range(1, months + 1):
+        path = out_dir / f"{company} {MONTH_LABELS[month]} Payment Details {year}.xlsx"
+        rows = generate_workbook(path, company, year, month, population, rng, opts, expected)
+        paths.append(path)
+        print(f"   ✓ {path.name}: {opts.sheets} sheet(s), {rows:,} rows")
+
+    with open(out_dir / 'expected_records.jsonl', 'w', encoding='utf-8') as f:
+        for record in expected:
+            f.write(json.dumps(record) + '\n')
+
+    manifest = {
+        'description': f"Synthetic fixture corpus (seed {opts.seed})",
+        'discover': [{
+            'company': company,
+            'year': year,
+            'dir': str(out_dir.resolve()),
+            'pattern': f"{company} * Payment Details {year}.xlsx"
+        }]
+    }
+    with open(out_dir / 'payment_sources.json', 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+
+    return paths, expected
+
+
+def build_parser():
+    """CLI options (also the generator's option defaults)."""
+    parser = argparse.ArgumentParser(
+        description='Generate synthetic payment workbooks for benchmarking.',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  # Small corpus (9 months x 10 sheets x 2 sections x 20 candidates)
+  python3 scripts/generate_payment_workbooks.py benchmark_fixtures/small
+
+  # ~100k rows
+  python3 scripts/generate_payment_workbooks.py benchmark_fixtures/large --months 12 --sheets 25 --sections 4 --candidates 80
+        """
+    )
+    parser.add_argument('out_dir', nargs='?', default='benchmark_fixtures/small', help='Output directory')
+    parser.add_argument('--company', default='Baito')
+    parser.add_argument('--year', type=int, default=2025)
+    parser.add_argument('--months', type=int, default=9, help='Months to generate, from January (1-12)')
+    parser.add_argument('--sheets', type=int, default=10, help='Project sheets per workbook')
+    parser.add_argument('--sections', type=int, default=2, help='Header sections per sheet')
+    parser.add_argument('--candidates', type=int, default=20, help='Candidates per section')
+    parser.add_argument('--population', type=int, default=None, help='Distinct promoters (default: scales with corpus)')
+    parser.add_argument('--continuation-rate', type=float, default=0.4, help='Chance of each extra continuation row')
+    parser.add_argument('--merge-rate', type=float, default=0.3, help='Chance multi-row candidates have merged Name/IC')
+    parser.add_argument('--roster-days', type=int, default=7, help='Max roster date columns per section')
+    parser.add_argument('--receipts', type=int, default=1, help='Receipt images per sheet (needs Pillow)')
+    parser.add_argument('--no-total-rows', dest='total_rows', action='store_false', help='Omit section "Total" rows')
+    parser.add_argument('--seed', type=int, default=42)
+    return parser
+
+
+def default_options(**overrides):
+    """Generator options with CLI defaults, e.g. default_options(sheets=50, seed=7)."""
+    opts = build_parser().parse_args([])
+    for key, value in overrides.items():
+        setattr(opts, key, value)
+    return opts
+
+
+def main():
+    """Main CLI entry point."""
+    args = build_parser().parse_args()
+
+    if not 1 <= args.months <= 12:
+        print("Error: --months must be between 1 and 12", file=sys.stderr)
+        return 1
+
+    print("="*120)
+    print(" "*35 + "SYNTHETIC PAYMENT WORKBOOK GENERATOR")
+    print("="*120)
+    print(f"\n📂 Output: {args.out_dir}\n")
+
+    paths, expected = generate_corpus(args.out_dir, args)
+
+    print(f"\n✅ Generated {len(paths)} workbook(s), {len(expected):,} expected record(s)")
+    print(f"   Golden file: {Path(args.out_dir) / 'expected_records.jsonl'}")
+    print(f"   Manifest:    {Path(args.out_dir) / 'payment_sources.json'}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,347 @@
+#!/usr/bin/env python3
+"""
+Header Layout Cache
+Finds section header rows with vectorized keyword tests and maps each to column roles once per distinct layout.
+"""
+
+import argparse
+import json
+import re
+import sys
+from collections import Counter
+from pathlib import Path
+
+import numpy as np
+import openpyxl
+import pandas as pd
+
+from run_metrics import incr
+from source_manifest import DEFAULT_MANIFEST, load_manifest, resolve_sources
+
+
+# A section header row mentions both (in any of its cells)
+HEADER_KEYWORDS = ('name', 'ic')
+
+# Known layouts, pre-registered so their first section is mapped without running the matchers
+DEFAULT_LAYOUTS = Path(__file__).resolve().parent.parent / 'header_layouts.json'
+
+# Roster columns are dates; every date header is the same token in a signature (no rule matches them otherwise)
+DATE_HEADER_PATTERN = re.compile(r'\d{4}-\d{2}-\d{2}(?: \d{2}:\d{2}:\d{2})?')
+DATE_TOKEN = '<date>'
+
+# Blank header cells: '' / NaN in a raw row, 'Unnamed: <position>' as a pandas label
+BLANK_PATTERN = re.compile(r'|nan|none|unnamed: \d+')
+
+NAME_PATTERN = r'^(?!.*bank).*name'
+
+# Rule sets: (role, pattern searched in the lowercased header). Roles ending in _cols collect every match.
+RULES = {
+    # create_master_excel_v3_fixed.identify_columns: first matching rule whose role is still free
+    'v3': [
+        ('name_col', NAME_PATTERN),
+        ('ic_col', r'ic'),
+        ('bank_col', r'bank name|^bank$'),
+        ('account_col', r'account'),
+        ('position_col', r'^(?:position|role)$'),
+        ('days_col', r'^days?$'),
+        ('date_col', r'^date$'),
+        ('wage_col', r'^(?:wages?|salary)$'),
+        ('payment_col', r'^payment$'),
+        ('ot_col', r'^(?:ot|overtime)$'),
+        ('transport_col', r'^transport(?:ation)?$'),
+        ('allowance_col', r'allowance'),
+        ('claim_col', r'^claims?$'),
+        ('total_col', r'^total(?: wages| payment)?$'),
+        ('date_pattern_cols', r'^\d{4}-\d{2}-\d{2}'),
+    ],
+    # logic_validator.identify_columns: first matching rule, later columns overwrite earlier ones
+    'validator': [
+        ('name', NAME_PATTERN),
+        ('ic', r'^(?:ic number|ic no|ic)$'),
+        ('days', r'^days?$'),
+        ('wage', r'^wages?$'),
+        ('payment', r'^payment$'),
+        ('ot', r'^(?:ot|overtime)$'),
+        ('allowance', r'allowance'),
+        ('claim', r'^claims?$'),
+        ('total', r'^(?:total|total wages)$'),
+        ('transport', r'transport'),
+    ],
+    # create_master_excel_v2.extract_section_data: every role independently takes its first match
+    'v2': [
+        ('name_col', NAME_PATTERN),
+        ('ic_col', r'^(?=.*ic)(?=.*number)|^ic$'),
+        ('bank_col', r'bank name|^bank$'),
+        ('account_col', r'account'),
+        ('position_col', r'^(?:position|role)$'),
+        ('day_col', r'^days?$'),
+        ('date_col', r'^date$'),
+        ('wage_col', r'^wages?$'),
+        ('ot_col', r'^(?:ot|overtime)$'),
+        ('allowance_col', r'allowance'),
+        ('claim_col', r'^claims?$'),
+        ('total_col', r'^(?:total|payment|total wages)$'),
+    ],
+}
+
+# How a rule set resolves a header matching several rules / a role matching several headers
+MODES = {'v3': 'first_free', 'validator': 'last', 'v2': 'independent'}
+
+# v2: with several account columns, only 'bank account' counts (possibly none)
+PREFER = {'v2': {'account_col': re.compile(r'bank account')}}
+
+# What each caller's matchers saw for a blank header cell ('unnamed' contains 'name')
+BLANK_TEXT = {'v3': 'unnamed: {}', 'v2': 'unnamed: {}', 'validator': 'nan'}
+
+
+def normalize_header(value):
+    """Header cell as matched: lowercase and stripped, blanks as '' and date columns as DATE_TOKEN."""
+    text = str(value).strip().lower() if value is not None else ''
+    if BLANK_PATTERN.fullmatch(text):
+        return ''
+    return DATE_TOKEN if DATE_HEADER_PATTERN.fullmatch(text) else text
+
+
+def header_signature(headers):
+    """
+    Tuple identifying a header layout; sections with equal signatures map identically.
+
+    The same for a raw header row and for the pandas labels of the same row, and
+    trailing blank columns are dropped, so a layout does not depend on how wide
+    the sheet's used range is.
+    """
+    signature = [normalize_header(h) for h in headers]
+    while signature and not signature[-1]:
+        signature.pop()
+    return tuple(signature)
+
+
+class SheetText:
+    """
+    Lowercased cell text of a sheet read with header=None, shared by header discovery and metadata extraction.
+
+    Each distinct cell value is converted and lowercased once; a keyword test is
+    one str.contains over those values, mapped back onto the grid by code.
+    """
+
+    def __init__(self, df):
+        self.df = df
+        codes, uniques = pd.factorize(df.to_numpy(dtype=object).ravel())
+        self.codes = codes.reshape(df.shape)
+        self.lower = pd.Series(uniques, dtype=object).astype(str).str.lower()
+        self._hits = {}
+
+    def _cells(self, keyword):
+        # Per distinct value, plus False at the end for empty cells (code -1)
+        if keyword not in self._hits:
+            self._hits[keyword] = np.append(self.lower.str.contains(keyword, regex=False).to_numpy(dtype=bool), False)
+        return self._hits[keyword]
+
+    def rows_with(self, *keywords, rows=None):
+        """
+        Row positions where every keyword occurs in some cell.
+
+        Keywords are tested in order, each only on the rows that had the ones
+        before it, so most rows drop out after the first test.
+        """
+        rows = np.arange(len(self.codes)) if rows is None else np.asarray(rows, dtype=int)
+        for keyword in keywords:
+            if not len(rows):
+                break
+            rows = rows[self._cells(keyword)[self.codes[rows]].any(axis=1)]
+        return rows
+
+    def row_text(self, row):
+        """The row's non-empty cells joined by spaces, in their original case."""
+        return ' '.join(str(value) for value in self.df.iloc[row] if pd.notna(value))
+
+
+def find_header_rows(df, keywords=HEADER_KEYWORDS, text=None):
+    """Index labels of every row containing all keywords (the sheet's section headers)."""
+    text = SheetText(df) if text is None else text
+    return df.index[text.rows_with(*keywords)].tolist()
+
+
+def find_first_header_row(df, keywords=HEADER_KEYWORDS, block=64):
+    """
+    Index label of the first header row, or None.
+
+    Scans blocks of rows growing 4x each time, so a header near the top costs
+    only the first block however long the sheet is.
+    """
+    start = 0
+    while start < len(df):
+        rows = SheetText(df.iloc[start:start + block]).rows_with(*keywords)
+        if len(rows):
+            return df.index[start + rows[0]]
+        start += block
+        block *= 4
+    return None
+
+
+class HeaderLayouts:
+    """Column mapping per header signature for one rule set, computed once per distinct layout."""
+
+    def __init__(self, rule_set):
+        self.rule_set = rule_set
+        self.mode = MODES[rule_set]
+        self.rules = [(role, re.compile(pattern)) for role, pattern in RULES[rule_set]]
+        self.prefer = PREFER.get(rule_set, {})
+        self.positions = {}
+        # Exact header text -> signature, so a header row seen before skips normalization too
+        self.signatures = {}
+        self.counts = Counter()
+        self.hits = 0
+        self.misses = 0
+        self.preloaded = 0
+
+    def _compute(self, signature):
+        """{role: header position or None; *_cols roles: [positions]} from the matchers."""
+        positions = {role: [] if role.endswith('_cols') else None for role, _ in self.rules}
+        # Date headers were reduced to DATE_TOKEN (any date string stands in for them), blanks to ''
+        texts = ['2000-01-01' if text == DATE_TOKEN else text or BLANK_TEXT[self.rule_set].format(i)
+                 for i, text in enumerate(signature)]
+
+        if self.mode == 'independent':
+            for role, matcher in self.rules:
+                found = [i for i, text in enumerate(texts) if matcher.search(text)]
+                prefer = self.prefer.get(role)
+                if prefer and len(found) > 1:
+                    found = [i for i in found if prefer.search(texts[i])]
+                positions[role] = found[0] if found else None
+            return positions
+
+        for i, text in enumerate(texts):
+            for role, matcher in self.rules:
+                if self.mode == 'first_free' and positions[role] is not None and not role.endswith('_cols'):
+                    continue
+                if matcher.search(text):
+                    if role.endswith('_cols'):
+                        positions[role].append(i)
+                    else:
+                        positions[role] = i
+                    break
+        return positions
+
+    def register(self, signature):
+        """Pre-compute a known layout."""
+        signature = tuple(signature)
+        if signature not in self.positions:
+            self.positions[signature] = self._compute(signature)
+            self.preloaded += 1
+
+    def preload(self, path=DEFAULT_LAYOUTS):
+        """Register the layouts saved for this rule set (no-op when the file is missing)."""
+        path = Path(path)
+        if not path.exists():
+            return 0
+        with open(path, 'r', encoding='utf-8') as f:
+            layouts = json.load(f).get('layouts', [])
+        for layout in layouts:
+            self.register(layout['signature'])
+        return len(layouts)
+
+    def lookup(self, headers):
+        """Header positions per role for this header row (see _compute)."""
+        key = tuple(map(str, headers))
+        signature = self.signatures.get(key)
+        if signature is None:
+            signature = self.signatures[key] = header_signature(headers)
+        positions = self.positions.get(signature)
+        if positions is None:
+            positions = self.positions[signature] = self._compute(signature)
+            self.misses += 1
+            incr('header_layout_misses')
+        else:
+            self.hits += 1
+            incr('header_layout_hits')
+        self.counts[signature] += 1
+        return positions
+
+    def map_columns(self, headers):
+        """Like lookup, with the header labels themselves instead of positions."""
+        headers = list(headers)
+        return {role: [headers[i] for i in found] if isinstance(found, list) else
+                (headers[found] if found is not None else None)
+                for role, found in self.lookup(headers).items()}
+
+    def stats(self):
+        """Lookups, cache hits/misses and sections per distinct layout (most common first)."""
+        return {
+            'rule_set': self.rule_set,
+            'lookups': self.hits + self.misses,
+            'hits': self.hits,
+            'misses': self.misses,
+            'preloaded': self.preloaded,
+            'layouts': [{'signature': list(signature), 'sections': count}
+                        for signature, count in self.counts.most_common()],
+        }
+
+
+def scan_headers(path):
+    """Header rows ('name' and 'ic' in the row) of every sheet, as raw cell values."""
+    wb = openpyxl.load_workbook(path, read_only=True, data_only=True)
+    try:
+        for ws in wb.worksheets:
+            for row in ws.iter_rows(values_only=True):
+                text = ' '.join(str(v) for v in row if v is not None).lower()
+                if 'name' in text and 'ic' in text:
+                    yield row
+    finally:
+        wb.close()
+
+
+def main():
+    """Main CLI entry point."""
+    parser = argparse.ArgumentParser(
+        description='Count the distinct header layouts across the source workbooks and save them for pre-registration.',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  # Layout statistics for every workbook in payment_sources.json, saved as the known layouts
+  python3 scripts/header_layouts.py
+
+  # One year, without saving
+  python3 scripts/header_layouts.py --year 2025 --output ''
+        """
+    )
+    parser.add_argument('--manifest', default=str(DEFAULT_MANIFEST), help='Source manifest JSON')
+    parser.add_argument('--company')
+    parser.add_argument('--year', type=int)
+    parser.add_argument('--rule-set', choices=list(RULES), default='v3', help='Rules to show mappings for (default: v3)')
+    parser.add_argument('--top', type=int, default=10, help='Layouts to print (default: 10)')
+    parser.add_argument('--output', default=str(DEFAULT_LAYOUTS), help='Known layouts JSON (empty to skip saving)')
+    args = parser.parse_args()
+
+    print("="*120)
+    print(" "*45 + "HEADER LAYOUT STATISTICS")
+    print("="*120)
+
+    sources = resolve_sources(load_manifest(args.manifest), company=args.company, year=args.year)
+    if not sources:
+        print(f"❌ No source workbooks in {args.manifest}")
+        return 1
+
+    layouts = HeaderLayouts(args.rule_set)
+    for source in sources:
+        for headers in scan_headers(source['path']):
+            layouts.lookup(headers)
+
+    stats = layouts.stats()
+    print(f"\n📂 {len(sources)} workbook(s): {stats['lookups']:,} section header(s), "
+          f"{len(stats['layouts']):,} distinct layout(s) ({stats['hits'] / max(stats['lookups'], 1):.1%} cache hits)")
+    for layout in stats['layouts'][:args.top]:
+        mapped = {role: found for role, found in layouts.positions[tuple(layout['signature'])].items()
+                  if found is not None and found != []}
+        print(f"\n   {layout['sections']:>6,} × {' | '.join(h or '·' for h in layout['signature'])}")
+        print(f"            {', '.join(f'{role}={found}' for role, found in mapped.items())}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(stats, f, indent=2, ensure_ascii=False)
+        print(f"\n💾 Known layouts saved: {args.output}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
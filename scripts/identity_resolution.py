@@ -0,0 +1,380 @@
+#!/usr/bin/env python3
+"""
+Candidate Identity Resolution
+Groups records of the same promoter despite IC typos, alternate names and changed bank details, using blocking instead of all-pairs comparison.
+"""
+
+import argparse
+import re
+import sys
+from collections import Counter, defaultdict
+from difflib import SequenceMatcher
+from functools import lru_cache
+from pathlib import Path
+
+import pandas as pd
+
+from mykad import decode_ics
+from payment_store import read_master
+from run_metrics import span, add_arguments as add_metrics_arguments, metrics_session
+
+
+# Pairs scoring at or above this are the same person
+MATCH_THRESHOLD = 0.85
+# Clusters below this are merged but listed for a human to check
+REVIEW_THRESHOLD = 0.95
+
+# Name blocks bigger than this ("muhammad amirul") are skipped - IC and account blocks still cover them
+MAX_BLOCK_SIZE = 200
+
+# Malay/Indian patronymic connectives carry no identity
+NAME_CONNECTIVES = {'bin', 'binti', 'bt', 'bte', 'bn', 'b', 'a/l', 'a/p', 'al', 'ap', 'anak', 'ak', 'd/o', 's/o', '@'}
+
+WEIGHTS = {'ic': 0.5, 'name': 0.35, 'account': 0.15}
+
+# IC similarity by edit distance: one slipped or swapped digit is a common typo, three is a different person
+IC_SIMILARITY = {0: 1.0, 1: 0.8, 2: 0.6, 3: 0.3}
+
+
+def normalize_ic(ic):
+    """Alphanumerics only, upper-cased (passport numbers keep their letters)."""
+    if ic is None or (isinstance(ic, float) and ic != ic):
+        return None
+    text = str(ic).strip()
+    if text.endswith('.0'):
+        text = text[:-2]
+    text = re.sub(r'[^0-9A-Za-z]', '', text).upper()
+    return text or None
+
+
+def normalize_account(account):
+    if account is None or (isinstance(account, float) and account != account):
+        return None
+    digits = re.sub(r'\D', '', str(account))
+    return digits if len(digits) >= 6 else None
+
+
+def name_variants(full_name, alternate_name=None):
+    """
+    Token tuples for a name and its alternates.
+
+    "Ahmad Bin Ali (Mat)" gives ('ahmad', 'ali') and ('mat',); connectives are dropped.
+    """
+    variants = []
+    texts = []
+    if isinstance(full_name, str):
+        texts.append(re.sub(r'\([^)]*\)', ' ', full_name))
+        texts.extend(re.findall(r'\(([^)]+)\)', full_name))
+    if isinstance(alternate_name, str):
+        texts.append(alternate_name)
+
+    for text in texts:
+        tokens = [t for t in re.findall(r"[a-z0-9/@']+", text.lower()) if t not in NAME_CONNECTIVES]
+        if tokens and tuple(tokens) not in variants:
+            variants.append(tuple(tokens))
+    return variants
+
+
+def ic_distance(a, b, limit=3):
+    """Optimal-string-alignment edit distance (a swapped digit pair costs 1), capped at limit + 1."""
+    if a == b:
+        return 0
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+
+    if len(a) == len(b):
+        # Most pairs differ only by substitutions: with at most two mismatches Hamming distance is exact
+        mismatches = [i for i in range(len(a)) if a[i] != b[i]]
+        if len(mismatches) == 1:
+            return 1
+        if len(mismatches) == 2:
+            i, j = mismatches
+            return 1 if j == i + 1 and a[i] == b[j] and a[j] == b[i] else 2
+        if limit < 2:
+            return limit + 1  # Equal lengths: one edit is a substitution or swap, so more mismatches means >= 2
+
+    # Banded DP: cells further than limit from the diagonal cannot be within limit
+    big = limit + 1
+    prev2 = None
+    prev = [j if j <= limit else big for j in range(len(b) + 1)]
+    for i in range(1, len(a) + 1):
+        cur = [i if i <= limit else big] + [big] * len(b)
+        for j in range(max(1, i - limit), min(len(b), i + limit) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            best = min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                best = min(best, prev2[j - 2] + 1)
+            cur[j] = best
+        if min(cur) > limit:
+            return big
+        prev2, prev = prev, cur
+    return min(prev[-1], big)
+
+
+def name_similarity(variants_a, variants_b):
+    """Best token-sorted similarity between any two name variants (0-1)."""
+    best = 0.0
+    for a in variants_a:
+        for b in variants_b:
+            if set(a) <= set(b) or set(b) <= set(a):
+                # "Siti Aminah" vs "Siti Aminah Binti Yusof" - one name is the other, shortened
+                score = 0.9 if min(len(a), len(b)) >= 2 else 0.75
+            else:
+                score = 0.0
+            score = max(score, SequenceMatcher(None, ' '.join(sorted(a)), ' '.join(sorted(b))).ratio())
+            best = max(best, score)
+    return best
+
+
+def block_keys(ic, variants, account, ic_key=0, birth_date=0, place=-1, gender=0):
+    """
+    Blocking keys for one identity.
+
+    12-digit ICs block on the decoded fields (mykad.decode_ics): birth date
+    with gender, birth date with place code, and the place+serial digits, so
+    a typo in any one part of the IC still leaves two shared blocks. An IC
+    whose date does not decode blocks on its raw date digits instead; other
+    IDs block on their prefix. The bank account is a block, and so is each
+    pair of name tokens - single tokens ("tan", "nur") make blocks too big to score.
+    """
+    keys = []
+    if ic_key:
+        keys.append(f"ictail:{ic_key % 10 ** 6}")
+        if birth_date:
+            keys.append(f"born:{birth_date}:{gender}")
+            keys.append(f"bornplace:{birth_date}:{place}")
+        else:
+            keys.append(f"dob:{ic_key // 10 ** 6}")
+    elif ic:
+        keys.append('icp:' + ic[:6])
+    if account:
+        keys.append('acct:' + account)
+    for tokens in variants:
+        tokens = sorted({t for t in tokens if len(t) >= 2})
+        if len(tokens) == 1:
+            keys.append('name:' + tokens[0])
+        keys.extend(f"name:{a} {b}" for i, a in enumerate(tokens) for b in tokens[i + 1:])
+    return keys
+
+
+@lru_cache(maxsize=None)
+def reachable_distance(threshold, shared_account):
+    """Largest IC distance that identical names could still lift to a match (-1: none)."""
+    if shared_account:
+        return max(IC_SIMILARITY)
+    return max((d for d, sim in IC_SIMILARITY.items()
+                if WEIGHTS['ic'] * sim + WEIGHTS['name'] >= threshold * (1 - WEIGHTS['account'])), default=-1)
+
+
+def score_pair(a, b, threshold=MATCH_THRESHOLD):
+    """
+    Score two identities.
+
+    Returns: (score 0-1, reason) - exact IC matches always score 1.0,
+    which keeps the old merge-on-IC behaviour.
+    """
+    if a['ic'] and a['ic'] == b['ic']:
+        return 1.0, 'same IC'
+
+    # A shared account is evidence; a different one is not - people change banks
+    account = 1.0 if a['account'] and a['account'] == b['account'] else None
+
+    reachable = reachable_distance(threshold, bool(account))
+
+    if a['ic'] and b['ic']:
+        distance = ic_distance(a['ic'], b['ic'], limit=max(reachable, 0))
+        ic = IC_SIMILARITY.get(distance, 0.0)
+    else:
+        distance = None
+        ic = 0.0
+
+    # Name similarity is the costly part - skip it when even identical names could not reach a match
+    if not account and (distance is None or distance > reachable):
+        return 0.0, f"IC distance > {reachable}" if distance is not None else 'no IC'
+
+    name = name_similarity(a['names'], b['names'])
+    if account:
+        score = WEIGHTS['ic'] * ic + WEIGHTS['name'] * name + WEIGHTS['account'] * account
+    else:
+        score = (WEIGHTS['ic'] * ic + WEIGHTS['name'] * name) / (1 - WEIGHTS['account'])
+
+    # A different IC is only explained by a typo if the names agree - twins share DOB digits
+    if name < 0.85:
+        score = min(score, threshold - 0.01)
+
+    # Same account with a badly mistyped IC - but families share accounts, so the name must all but match
+    if account and name >= 0.95:
+        score = max(score, 0.9)
+
+    reasons = [f"name {name:.2f}"]
+    if distance is not None:
+        reasons.append(f"IC distance {distance}")
+    if a['account'] and b['account']:
+        reasons.append('same account' if account else 'different account')
+    return round(score, 3), ', '.join(reasons)
+
+
+class _DisjointSet:
+    def __init__(self, n):
+        self.parent = list(range(n))
+
+    def find(self, i):
+        while self.parent[i] != i:
+            self.parent[i] = self.parent[self.parent[i]]
+            i = self.parent[i]
+        return i
+
+    def union(self, a, b):
+        ra, rb = self.find(a), self.find(b)
+        if ra != rb:
+            self.parent[max(ra, rb)] = min(ra, rb)
+
+
+def resolve_identities(records, threshold=MATCH_THRESHOLD):
+    """
+    Cluster records that belong to the same person.
+
+    Args:
+        records: list of dicts with ic_number, full_name and optionally
+            alternate_name and account_number
+        threshold: Minimum pair score to link two records
+
+    Returns: dict with
+        'cluster': cluster id per record (in records order)
+        'clusters': {cluster_id: {'members', 'confidence', 'links'}}
+        'pairs_scored', 'blocks'
+    """
+    with span('identity.block', records=len(records)) as s:
+        identities = []
+        identity_of = []
+        index = {}
+        for record in records:
+            ic = normalize_ic(record.get('ic_number'))
+            names = name_variants(record.get('full_name'), record.get('alternate_name'))
+            account = normalize_account(record.get('account_number'))
+            key = (ic, tuple(names), account)
+            # Identical identities are scored once
+            if key not in index:
+                index[key] = len(identities)
+                identities.append({'ic': ic, 'names': names, 'account': account})
+            identity_of.append(index[key])
+
+        # Each distinct IC is decoded once, as integers
+        decoded = decode_ics(pd.Series([identity['ic'] for identity in identities], dtype=object))
+        ic_fields = zip(*(decoded[column].tolist() for column in ('ic_key', 'birth_date', 'place', 'gender')))
+
+        blocks = defaultdict(list)
+        for i, (identity, fields) in enumerate(zip(identities, ic_fields)):
+            for key in block_keys(identity['ic'], identity['names'], identity['account'], *fields):
+                blocks[key].append(i)
+
+        candidate_pairs = set()
+        for key, members in blocks.items():
+            if len(members) < 2 or (key.startswith('name:') and len(members) > MAX_BLOCK_SIZE):
+                continue
+            for x in range(len(members)):
+                for y in range(x + 1, len(members)):
+                    candidate_pairs.add((members[x], members[y]))
+        s['identities'] = len(identities)
+        s['blocks'] = len(blocks)
+        s['pairs'] = len(candidate_pairs)
+
+    with span('identity.score', pairs=len(candidate_pairs)) as s:
+        links = _DisjointSet(len(identities))
+        edges = []
+        for a, b in candidate_pairs:
+            score, reason = score_pair(identities[a], identities[b], threshold)
+            if score >= threshold:
+                links.union(a, b)
+                edges.append((a, b, score, reason))
+        s['links'] = len(edges)
+
+    roots = [links.find(i) for i in range(len(identities))]
+    cluster = [roots[i] for i in identity_of]
+
+    clusters = {}
+    for pos, cid in enumerate(cluster):
+        clusters.setdefault(cid, {'members': [], 'confidence': 1.0, 'links': []})['members'].append(pos)
+    for a, b, score, reason in edges:
+        entry = clusters[roots[a]]
+        # A cluster is only as certain as its weakest link
+        entry['confidence'] = min(entry['confidence'], score)
+        entry['links'].append((identities[a]['ic'], identities[b]['ic'], score, reason))
+
+    return {'cluster': cluster, 'clusters': clusters, 'pairs_scored': len(candidate_pairs), 'blocks': len(blocks)}
+
+
+def canonical_value(values):
+    """Most common non-empty value (first seen wins ties)."""
+    values = [v for v in values if v]
+    return Counter(values).most_common(1)[0][0] if values else None
+
+
+def main():
+    """Main CLI entry point."""
+    parser = argparse.ArgumentParser(description='Find records of the same candidate under different ICs or names.')
+    parser.add_argument('masterlist', nargs='?', default='baito_2025_FIXED_v3.2.xlsx',
+                        help='Master list xlsx or payment store (.db)')
+    parser.add_argument('--threshold', type=float, default=MATCH_THRESHOLD)
+    parser.add_argument('--output', default='candidate_identity_report.xlsx')
+    add_metrics_arguments(parser)
+    args = parser.parse_args()
+
+    with metrics_session(args.metrics, args.profile):
+        return run(args)
+
+
+def run(args):
+    """Cluster the master list's records and report clusters that join different ICs."""
+    print("="*120)
+    print(" "*36 + "CANDIDATE IDENTITY RESOLUTION")
+    print("="*120)
+
+    if not Path(args.masterlist).exists():
+        print(f"❌ Error: {args.masterlist} not found!")
+        return 1
+
+    df = read_master(args.masterlist).reset_index(drop=True)
+    print(f"\n📂 {len(df):,} records from {args.masterlist}")
+
+    records = [{'ic_number': r.ic_number, 'full_name': r.full_name, 'alternate_name': r.alternate_name,
+                'account_number': r.account_number} for r in df.itertuples()]
+    result = resolve_identities(records, threshold=args.threshold)
+
+    rows = []
+    for cid, entry in result['clusters'].items():
+        members = df.iloc[entry['members']]
+        ics = members['ic_number'].map(normalize_ic).dropna().unique()
+        if len(ics) < 2:
+            continue  # Nothing new - exact-IC merging already groups these
+        rows.append({
+            'Cluster': cid,
+            'Confidence': entry['confidence'],
+            'Review': 'YES' if entry['confidence'] < REVIEW_THRESHOLD else '',
+            'Canonical_IC': canonical_value(members['ic_number'].map(normalize_ic)),
+            'Canonical_Name': canonical_value(members['full_name']),
+            'ICs': ', '.join(ics),
+            'Names': ', '.join(members['full_name'].dropna().unique()),
+            'Records': len(members),
+            'Links': '; '.join(f"{a}~{b} {score:.2f} ({reason})" for a, b, score, reason in entry['links'] if a != b),
+        })
+
+    distinct_ics = df['ic_number'].map(normalize_ic).nunique()
+    print(f"\n   Blocks: {result['blocks']:,} | Pairs scored: {result['pairs_scored']:,} "
+          f"(all-pairs would be {len(records) * (len(records) - 1) // 2:,})")
+    print(f"   Distinct ICs: {distinct_ics:,} → people: {len(result['clusters']):,}")
+    print(f"   Clusters joining different ICs: {len(rows):,} "
+          f"({sum(1 for r in rows if r['Review']):,} below {REVIEW_THRESHOLD} confidence - review)")
+
+    for r in sorted(rows, key=lambda r: r['Confidence'])[:10]:
+        print(f"   {r['Confidence']:.2f}  {r['Names']}  [{r['ICs']}]")
+
+    if rows:
+        report = pd.DataFrame(rows).sort_values(['Confidence', 'Canonical_Name'])
+        report.to_excel(args.output, sheet_name='Identity Clusters', index=False)
+        print(f"\n💾 Report saved: {args.output}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
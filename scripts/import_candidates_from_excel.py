@@ -14,9 +14,15 @@ import pandas as pd
 from dotenv import load_dotenv
 from supabase import create_client, Client
 
+from identity_resolution import resolve_identities, canonical_value, REVIEW_THRESHOLD
+from header_layouts import find_header_rows
+
 # Load environment variables
 load_dotenv()
 
+# Clusters joining different ICs, with the ones that were not merged
+REVIEW_FILE = 'candidate_merge_review.xlsx'
+
 SUPABASE_URL = os.getenv('VITE_SUPABASE_URL')
 # Use service role key for admin operations
 SUPABASE_KEY = os.getenv('SUPABASE_SERVICE_ROLE_KEY') or os.getenv('VITE_SUPABASE_ANON_KEY')
@@ -101,11 +107,7 @@ def extract_candidates_from_csv(csv_path):
         candidates = []
 
         # Find all rows that look like headers (contain "Name" and "IC")
-        header_rows = []
-        for idx, row in raw_df.iterrows():
-            row_str = ' '.join([str(val) for val in row if pd.notna(val)]).lower()
-            if 'name' in row_str and 'ic' in row_str:
-                header_rows.append(idx)
+        header_rows = find_header_rows(raw_df)
 
         if not header_rows:
             print(f"  ⚠️  Skipping {Path(csv_path).name} - Cannot find header rows")
@@ -190,28 +192,73 @@ def extract_candidates_from_csv(csv_path):
         return []
 
 
+def merge_members(members):
+    """
+    One candidate from records of the same person.
+
+    The most common IC and name are kept. Bank details are taken whole from the
+    member with the most of them (the later record wins ties), so a bank name
+    is never paired with another record's account number.
+    """
+    candidate = dict(members[0])
+    candidate['ic_number'] = canonical_value([m['ic_number'] for m in members])
+    candidate['full_name'] = canonical_value([m['full_name'] for m in members])
+
+    bank_members = [m.get('bank_details') or {} for m in members]
+    candidate['bank_details'] = dict(max(reversed(bank_members), key=lambda bank: sum(1 for v in bank.values() if v)))
+    return candidate
+
+
 def merge_candidate_data(existing_candidates):
     """
     Merge duplicate candidates, preferring the one with most complete data.
-    """
-    merged = {}
 
-    for candidate in existing_candidates:
-        ic = candidate['ic_number']
+    Duplicates are found by identity resolution rather than exact IC, so IC
+    typos, alternate names and changed bank details no longer create a second
+    person. Clusters joining different ICs are only merged at REVIEW_THRESHOLD
+    confidence or above; below it each IC is imported as its own candidate.
 
-        if ic not in merged:
-            merged[ic] = candidate
+    Returns: (candidates, review) - review has one row per cluster joining
+    different ICs, with Review 'YES' for the ones left unmerged
+    """
+    result = resolve_identities([
+        {
+            'ic_number': candidate['ic_number'],
+            'full_name': candidate['full_name'],
+            'account_number': (candidate.get('bank_details') or {}).get('account_number')
+        }
+        for candidate in existing_candidates
+    ])
+
+    merged = []
+    review = []
+
+    for entry in result['clusters'].values():
+        members = [existing_candidates[pos] for pos in entry['members']]
+
+        by_ic = {}
+        for member in members:
+            by_ic.setdefault(member['ic_number'], []).append(member)
+
+        if len(by_ic) == 1 or entry['confidence'] >= REVIEW_THRESHOLD:
+            candidates = [merge_members(members)]
         else:
-            # Merge bank details
-            if candidate.get('bank_details'):
-                if not merged[ic].get('bank_details'):
-                    merged[ic]['bank_details'] = {}
+            # Not certain enough to drop an IC - a person checks these instead
+            candidates = [merge_members(group) for group in by_ic.values()]
+        merged.extend(candidates)
 
-                for key, value in candidate['bank_details'].items():
-                    if value and (not merged[ic]['bank_details'].get(key) or len(str(value)) > len(str(merged[ic]['bank_details'].get(key, '')))):
-                        merged[ic]['bank_details'][key] = value
+        if len(by_ic) > 1:
+            review.append({
+                'Confidence': entry['confidence'],
+                'Review': 'YES' if len(candidates) > 1 else '',
+                'Imported_As': ', '.join(f"{c['full_name']} ({c['ic_number']})" for c in candidates),
+                'ICs': ', '.join(by_ic),
+                'Names': ', '.join(dict.fromkeys(m['full_name'] for m in members)),
+                'Records': len(members),
+                'Links': '; '.join(f"{a}~{b} {score:.2f} ({reason})" for a, b, score, reason in entry['links'] if a != b),
+            })
 
-    return list(merged.values())
+    return merged, review
 
 
 def upsert_candidates_to_db(candidates):
@@ -298,8 +345,20 @@ def main():
 
     # Merge duplicate entries
     print("\nMerging duplicate candidates...")
-    merged_candidates = merge_candidate_data(all_candidates)
-    print(f"Unique candidates after merging: {len(merged_candidates)}\n")
+    merged_candidates, review = merge_candidate_data(all_candidates)
+    print(f"Unique candidates after merging: {len(merged_candidates)}")
+
+    # Merges across different ICs are judgement calls - show them before importing
+    if review:
+        held = [r for r in review if r['Review']]
+        print(f"Clusters joining different ICs: {len(review)} "
+              f"({len(review) - len(held)} merged, {len(held)} below {REVIEW_THRESHOLD} imported separately)")
+        for row in sorted(review, key=lambda r: r['Confidence']):
+            flag = '⚠️ ' if row['Review'] else '  '
+            print(f"  {flag}{row['Imported_As']} ← {row['ICs']} [{row['Confidence']:.2f}]")
+        pd.DataFrame(review).sort_values('Confidence').to_excel(REVIEW_FILE, sheet_name='Identity Clusters', index=False)
+        print(f"Review list saved: {REVIEW_FILE}")
+    print()
 
     # Confirm before proceeding
     print("=" * 80)
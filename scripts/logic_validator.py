@@ -4,9 +4,27 @@ Logic Validator - Validates payment calculation logic for each record
 Reads Excel headers, identifies columns, calculates expected total, compares with extracted
 """
 
+import os
 import pandas as pd
 import numpy as np
 from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from source_manifest import load_manifest, resolve_sources, source_file_index, locate_source
+from run_metrics import span, add_arguments, metrics_session
+import validation_cache
+from validation_cache import ValidationCache, run_incremental
+from payment_store import read_master, save_validation_results, store_source_index
+from header_layouts import HeaderLayouts, find_first_header_row
+
+
+# Roles reported in col_map; day/wages/overtime are never filled (the rules map them to days/wage/ot)
+COLUMN_ROLES = dict.fromkeys(['name', 'ic', 'day', 'days', 'wage', 'wages', 'payment', 'ot', 'overtime',
+                              'allowance', 'claim', 'total', 'transport'])
+
+# Column positions per header layout - validation looks up the same few sheets again and again
+COLUMN_LAYOUTS = HeaderLayouts('validator')
+COLUMN_LAYOUTS.preload()
 
 
 def safe_float(val):
@@ -21,63 +39,12 @@ def safe_float(val):
 
 def find_header_row(df):
     """Find the header row containing column names."""
-    for idx, row in df.iterrows():
-        row_str = ' '.join([str(val).lower() for val in row if pd.notna(val)])
-        if 'name' in row_str and 'ic' in row_str:
-            return idx
-    return None
+    return find_first_header_row(df)
 
 
 def identify_columns(df, header_row):
-    """Identify which columns represent which data."""
-    columns = df.iloc[header_row].to_list()
-    columns = [str(col).strip().lower() for col in columns]
-
-    col_map = {
-        'name': None,
-        'ic': None,
-        'day': None,
-        'days': None,
-        'wage': None,
-        'wages': None,
-        'payment': None,
-        'ot': None,
-        'overtime': None,
-        'allowance': None,
-        'claim': None,
-        'total': None,
-        'transport': None
-    }
-
-    for i, col in enumerate(columns):
-        if pd.isna(col):
-            continue
-
-        col = str(col).strip().lower()
-
-        # Exact matches
-        if 'name' in col and 'bank' not in col:
-            col_map['name'] = i
-        elif col in ['ic number', 'ic no', 'ic']:
-            col_map['ic'] = i
-        elif col in ['day', 'days']:
-            col_map['days'] = i
-        elif col in ['wage', 'wages']:
-            col_map['wage'] = i
-        elif col == 'payment':
-            col_map['payment'] = i
-        elif col in ['ot', 'overtime']:
-            col_map['ot'] = i
-        elif 'allowance' in col:
-            col_map['allowance'] = i
-        elif col in ['claim', 'claims']:
-            col_map['claim'] = i
-        elif col == 'total' or col == 'total wages':
-            col_map['total'] = i
-        elif 'transport' in col:
-            col_map['transport'] = i
-
-    return col_map
+    """Identify which columns represent which data (column positions, mapped once per header layout)."""
+    return {**COLUMN_ROLES, **COLUMN_LAYOUTS.lookup(df.iloc[header_row].to_list())}
 
 
 def calculate_expected_total(rows_data, col_map):
@@ -174,9 +141,13 @@ def calculate_expected_total(rows_data, col_map):
     return expected, components, calculation
 
 
-def validate_record_logic(record, source_dir):
+def validate_record_logic(record, source_dir, sheet_df=None, header_row=None, read_error=None):
     """
     Validate a single record by checking payment calculation logic.
+
+    sheet_df: the record's source sheet (header=None) if the caller already loaded it
+    header_row: find_header_row(sheet_df), if the caller already found it
+    read_error: the exception the caller got reading the sheet - reported without reading it again
     """
     result = {
         'name': record['full_name'],
@@ -193,19 +164,30 @@ def validate_record_logic(record, source_dir):
         'issues': []
     }
 
-    excel_file = Path(source_dir) / record['source_file']
+    if read_error is not None:
+        result['status'] = 'ERROR'
+        result['issues'].append(f"Error: {str(read_error)}")
+        return result
+
+    excel_file = locate_source(source_dir, record['source_file'])
 
-    if not excel_file.exists():
+    if sheet_df is None and not excel_file.exists():
         result['status'] = 'FILE_NOT_FOUND'
         result['issues'].append('Excel file not found')
         return result
 
     try:
         # Read the sheet
-        df = pd.read_excel(excel_file, sheet_name=record['source_sheet'], header=None)
+        if sheet_df is None:
+            with span('validate.read_sheet', sheet=record['source_sheet']) as s:
+                df = pd.read_excel(excel_file, sheet_name=record['source_sheet'], header=None)
+                s['rows'] = len(df)
+        else:
+            df = sheet_df
 
         # Find header row
-        header_row = find_header_row(df)
+        if header_row is None:
+            header_row = find_header_row(df)
         if header_row is None:
             result['status'] = 'NO_HEADER'
             result['issues'].append('Could not find header row')
@@ -296,15 +278,89 @@ def validate_record_logic(record, source_dir):
         return result
 
 
-def run_logic_validation(masterlist_path, source_dir, sample_size=None):
-    """Run logic validation on all records."""
+def validate_sheet_group(source_dir, source_file, source_sheet, positions, records):
+    """
+    Validate every record from one source sheet, reading the sheet only once.
+
+    Runs in a worker process. Returns (positions, results) so the caller can
+    put results back in master-list order.
+    """
+    sheet_df = None
+    header_row = None
+    read_error = None
+    excel_file = locate_source(source_dir, source_file)
+
+    if excel_file.exists():
+        try:
+            with span('validate.read_sheet', sheet=source_sheet) as s:
+                sheet_df = pd.read_excel(excel_file, sheet_name=source_sheet, header=None)
+                s['rows'] = len(sheet_df)
+            header_row = find_header_row(sheet_df)
+        except Exception as e:
+            sheet_df = None
+            read_error = e  # Every record reports it; the sheet is not read again
+
+    results = []
+    for record in records:
+        with span('validate.logic', sheet=source_sheet) as s:
+            result = validate_record_logic(record, source_dir, sheet_df=sheet_df, header_row=header_row,
+                                           read_error=read_error)
+            s['result'] = result['status']
+        results.append(result)
+
+    return positions, results
+
+
+def run_sheet_groups(df, source_dir, workers=None):
+    """
+    Validate records grouped by (source_file, source_sheet) across worker processes.
+
+    Returns: results in the same order as df.
+    """
+    records = df.to_dict('records')
+    groups = df.groupby(['source_file', 'source_sheet'], sort=False, dropna=False).indices
+    tasks = [(source_dir, source_file, source_sheet, [int(i) for i in positions], [records[i] for i in positions])
+             for (source_file, source_sheet), positions in groups.items()]
+
+    workers = workers or min(len(tasks), os.cpu_count() or 1)
+    print(f"  {len(tasks)} source sheet(s), {max(1, workers)} worker(s)")
+
+    results = [None] * len(records)
+    done = 0
+
+    def collect(positions, group_results):
+        nonlocal done
+        for pos, result in zip(positions, group_results):
+            results[pos] = result
+        if (done + len(positions)) // 50 > done // 50:
+            print(f"  Progress: {done + len(positions)}/{len(records)}...")
+        done += len(positions)
+
+    if workers <= 1 or len(tasks) <= 1:
+        for task in tasks:
+            collect(*validate_sheet_group(*task))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(validate_sheet_group, *task) for task in tasks]
+            for future in as_completed(futures):
+                collect(*future.result())
+
+    return results
+
+
+def run_logic_validation(masterlist_path, source_dir, sample_size=None, workers=None, cache=None):
+    """
+    Run logic validation on all records (one task per source sheet, spread across cores).
+
+    cache: ValidationCache - only records whose fields or source sheet changed are re-validated
+    """
     print("="*120)
     print(" "*40 + "PAYMENT LOGIC VALIDATOR")
     print("="*120)
 
     # Read masterlist
     print(f"\n📂 Loading masterlist: {masterlist_path}")
-    df = pd.read_excel(masterlist_path, sheet_name='All Candidates', dtype={'account_number': str})
+    df = read_master(masterlist_path)
 
     if sample_size:
         df = df.head(sample_size)
@@ -312,23 +368,22 @@ def run_logic_validation(masterlist_path, source_dir, sample_size=None):
     else:
         print(f"   Validating ALL: {len(df):,} records")
 
-    results = []
     status_counts = {}
 
     print(f"\n{'─'*120}")
     print("VALIDATING PAYMENT LOGIC...")
     print(f"{'─'*120}\n")
 
-    for idx, record in df.iterrows():
-        if idx > 0 and idx % 50 == 0:
-            print(f"  Progress: {idx}/{len(df)}...")
-
-        result = validate_record_logic(record, source_dir)
-        results.append(result)
+    results = run_incremental(cache, df, lambda records: run_sheet_groups(records, source_dir, workers=workers),
+                              prune=not sample_size)
 
+    for result in results:
         status = result['status']
         status_counts[status] = status_counts.get(status, 0) + 1
 
+    # Master loaded from the payment store: keep the results with the records
+    save_validation_results(masterlist_path, 'logic_validator', df, results)
+
     # Summary
     print(f"\n{'='*120}")
     print("VALIDATION SUMMARY")
@@ -380,7 +435,8 @@ def run_logic_validation(masterlist_path, source_dir, sample_size=None):
 
     report_df = pd.DataFrame(report_data)
 
-    with pd.ExcelWriter(report_file, engine='openpyxl') as writer:
+    with span('validate.write_report', file=report_file, rows=len(report_df)), \
+            pd.ExcelWriter(report_file, engine='openpyxl') as writer:
         report_df.to_excel(writer, sheet_name='All Results', index=False)
 
         # Valid records
@@ -399,8 +455,22 @@ def run_logic_validation(masterlist_path, source_dir, sample_size=None):
 
 
 if __name__ == '__main__':
-    masterlist_path = 'baito_2025_COMPLETE_v3.xlsx'
-    source_dir = '/Users/baito.kevin/Downloads/PROMOTER PAYMENT & CLAIMS 2025/Baito Promoter 2025/'
-
-    # Validate all records
-    results, stats = run_logic_validation(masterlist_path, source_dir)
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Validate payment calculation logic against the source workbooks.')
+    parser.add_argument('masterlist', nargs='?', default='baito_2025_COMPLETE_v3.xlsx')
+    parser.add_argument('--workers', type=int, default=None, help='Worker processes (default: one per core)')
+    add_arguments(parser)
+    validation_cache.add_arguments(parser)
+    args = parser.parse_args()
+
+    masterlist_path = args.masterlist
+    # Source workbooks come from the store, or the manifest (payment_sources.json), looked up by file name
+    source_dir = store_source_index(masterlist_path) or source_file_index(resolve_sources(load_manifest()))
+    cache = ValidationCache('logic_validator', source_dir, __file__, cache_dir=args.cache_dir,
+                            enabled=not args.revalidate)
+
+    # Validate all records (unchanged records come from the cache)
+    with metrics_session(args.metrics, profile=args.profile):
+        results, stats = run_logic_validation(masterlist_path, source_dir,
+                                              workers=1 if args.profile else args.workers, cache=cache)
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Streaming Master Writer
+Writes the master list in openpyxl write-only mode: rows are streamed to disk, never held as cell objects.
+"""
+
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font
+
+
+# Master list columns, in sheet order
+MASTER_COLUMNS = [
+    'month',
+    'source_file',
+    'source_sheet',
+    'project_name',
+    'full_name',
+    'alternate_name',
+    'ic_number',
+    'bank_name',
+    'account_number',
+    'position',
+    'days_worked',
+    'total_wages',
+    'total_ot',
+    'total_allowance',
+    'total_claim',
+    'total_payment',
+    'work_dates',
+    'project_date_range',
+    'payment_due_date',
+    'location',
+    'time_schedule',
+    'roster_info',
+    'notes',
+    'project_notes'
+]
+
+# Per-column number formats, declared once before any row is written
+MASTER_COLUMN_FORMATS = {
+    'ic_number': '@',
+    'account_number': '@',  # Text - keeps every digit and leading zeros
+    'days_worked': '0.0#',
+    'total_wages': '#,##0.00',
+    'total_ot': '#,##0.00',
+    'total_allowance': '#,##0.00',
+    'total_claim': '#,##0.00',
+    'total_payment': '#,##0.00',
+}
+
+SUMMARY_COLUMNS = ['month', 'Projects', 'Records', 'Total Payment (RM)']
+
+
+def _is_blank(value):
+    """True for None, '' and NaN (NaN is the only value not equal to itself)."""
+    return value is None or value == '' or (isinstance(value, float) and value != value)
+
+
+def _header_row(ws, columns):
+    """Build a bold header row."""
+    row = []
+    for name in columns:
+        cell = WriteOnlyCell(ws, value=name)
+        cell.font = Font(bold=True)
+        row.append(cell)
+    return row
+
+
+def write_master_workbook(rows, output_file, columns, column_formats=None):
+    """
+    Write "All Candidates" and "Monthly Summary" in one streaming pass.
+
+    Args:
+        rows: Iterable of tuples in `columns` order (e.g. df.itertuples(index=False, name=None))
+        output_file: Path of the xlsx to create
+        columns: Column names, must include month, project_name, full_name and total_payment
+        column_formats: {column: number_format}, defaults to MASTER_COLUMN_FORMATS
+
+    Returns:
+        Number of candidate rows written
+    """
+    column_formats = MASTER_COLUMN_FORMATS if column_formats is None else column_formats
+    formats = [column_formats.get(col) for col in columns]
+    text_cols = {i for i, fmt in enumerate(formats) if fmt == '@'}
+
+    month_pos = columns.index('month')
+    project_pos = columns.index('project_name')
+    name_pos = columns.index('full_name')
+    payment_pos = columns.index('total_payment')
+
+    wb = Workbook(write_only=True)
+    ws_all = wb.create_sheet('All Candidates')
+    ws_summary = wb.create_sheet('Monthly Summary')
+
+    ws_all.append(_header_row(ws_all, columns))
+
+    # Monthly summary accumulated while the rows stream past
+    monthly = {}
+    count = 0
+
+    for values in rows:
+        out = []
+        for i, value in enumerate(values):
+            if _is_blank(value):
+                out.append(None)
+                continue
+            if i in text_cols:
+                value = str(value)
+            if formats[i]:
+                cell = WriteOnlyCell(ws_all, value=value)
+                cell.number_format = formats[i]
+                out.append(cell)
+            else:
+                out.append(value)
+        ws_all.append(out)
+        count += 1
+
+        month = values[month_pos]
+        stats = monthly.setdefault(month, {'projects': set(), 'records': 0, 'payment': 0.0})
+        if not _is_blank(values[project_pos]):
+            stats['projects'].add(values[project_pos])
+        # Records counts named candidates, as count() on full_name did
+        if not _is_blank(values[name_pos]):
+            stats['records'] += 1
+        if not _is_blank(values[payment_pos]):
+            stats['payment'] += values[payment_pos]
+
+    # Same layout as df.groupby('month').agg(...).to_excel()
+    ws_summary.append(_header_row(ws_summary, SUMMARY_COLUMNS))
+    for month in sorted(monthly, key=str):
+        stats = monthly[month]
+        payment_cell = WriteOnlyCell(ws_summary, value=stats['payment'])
+        payment_cell.number_format = '#,##0.00'
+        ws_summary.append([month, len(stats['projects']), stats['records'], payment_cell])
+
+    wb.save(output_file)
+    return count
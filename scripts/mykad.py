@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+MyKad Decoder
+Splits IC numbers into birth date, place-of-birth code and gender as compact integer columns, flagging impossible dates, unassigned place codes and passport-style IDs.
+"""
+
+import argparse
+import sys
+from datetime import date
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+
+# Status codes, stored as int8 (index into this list)
+IC_STATUSES = ['MISSING', 'MYKAD', 'PASSPORT', 'BAD_DATE', 'BAD_PLACE', 'BAD_FORMAT']
+MISSING, MYKAD, PASSPORT, BAD_DATE, BAD_PLACE, BAD_FORMAT = range(len(IC_STATUSES))
+
+# Place-of-birth digits 7-8: Malaysian states, then country/region codes; 00, 17-20, 69, 70, 73, 80, 81 and 94-97 are unassigned
+STATE_CODES = {
+    'Johor': [1, 21, 22, 23, 24], 'Kedah': [2, 25, 26, 27], 'Kelantan': [3, 28, 29], 'Melaka': [4, 30],
+    'Negeri Sembilan': [5, 31, 59], 'Pahang': [6, 32, 33], 'Pulau Pinang': [7, 34, 35], 'Perak': [8, 36, 37, 38, 39],
+    'Perlis': [9, 40], 'Selangor': [10, 41, 42, 43, 44], 'Terengganu': [11, 45, 46], 'Sabah': [12, 47, 48, 49],
+    'Sarawak': [13, 50, 51, 52, 53], 'WP Kuala Lumpur': [14, 54, 55, 56, 57], 'WP Labuan': [15, 58],
+    'WP Putrajaya': [16], 'Unknown state': [82],
+}
+FOREIGN_CODES = set(range(60, 69)) | {71, 72} | set(range(74, 80)) | set(range(83, 94)) | {98, 99}
+
+# place code -> state name ('Foreign' for country codes); a lookup table indexed by the code
+PLACE_NAMES = np.full(100, '', dtype=object)
+for _state, _codes in STATE_CODES.items():
+    PLACE_NAMES[_codes] = _state
+PLACE_NAMES[sorted(FOREIGN_CODES)] = 'Foreign'
+VALID_PLACE = PLACE_NAMES != ''
+
+# Two-digit birth years resolve to the latest century that leaves the holder at least this old
+MIN_AGE = 15
+
+# Passports, old ICs and police/army numbers: letters then digits ('A12345678', 'RF123456', 'T1234567')
+PASSPORT_PATTERN = r'[A-Z]{1,3}\d{5,10}[A-Z]?'
+
+DAYS_IN_MONTH = np.array([0, 31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31])
+
+
+def normalize_ics(values):
+    """IC text as decoded: upper-case, no spaces/dashes, Excel's '.0' dropped, an 11-digit MyKad's lost zero restored."""
+    text = values.astype(object).where(values.notna(), '').astype(str).str.strip().str.upper()
+    text = text.str.replace(r'\.0$', '', regex=True).str.replace(r'[\s\-]', '', regex=True)
+    return text.str.replace(r'^(\d{11})$', r'0\1', regex=True)
+
+
+def decode_ics(values, today=None):
+    """
+    Decode a column of IC numbers.
+
+    Each distinct IC is decoded once, with integer arithmetic on the 12
+    digits rather than string slicing per record.
+
+    Args:
+        values: Series of IC numbers (any format)
+        today: Reference date for resolving two-digit birth years
+
+    Returns: DataFrame (same index) with
+        ic          normalized text
+        status      int8 index into IC_STATUSES
+        ic_key      int64 of the 12 digits (0 unless 12 digits)
+        birth_date  int32 YYYYMMDD (0 unless a real date)
+        place       int8 place-of-birth code (-1 unless 12 digits)
+        gender      int8 1 male (odd last digit) / 2 female (even) / 0 unless MyKad
+    """
+    codes, uniques = pd.factorize(values)
+    text = normalize_ics(pd.Series(np.append(np.asarray(uniques, dtype=object), None), dtype=object))
+    n = len(text)
+    status = np.full(n, BAD_FORMAT, dtype=np.int8)
+    ic_key = np.zeros(n, dtype=np.int64)
+    birth_date = np.zeros(n, dtype=np.int32)
+    place = np.full(n, -1, dtype=np.int8)
+    gender = np.zeros(n, dtype=np.int8)
+
+    status[(text == '').to_numpy()] = MISSING
+    status[text.str.fullmatch(PASSPORT_PATTERN).to_numpy(dtype=bool)] = PASSPORT
+
+    digits = text.str.fullmatch(r'\d{12}').to_numpy(dtype=bool)
+    if digits.any():
+        number = text[digits].astype(np.int64).to_numpy()
+        yymmdd, place_code, last = number // 10 ** 6, (number // 10 ** 4) % 100, number % 10
+        yy, month, day = yymmdd // 10000, (yymmdd // 100) % 100, yymmdd % 100
+
+        this_year = (today or date.today()).year
+        year = 2000 + yy
+        year[year > this_year - MIN_AGE] -= 100
+        leap = (year % 4 == 0) & ((year % 100 != 0) | (year % 400 == 0))
+        month_ok = (month >= 1) & (month <= 12)
+        days = DAYS_IN_MONTH[np.where(month_ok, month, 0)] + ((month == 2) & leap)
+        date_ok = month_ok & (day >= 1) & (day <= days)
+        place_ok = VALID_PLACE[place_code]
+
+        ic_key[digits] = number
+        place[digits] = place_code
+        birth_date[digits] = np.where(date_ok, year * 10000 + month * 100 + day, 0)
+        status[digits] = np.select([~date_ok, ~place_ok], [BAD_DATE, BAD_PLACE], MYKAD)
+        gender[digits] = np.where(date_ok & place_ok, np.where(last % 2 == 1, 1, 2), 0)
+
+    # Missing values have code -1, which picks the appended None
+    decoded = pd.DataFrame({'ic': text.to_numpy(dtype=object), 'status': status, 'ic_key': ic_key,
+                            'birth_date': birth_date, 'place': place, 'gender': gender})
+    return decoded.iloc[codes].set_index(values.index)
+
+
+def status_labels(status):
+    """int8 status codes as a categorical of IC_STATUSES names."""
+    return pd.Categorical.from_codes(np.asarray(status), IC_STATUSES)
+
+
+def birth_dates(birth_date):
+    """YYYYMMDD integers as datetimes (NaT for 0)."""
+    return pd.to_datetime(pd.Series(birth_date).where(lambda s: s > 0).astype('Int64').astype(str),
+                          format='%Y%m%d', errors='coerce')
+
+
+def main():
+    """Main CLI entry point."""
+    # payment_store decodes ICs for its index, so it is imported here rather than at module level
+    from payment_store import read_master
+
+    parser = argparse.ArgumentParser(description='Decode and validate the IC numbers in a master list.')
+    parser.add_argument('masterlist', nargs='?', default='baito_2025_FIXED_v3.2.xlsx',
+                        help='Master list xlsx or payment store (.db)')
+    parser.add_argument('--output', default='ic_report.xlsx', help='Invalid IC report')
+    args = parser.parse_args()
+
+    print("="*120)
+    print(" "*48 + "MYKAD DECODER")
+    print("="*120)
+
+    if not Path(args.masterlist).exists():
+        print(f"❌ Error: {args.masterlist} not found!")
+        return 1
+
+    df = read_master(args.masterlist)
+    decoded = decode_ics(df['ic_number'])
+    labels = status_labels(decoded['status'])
+    print(f"\n📂 {len(df):,} records, {decoded['ic'].nunique():,} distinct IDs")
+    for status, count in pd.Series(labels).value_counts(sort=False).items():
+        print(f"   {status:12} {count:>8,}")
+
+    mykad = decoded[decoded['status'] == MYKAD].drop_duplicates('ic')
+    if len(mykad):
+        states = pd.Series(PLACE_NAMES[mykad['place']]).value_counts()
+        print(f"\n👤 MyKad holders: {(mykad['gender'] == 1).sum():,} male, {(mykad['gender'] == 2).sum():,} female; "
+              f"born {mykad['birth_date'].min() // 10000}-{mykad['birth_date'].max() // 10000}")
+        print(f"   Top places: " + ', '.join(f"{state} ({n:,})" for state, n in states.head(5).items()))
+
+    invalid = decoded['status'].isin([BAD_DATE, BAD_PLACE, BAD_FORMAT])
+    if invalid.any():
+        report = df.loc[invalid, ['month', 'source_file', 'project_name', 'full_name', 'ic_number']].copy()
+        report['ic_status'] = labels[invalid.to_numpy()]
+        report.to_excel(args.output, index=False)
+        print(f"\n⚠️  {invalid.sum():,} record(s) with an invalid IC - saved: {args.output}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+"""
+Payment Pre-flight
+Vectorized checks over a whole DuitNow/ECP batch before any file is written, returning one compact error table.
+"""
+
+import re
+from datetime import date, datetime, timedelta
+
+import numpy as np
+import pandas as pd
+from openpyxl.utils import get_column_letter
+
+from mykad import MYKAD, decode_ics
+from payment_templates import START_ROW
+
+
+# role -> batch column, per format; rules are the templates' row-3 limits and data validations
+FORMATS = {
+    'duitnow': {
+        'columns': {'payment_type': 'paymentType', 'id_type': 'idType', 'bic': 'bic', 'id_number': 'recipientId',
+                    'amount': 'amount', 'reference': 'reference', 'details': 'paymentDetails',
+                    'email1': 'email1', 'email2': 'email2', 'mobile1': 'mobile1', 'mobile2': 'mobile2'},
+        'payment_types': ['DTN'],
+        'id_types': ['MN', 'NI', 'PL', 'ML', 'PP', 'BR', 'FT', 'CC', 'LP', 'HP'],
+        # BIC is mandatory for these ID types only, and at most 8 characters
+        'bic_id_types': ['FT', 'CC', 'LP', 'HP'],
+        'bic_pattern': r'[A-Z]{4}MY[A-Z0-9]{2}',
+        'limits': {'id_number': 20, 'reference': 140, 'details': 140, 'email1': 70, 'email2': 70},
+    },
+    'ecp': {
+        'columns': {'payment_type': 'payment_type', 'account': 'account', 'bic': 'bic', 'name': 'name',
+                    'id_type': 'id_type', 'id_number': 'id_number', 'amount': 'amount', 'reference': 'reference',
+                    'details': 'details', 'email1': 'email1', 'email2': 'email2',
+                    'mobile1': 'mobile1', 'mobile2': 'mobile2'},
+        'payment_types': ['PBB', 'IBG', 'REN'],
+        'id_types': ['NI', 'OI', 'BR', 'PL', 'ML', 'PP', 'OT'],
+        'rentas_id_types': ['NI', 'OI', 'BR', 'OT'],
+        'bic_pattern': r'[A-Z]{4}MY[A-Z0-9]{2}(?:[A-Z0-9]{3})?',
+        'limits': {'name': 120, 'id_number': 29, 'reference': 20, 'details': 20, 'email1': 40, 'email2': 40},
+    },
+}
+
+# Malaysian mobile, with or without the 60 country code - the bank sends (and charges) SMS to any number
+MOBILE_PATTERN = r'(?:60|0)1\d{8,9}'
+EMAIL_PATTERN = r'[^@\s]+@[^@\s.]+(?:\.[^@\s.]+)+'
+
+# Amounts are compared in sen
+AMOUNT_LIMIT = 10 ** 15
+
+ERROR_COLUMNS = ['row', 'column', 'field', 'check', 'value', 'message']
+
+
+def as_text(values):
+    """Values as stripped strings ('' for missing), converting each distinct value once."""
+    codes, uniques = pd.factorize(values)
+    cleaned = pd.Series(uniques, dtype=object).astype(str).str.strip().to_numpy(dtype=object)
+    # Missing values have code -1, which picks the appended ''
+    return pd.Series(np.append(cleaned, '')[codes], dtype=object)
+
+
+def matches(values, pattern):
+    """Boolean array: value fully matches pattern. Batches repeat values (types, BICs, mobiles), so each is tested once."""
+    codes, uniques = pd.factorize(values)
+    return pd.Series(uniques, dtype=object).str.fullmatch(pattern).to_numpy(dtype=bool)[codes]
+
+
+def check_payment_date(payment_date, today=None):
+    """Message if payment_date is not a DD/MM/YYYY date from today to 59 days ahead (the templates' B1 rule)."""
+    today = today or date.today()
+    try:
+        if not re.fullmatch(r'\d{2}/\d{2}/\d{4}', str(payment_date)):
+            raise ValueError(payment_date)
+        value = datetime.strptime(str(payment_date), '%d/%m/%Y').date()
+    except ValueError:
+        return 'payment date must be DD/MM/YYYY'
+    if not today <= value <= today + timedelta(days=59):
+        return f"payment date must be between {today:%d/%m/%Y} and {today + timedelta(days=59):%d/%m/%Y}"
+    return None
+
+
+def preflight(batch, fmt, payment_date=None, expected_total=None, tolerance=0.005, directory=None):
+    """
+    Validate a whole payment batch in one pass of column operations.
+
+    Args:
+        batch: DataFrame of template rows in template column order (DuitNow COLUMNS keys or ECP_COLUMNS)
+        fmt: 'duitnow' or 'ecp'
+        payment_date: B1 value to check, if given
+        expected_total: Control total (RM) the batch must add up to, e.g. the master list payroll
+        tolerance: Allowed control-total difference (RM)
+        directory: ecp_export.BankDirectory - ECP BICs must then belong to an IBG/RENTAS member, not just look like a BIC
+
+    Returns: DataFrame of errors (row, column, field, check, value, message) - empty when the batch is clean
+    """
+    spec = FORMATS[fmt]
+    roles = {role: name for role, name in spec['columns'].items() if name in batch.columns}
+    letters = {role: get_column_letter(batch.columns.get_loc(name) + 1) for role, name in roles.items()}
+    text = {role: as_text(batch[name]) for role, name in roles.items() if role != 'amount'}
+    amount = pd.to_numeric(batch[roles['amount']], errors='coerce').reset_index(drop=True)
+    cents = (amount * 100).round()
+
+    id_type, id_number, bic = text['id_type'], text['id_number'], text['bic']
+    # The decoder restores an 11-digit IC's lost zero; the file itself must carry all 12 digits
+    mykad = (id_number.str.len() == 12) & (decode_ics(id_number)['status'] == MYKAD)
+    checks = [
+        ('PAYMENT_TYPE', 'payment_type', ~text['payment_type'].isin(spec['payment_types']),
+         f"payment type must be {'/'.join(spec['payment_types'])}"),
+        ('ID_TYPE', 'id_type', ~id_type.isin(spec['id_types']) & ((id_type != '') | (fmt == 'duitnow')),
+         f"ID type must be one of {', '.join(spec['id_types'])}"),
+        ('MYKAD', 'id_number', (id_type == 'NI') & ~mykad,
+         'NI needs a 12-digit MyKad number with a valid birth date and place code'),
+        ('ID_NUMBER', 'id_number', ~matches(id_number, rf"[A-Za-z0-9]{{1,{spec['limits']['id_number']}}}")
+         & ((id_type != '') | (fmt == 'duitnow')),
+         f"ID must be 1-{spec['limits']['id_number']} letters/digits, no spaces or symbols"),
+        ('AMOUNT', 'amount', amount.isna() | (amount <= 0) | (cents.abs() >= AMOUNT_LIMIT),
+         'amount must be a positive number'),
+        ('AMOUNT_DECIMALS', 'amount', amount.notna() & ((amount * 100 - cents).abs() > 1e-6),
+         'amount must have at most 2 decimal places'),
+        ('REFERENCE', 'reference', text['reference'] == '', 'recipient reference is mandatory'),
+    ]
+
+    if fmt == 'duitnow':
+        checks += [
+            ('MOBILE_ID', 'id_number', (id_type == 'MN') & ~matches(id_number, MOBILE_PATTERN),
+             'MN needs a Malaysian mobile number (01xxxxxxxx or 601xxxxxxxx)'),
+            ('BIC', 'bic', id_type.isin(spec['bic_id_types']) & (bic == ''),
+             f"BIC is mandatory for ID types {', '.join(spec['bic_id_types'])}"),
+            ('BIC', 'bic', (bic != '') & ~matches(bic, spec['bic_pattern']),
+             'BIC must be an 8-character Malaysian BIC'),
+        ]
+    else:
+        rentas = text['payment_type'] == 'REN'
+        account = text['account']
+        if directory is not None:
+            checks += [
+                ('BIC', 'bic', ~rentas & ~bic.isin(directory.ibg_bics), 'BIC is not an IBG member'),
+                ('BIC', 'bic', rentas & ~bic.isin(directory.rentas_bics), 'BIC is not a RENTAS member'),
+            ]
+        else:
+            checks.append(('BIC', 'bic', ~matches(bic, spec['bic_pattern']), 'BIC must be an 8 or 11-character Malaysian BIC'))
+        checks += [
+            ('ACCOUNT', 'account', ~matches(account, r'\d{5,20}'), 'account must be 5-20 digits'),
+            ('NAME', 'name', (text['name'] == '') | text['name'].str.contains(r'\d'),
+             'beneficiary name is mandatory and may not contain digits'),
+            ('ID_TYPE', 'id_type', rentas & (id_type != '') & ~id_type.isin(spec['rentas_id_types']),
+             f"RENTAS ID type must be one of {', '.join(spec['rentas_id_types'])}"),
+        ]
+
+    for role in ('mobile1', 'mobile2'):
+        if role in text:
+            checks.append(('MOBILE', role, (text[role] != '') & ~matches(text[role], MOBILE_PATTERN),
+                           'notification mobile must be a Malaysian mobile number, digits only'))
+    for role in ('email1', 'email2'):
+        if role in text:
+            checks.append(('EMAIL', role, (text[role] != '') & ~matches(text[role], EMAIL_PATTERN)
+                           | text[role].str.contains('..', regex=False), 'invalid email address'))
+    for role, limit in spec['limits'].items():
+        if role in text:
+            checks.append(('LENGTH', role, text[role].str.len() > limit, f"{role} longer than {limit} characters"))
+
+    # The same recipient paid the same amount under the same reference: flag every repeat, pointing at the first
+    keys = pd.DataFrame({'id': id_number.str.upper(), 'cents': cents, 'reference': text['reference'].str.upper()})
+    repeat = keys.duplicated(keep='first')
+    if repeat.any():
+        group = keys.groupby(['id', 'cents', 'reference'], sort=False, dropna=False).ngroup()
+        first = keys.index.to_series().groupby(group).transform('min')
+        checks.append(('DUPLICATE', 'id_number', repeat,
+                       'same recipient, amount and reference as row ' + (first + START_ROW).astype(str)))
+
+    errors = []
+    for check, role, mask, message in checks:
+        hit = np.flatnonzero(np.asarray(mask.fillna(True) if isinstance(mask, pd.Series) else mask, dtype=bool))
+        if not len(hit):
+            continue
+        values = amount if role == 'amount' else text[role]
+        errors.append(pd.DataFrame({
+            'row': hit + START_ROW,
+            'column': letters[role],
+            'field': roles[role],
+            'check': check,
+            'value': values.to_numpy(dtype=object)[hit],
+            'message': message.to_numpy()[hit] if isinstance(message, pd.Series) else message,
+        }))
+
+    # Batch-level checks have no data row
+    if payment_date is not None:
+        message = check_payment_date(payment_date)
+        if message:
+            errors.append(pd.DataFrame([[1, 'B', 'paymentDate', 'PAYMENT_DATE', payment_date, message]],
+                                       columns=ERROR_COLUMNS))
+    if expected_total is not None:
+        total = cents.sum() / 100
+        if abs(total - expected_total) > tolerance:
+            errors.append(pd.DataFrame([[None, letters['amount'], roles['amount'], 'CONTROL_TOTAL', round(total, 2),
+                                         f"batch total RM {total:,.2f} != expected RM {expected_total:,.2f} "
+                                         f"(difference RM {total - expected_total:,.2f})"]], columns=ERROR_COLUMNS))
+
+    if not errors:
+        return pd.DataFrame(columns=ERROR_COLUMNS)
+    return pd.concat(errors, ignore_index=True).sort_values(['row', 'column'], na_position='first', kind='stable',
+                                                            ignore_index=True)
+
+
+def print_errors(errors, limit=5):
+    """Errors per check with a few example rows each."""
+    print(f"\n❌ Pre-flight failed: {len(errors):,} error(s) in {errors['row'].nunique():,} row(s)")
+    for check, group in errors.groupby('check', sort=False):
+        print(f"   {check:16} {len(group):>6,}  {group['message'].iloc[0]}")
+        for error in group.head(limit).itertuples():
+            where = f"{error.column}{int(error.row)}" if pd.notna(error.row) else error.column
+            print(f"      {where:>8}  {error.value}")
@@ -0,0 +1,382 @@
+#!/usr/bin/env python3
+"""
+Payment Reconciliation
+Joins the bank's status/return file to the generated DuitNow/ECP batch and writes paid/rejected/missing statuses back to the store.
+"""
+
+import argparse
+import re
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import openpyxl
+
+from payment_store import PaymentStore, is_store_path
+from payment_templates import START_ROW
+
+
+VALIDATOR = 'bank_return'
+
+# Return-file column -> header keywords (lower-case substrings), checked in order
+RETURN_FIELDS = {
+    'recipient_id': ['duitnow id', 'identification', 'recipient id', 'beneficiary id', 'bene id', 'id number',
+                     'id no', 'ic no', 'ic number', 'nric', 'passport'],
+    'amount': ['amount'],
+    'reference': ['recipient reference', 'reference', 'ref'],
+    'status': ['transaction status', 'payment status', 'status'],
+    'reason': ['reason', 'remark', 'description', 'error', 'message'],
+    'name': ['beneficiary name', 'bene name', 'recipient name', 'name'],
+}
+
+# Bank status texts meaning the money went out, matched against the whole (normalized) status.
+# Fails closed: any other status, and anything negated ('UNSUCCESSFUL', 'NOT PROCESSED'), is rejected.
+PAID_PATTERN = r'(?:PAYMENT |TRANSACTION )?(?:SUCCESS|SUCCESSFUL|PAID|COMPLETED?|PROCESSED|ACCEPTED|CREDITED|APPROVED|OK)'
+NEGATION_PATTERN = r'\b(?:UN|NOT?|NON|FAIL|REJECT|DECLIN|INVALID|ERROR|RETURN|CANCEL|PENDING)'
+
+# Generated template files: format -> (recipient ID, amount, reference) columns, 0-based
+TEMPLATE_FIELDS = {
+    'duitnow': (3, 4, 5),
+    'ecp': (5, 6, 7),
+}
+
+RESULT_COLUMNS = ['status', 'file', 'row', 'recipient_id', 'name', 'amount', 'reference', 'bank_status', 'reason',
+                  'return_row', 'record_ids']
+
+FAKE_REASONS = ['INVALID ACCOUNT NUMBER', 'ACCOUNT CLOSED', 'BENEFICIARY NAME MISMATCH', 'ACCOUNT DORMANT',
+                'INVALID ID NUMBER']
+
+
+def per_value(values, convert):
+    """Apply a Series -> Series conversion once per distinct value (references and amounts repeat a lot)."""
+    codes, uniques = pd.factorize(values)
+    # Missing values have code -1, which picks the appended None
+    converted = convert(pd.Series(np.append(np.asarray(uniques, dtype=object), None), dtype=object)).to_numpy()
+    return pd.Series(converted[codes], index=values.index)
+
+
+def is_paid(statuses):
+    """Boolean Series: bank status says paid (see PAID_PATTERN)."""
+    def check(text):
+        text = text.fillna('').astype(str).str.upper().str.replace(r'[^A-Z]+', ' ', regex=True).str.strip()
+        return text.str.fullmatch(PAID_PATTERN) & ~text.str.contains(NEGATION_PATTERN)
+
+    return per_value(statuses, check).astype(bool)
+
+
+def normalize_id(values):
+    """Recipient IDs as join keys: upper-case, no spaces/dashes, Excel's '.0' and lost MyKad zero restored."""
+    text = values.fillna('').astype(str).str.upper().str.replace(r'[\s\-]', '', regex=True)
+    text = text.str.replace(r'\.0$', '', regex=True)
+    return text.str.replace(r'^(\d{11})$', r'0\1', regex=True)
+
+
+def normalize_reference(values):
+    return values.fillna('').astype(str).str.upper().str.replace(r'\s+', ' ', regex=True).str.strip()
+
+
+def to_cents(values):
+    """Amounts ('1,234.50', 'RM 10', 10.5) as integer sen; unparseable amounts become -1."""
+    text = values.astype(object).where(values.notna(), '')
+    number = pd.to_numeric(text.astype(str).str.replace(r'[^\d.\-]', '', regex=True), errors='coerce')
+    return (number * 100).round().fillna(-1).astype(np.int64)
+
+
+def read_batch(paths):
+    """
+    The generated batch: ecp_export / fill-duitnow-template manifests (_batch.csv) and/or filled DuitNow/ECP xlsx files.
+
+    Returns: DataFrame with file, row, recipient_id, name, amount, reference, record_ids
+    """
+    frames = []
+    for path in map(Path, paths):
+        if path.suffix.lower() == '.csv':
+            frame = pd.read_csv(path, dtype={'recipient_id': str, 'account': str, 'record_ids': str})
+        else:
+            frame = read_template_rows(path)
+        frames.append(frame)
+    batch = pd.concat(frames, ignore_index=True)
+    for column in ('name', 'record_ids'):
+        if column not in batch.columns:
+            batch[column] = ''
+    return batch[['file', 'row', 'recipient_id', 'name', 'amount', 'reference', 'record_ids']]
+
+
+def read_template_rows(path):
+    """Data rows of a filled template, from row 4 to the TOTAL row."""
+    wb = openpyxl.load_workbook(path, read_only=True, data_only=True)
+    ws = wb.worksheets[0]
+    header = str(ws.cell(row=2, column=1).value or '')
+    fmt = 'duitnow' if 'DTN' in header else 'ecp'
+    id_col, amount_col, reference_col = TEMPLATE_FIELDS[fmt]
+    name_col = 3 if fmt == 'ecp' else None
+
+    rows = []
+    # Only the columns up to the reference are read
+    for row_num, values in enumerate(ws.iter_rows(min_row=START_ROW, max_col=reference_col + 1, values_only=True),
+                                     START_ROW):
+        first = values[0] if values else None
+        if first is None or str(first).strip().upper().startswith('TOTAL'):
+            break
+        rows.append((path.name, row_num, values[id_col], values[name_col] if name_col is not None else '',
+                     values[amount_col], values[reference_col]))
+    wb.close()
+    return pd.DataFrame(rows, columns=['file', 'row', 'recipient_id', 'name', 'amount', 'reference'])
+
+
+def find_return_columns(labels):
+    """{field: column position} for a header row, or None when it lacks an ID, amount or status column."""
+    labels = [re.sub(r'[^a-z0-9]+', ' ', str(label).lower()).strip() if label is not None else '' for label in labels]
+    mapping = {}
+    for field, keywords in RETURN_FIELDS.items():
+        for keyword in keywords:
+            match = next((i for i, label in enumerate(labels)
+                          if i not in mapping.values() and re.search(rf"\b{keyword}\b", label)), None)
+            if match is not None:
+                mapping[field] = match
+                break
+    if not {'recipient_id', 'amount', 'status'} <= set(mapping):
+        return None
+    return mapping
+
+
+def read_return(path, scan_rows=30):
+    """
+    Bank status export (CSV or xlsx) as recipient_id, amount, reference, status, reason, name, return_row.
+
+    Bank reports put a title block above the table, so the header row is
+    found by scanning the first rows for ID, amount and status columns.
+    """
+    path = Path(path)
+    if path.suffix.lower() == '.csv':
+        raw = pd.read_csv(path, header=None, dtype=str, keep_default_na=False, skip_blank_lines=False,
+                          names=range(64))
+    else:
+        raw = pd.read_excel(path, header=None, dtype=str, keep_default_na=False)
+    raw = raw.dropna(axis=1, how='all')
+
+    for header_row in range(min(scan_rows, len(raw))):
+        mapping = find_return_columns(raw.iloc[header_row].tolist())
+        if mapping:
+            break
+    else:
+        raise ValueError(f"{path.name}: no header row with recipient ID, amount and status columns "
+                         f"in the first {scan_rows} rows")
+
+    body = raw.iloc[header_row + 1:]
+    result = pd.DataFrame({field: body.iloc[:, col].to_numpy() for field, col in mapping.items()})
+    for field in RETURN_FIELDS:
+        if field not in result.columns:
+            result[field] = ''
+    # 1-based line/row number in the bank file, for tracing
+    result['return_row'] = np.arange(header_row + 2, header_row + 2 + len(body))
+    # Summary lines (totals, blank rows) have no recipient ID
+    result = result[result['recipient_id'].fillna('').astype(str).str.strip() != '']
+    return result.reset_index(drop=True)
+
+
+def join_keys(frame):
+    """(id, cents, reference, n) - n numbers repeats of the same payment so duplicates pair up one-to-one."""
+    keys = pd.DataFrame({
+        'key_id': normalize_id(frame['recipient_id']),
+        'key_cents': per_value(frame['amount'], to_cents).astype(np.int64),
+        'key_reference': per_value(frame['reference'], normalize_reference),
+    })
+    keys['key_n'] = keys.groupby(['key_id', 'key_cents', 'key_reference'], sort=False).cumcount()
+    return keys
+
+
+def reconcile(batch, returns, match_reference=True):
+    """
+    Hash-join the bank return to the batch on (recipient ID, amount, reference).
+
+    Args:
+        batch: read_batch() output
+        returns: read_return() output
+        match_reference: False when the bank report drops or truncates references
+
+    Returns: DataFrame (RESULT_COLUMNS) with status paid / rejected / missing (in batch, not in return)
+             / unexpected (in return, not in batch)
+    """
+    left = pd.concat([batch.reset_index(drop=True), join_keys(batch)], axis=1)
+    right = pd.concat([returns.reset_index(drop=True).add_prefix('bank_'), join_keys(returns)], axis=1)
+    on = ['key_id', 'key_cents', 'key_reference', 'key_n']
+    if not match_reference:
+        for frame in (left, right):
+            frame['key_reference'] = ''
+            frame['key_n'] = frame.groupby(['key_id', 'key_cents'], sort=False).cumcount()
+
+    merged = left.merge(right, on=on, how='outer', indicator=True, sort=False)
+    paid = is_paid(merged['bank_status'])
+    merged['status'] = np.select(
+        [merged['_merge'] == 'left_only', merged['_merge'] == 'right_only', paid],
+        ['missing', 'unexpected', 'paid'], 'rejected')
+
+    # Unexpected rows only exist on the bank side
+    bank_only = merged['_merge'] == 'right_only'
+    for column in ('recipient_id', 'name', 'amount', 'reference'):
+        merged[column] = merged[column].where(~bank_only, merged[f"bank_{column}"])
+    merged['amount'] = pd.to_numeric(merged['amount'].astype(str).str.replace(r'[^\d.\-]', '', regex=True),
+                                     errors='coerce')
+    merged['bank_status'] = merged['bank_status'].fillna('')
+    merged['reason'] = merged['bank_reason'].fillna('')
+    merged['return_row'] = merged['bank_return_row'].astype('Int64')
+    merged['row'] = merged['row'].astype('Int64')
+    merged['record_ids'] = merged['record_ids'].fillna('').astype(str).replace('nan', '')
+    # Batch order, bank-only rows last in bank order
+    merged = merged.sort_values(['file', 'row', 'return_row'], na_position='last', kind='stable')
+    merged['file'] = merged['file'].fillna('')
+    return merged[RESULT_COLUMNS].reset_index(drop=True)
+
+
+def save_statuses(store_path, result, return_file):
+    """Latest bank status per record, as validator 'bank_return' in validation_results."""
+    linked = result[result['record_ids'] != '']
+    if not len(linked):
+        return 0
+    ids = linked['record_ids'].str.split()
+    exploded = linked.assign(record_id=ids).explode('record_id')
+    details = exploded[['status', 'file', 'row', 'recipient_id', 'amount', 'reference', 'bank_status', 'reason']]
+    results = [dict(r, return_file=Path(return_file).name) for r in details.astype(object).where(details.notna(), None)
+               .to_dict('records')]
+    with PaymentStore(store_path) as store:
+        return store.save_validation(VALIDATOR, exploded['record_id'].astype(int).tolist(), results)
+
+
+def fake_return(batch, reject_rate=0.02, missing_rate=0.01, unexpected=3, seed=None):
+    """
+    A bank-style status report for a batch: mostly SUCCESSFUL, some REJECTED with reasons,
+    some rows dropped and a few unknown payments added, in shuffled order.
+    """
+    rng = np.random.default_rng(seed)
+    roll = rng.random(len(batch))
+    kept = batch[roll >= missing_rate].reset_index(drop=True)
+    rejected = rng.random(len(kept)) < reject_rate
+
+    report = pd.DataFrame({
+        'Beneficiary Name': kept['name'].fillna('').to_numpy(),
+        'Beneficiary ID': kept['recipient_id'].to_numpy(),
+        'Amount (RM)': pd.to_numeric(kept['amount'], errors='coerce').map('{:,.2f}'.format).to_numpy(),
+        'Recipient Reference': kept['reference'].to_numpy(),
+        'Status': np.where(rejected, 'REJECTED', 'SUCCESSFUL'),
+        'Reason': np.where(rejected, rng.choice(FAKE_REASONS, len(kept)), ''),
+    })
+    extra = pd.DataFrame({
+        'Beneficiary Name': [f"UNKNOWN PAYEE {i + 1}" for i in range(unexpected)],
+        'Beneficiary ID': [f"{rng.integers(10 ** 11, 10 ** 12)}" for _ in range(unexpected)],
+        'Amount (RM)': [f"{rng.uniform(50, 500):,.2f}" for _ in range(unexpected)],
+        'Recipient Reference': ['UNKNOWN'] * unexpected,
+        'Status': ['SUCCESSFUL'] * unexpected,
+        'Reason': [''] * unexpected,
+    })
+    report = pd.concat([report, extra], ignore_index=True)
+    report = report.iloc[rng.permutation(len(report))].reset_index(drop=True)
+    report.insert(0, 'No.', np.arange(1, len(report) + 1))
+    return report
+
+
+def write_fake_return(report, path):
+    """Write a fake report with a bank-like title block above the table."""
+    path = Path(path)
+    title = ['Bulk Payment Status Report', f"Generated: {datetime.now():%d/%m/%Y %H:%M:%S}",
+             f"Total Records: {len(report)}", '']
+    if path.suffix.lower() == '.csv':
+        with open(path, 'w', encoding='utf-8', newline='') as f:
+            f.write('\n'.join(title) + '\n')
+            report.to_csv(f, index=False)
+    else:
+        with pd.ExcelWriter(path, engine='openpyxl') as writer:
+            pd.DataFrame({0: title}).to_excel(writer, index=False, header=False)
+            report.to_excel(writer, index=False, startrow=len(title))
+    return path
+
+
+def print_summary(result):
+    print(f"\n📊 Reconciliation ({len(result):,} row(s)):")
+    for status in ('paid', 'rejected', 'missing', 'unexpected'):
+        group = result[result['status'] == status]
+        print(f"   {status:12} {len(group):>8,}  RM {group['amount'].sum():>14,.2f}")
+    rejected = result[result['status'] == 'rejected']
+    for reason, count in rejected['reason'].replace('', '(no reason)').value_counts().head(10).items():
+        print(f"      ✗ {reason:40} {count:>6,}")
+
+
+def main():
+    """Main CLI entry point."""
+    parser = argparse.ArgumentParser(description='Reconcile bank return files against generated payment batches.')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    p_match = sub.add_parser('match', help='Join a bank status report to the batch and record payment statuses')
+    p_match.add_argument('return_file', help='Bank status report (.csv or .xlsx)')
+    p_match.add_argument('--batch', nargs='+', required=True,
+                         help='_batch.csv manifest(s) from ecp_export / fill-duitnow-template and/or generated DuitNow/ECP xlsx files')
+    p_match.add_argument('--store', help='Payment store to write statuses to (needs record_ids in the manifest)')
+    p_match.add_argument('--ignore-reference', action='store_true', help='Join on recipient ID and amount only')
+    p_match.add_argument('--output', default='reconciliation.xlsx', help='Reconciliation report (.xlsx or .csv)')
+
+    p_fake = sub.add_parser('fake', help='Generate a fake bank status report for a batch (testing)')
+    p_fake.add_argument('--batch', nargs='+', required=True, help='Batch manifest(s) and/or generated xlsx files')
+    p_fake.add_argument('--output', default='fake_return.csv', help='Fake report (.csv or .xlsx)')
+    p_fake.add_argument('--reject-rate', type=float, default=0.02)
+    p_fake.add_argument('--missing-rate', type=float, default=0.01)
+    p_fake.add_argument('--unexpected', type=int, default=3)
+    p_fake.add_argument('--seed', type=int)
+    args = parser.parse_args()
+
+    print("="*120)
+    print(" "*44 + "PAYMENT RECONCILIATION")
+    print("="*120)
+
+    missing = [p for p in args.batch if not Path(p).exists()]
+    if missing:
+        print(f"❌ Error: {', '.join(missing)} not found!")
+        return 1
+
+    started = time.perf_counter()
+    batch = read_batch(args.batch)
+    print(f"\n📦 Batch: {len(batch):,} payment(s), RM {pd.to_numeric(batch['amount'], errors='coerce').sum():,.2f} "
+          f"from {len(args.batch)} file(s)")
+
+    if args.command == 'fake':
+        report = fake_return(batch, args.reject_rate, args.missing_rate, args.unexpected, args.seed)
+        write_fake_return(report, args.output)
+        print(f"💾 Fake return saved: {args.output} ({len(report):,} row(s))")
+        return 0
+
+    if not Path(args.return_file).exists():
+        print(f"❌ Error: {args.return_file} not found!")
+        return 1
+    try:
+        returns = read_return(args.return_file)
+    except ValueError as e:
+        print(f"❌ {e}")
+        return 1
+    print(f"🏦 Return: {len(returns):,} row(s) from {args.return_file}")
+
+    result = reconcile(batch, returns, match_reference=not args.ignore_reference)
+    elapsed = time.perf_counter() - started
+    print_summary(result)
+
+    if args.store:
+        if not is_store_path(args.store):
+            print(f"❌ Error: {args.store} is not a payment store (.db)")
+            return 1
+        saved = save_statuses(args.store, result, args.return_file)
+        print(f"\n🗄️  {saved:,} record status(es) saved to {args.store}" if saved else
+              "\n⚠️  No record_ids in the batch - statuses not saved (use a _batch.csv manifest from a store master, or DuitNow payments with recordIds)")
+
+    if args.output.lower().endswith('.csv'):
+        result.to_csv(args.output, index=False)
+    else:
+        result.to_excel(args.output, index=False)
+    print(f"\n💾 Report saved: {args.output} ({elapsed:.2f}s)")
+
+    unresolved = result['status'].isin(['rejected', 'missing', 'unexpected']).sum()
+    return 1 if unresolved else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
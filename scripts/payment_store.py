@@ -0,0 +1,860 @@
+#!/usr/bin/env python3
+"""
+Payment Store
+Embedded SQLite store for source workbooks, extracted candidate records, payroll rollups, validation results and vision extractions.
+"""
+
+import argparse
+import json
+import re
+import sqlite3
+import time
+import sys
+from datetime import datetime
+from pathlib import Path
+
+import pandas as pd
+
+from master_writer import MASTER_COLUMNS, write_master_workbook
+from mykad import IC_STATUSES, decode_ics
+from source_manifest import MONTH_ALIASES, MONTH_PATTERN, MONTH_RANGE_PATTERN
+
+
+DEFAULT_STORE = 'payments.db'
+STORE_SUFFIXES = ('.db', '.sqlite', '.sqlite3')
+
+# Record columns stored on the records table (source_file/source_sheet come from the joins)
+RECORD_COLUMNS = [col for col in MASTER_COLUMNS if col not in ('source_file', 'source_sheet')]
+
+# List fields are stored joined, exactly as in the xlsx master
+LIST_SEPARATORS = {
+    'work_dates': ', ',
+    'roster_info': '; ',
+    'notes': '; ',
+    'project_notes': '; ',
+}
+
+# "2025-03-01: AM" entries in roster_info (older masters have "2025-03-01 00:00:00: AM")
+ROSTER_INFO_PATTERN = re.compile(r'(\d{4}-\d{2}-\d{2})(?: \d{2}:\d{2}:\d{2})?:\s*([^;]+)')
+
+# Columns shown by 'query' in table form (csv/json get every master column)
+QUERY_TABLE_COLUMNS = ['month', 'project_name', 'full_name', 'ic_number', 'bank_name', 'account_number', 'position',
+                       'days_worked', 'total_payment', 'source_file']
+
+# Rollup dimensions (CLI/API name -> records column)
+ROLLUP_DIMENSIONS = {
+    'month': 'month',
+    'project': 'project_name',
+    'position': 'position',
+    'candidate': 'ic_number',
+    'bank': 'bank_name',
+}
+
+# Additive measures, so per-file partial rollups can be summed across files
+ROLLUP_MEASURES = ['days_worked', 'total_wages', 'total_ot', 'total_allowance', 'total_claim', 'total_payment']
+
+# Precomputed cuboids; a query is answered from the smallest one covering its dimensions
+ROLLUP_LEVELS = [
+    ('month',),
+    ('month', 'project'),
+    ('month', 'position'),
+    ('month', 'bank'),
+    ('month', 'candidate'),
+    ('month', 'project', 'position'),
+    ('month', 'project', 'candidate'),
+    ('month', 'project', 'position', 'candidate', 'bank'),
+]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS source_files (
+    id INTEGER PRIMARY KEY,
+    company TEXT,
+    year INTEGER,
+    month TEXT,
+    path TEXT,
+    file_name TEXT NOT NULL UNIQUE,
+    size INTEGER,
+    mtime_ns INTEGER,
+    extracted_at TEXT
+);
+
+CREATE TABLE IF NOT EXISTS source_sheets (
+    id INTEGER PRIMARY KEY,
+    file_id INTEGER NOT NULL REFERENCES source_files(id) ON DELETE CASCADE,
+    sheet_name TEXT NOT NULL,
+    UNIQUE (file_id, sheet_name)
+);
+
+CREATE TABLE IF NOT EXISTS records (
+    id INTEGER PRIMARY KEY,
+    sheet_id INTEGER NOT NULL REFERENCES source_sheets(id) ON DELETE CASCADE,
+    month TEXT,
+    project_name TEXT,
+    full_name TEXT,
+    alternate_name TEXT,
+    ic_number TEXT,
+    bank_name TEXT,
+    account_number TEXT,
+    position TEXT,
+    days_worked REAL,
+    total_wages REAL,
+    total_ot REAL,
+    total_allowance REAL,
+    total_claim REAL,
+    total_payment REAL,
+    work_dates TEXT,
+    project_date_range TEXT,
+    payment_due_date TEXT,
+    location TEXT,
+    time_schedule TEXT,
+    roster_info TEXT,
+    notes TEXT,
+    project_notes TEXT,
+    first_row INTEGER,
+    last_row INTEGER
+);
+
+CREATE INDEX IF NOT EXISTS idx_records_ic ON records (ic_number);
+CREATE INDEX IF NOT EXISTS idx_records_month ON records (month);
+CREATE INDEX IF NOT EXISTS idx_records_project ON records (project_name);
+CREATE INDEX IF NOT EXISTS idx_records_sheet ON records (sheet_id);
+CREATE INDEX IF NOT EXISTS idx_records_ic_key ON records (REPLACE(REPLACE(ic_number, '-', ''), ' ', ''));
+CREATE INDEX IF NOT EXISTS idx_records_name ON records (full_name COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS idx_records_bank ON records (bank_name);
+CREATE INDEX IF NOT EXISTS idx_records_payment ON records (total_payment);
+
+-- Roster: one cell per record and day, shift codes stored once (categorical)
+CREATE TABLE IF NOT EXISTS roster_codes (
+    id INTEGER PRIMARY KEY,
+    code TEXT NOT NULL UNIQUE
+);
+
+CREATE TABLE IF NOT EXISTS roster_entries (
+    record_id INTEGER NOT NULL REFERENCES records(id) ON DELETE CASCADE,
+    day INTEGER NOT NULL,
+    code_id INTEGER NOT NULL REFERENCES roster_codes(id),
+    PRIMARY KEY (record_id, day)
+) WITHOUT ROWID;
+
+-- Per-source-file partial aggregates; NULL in a dimension column means "rolled up"
+CREATE TABLE IF NOT EXISTS rollups (
+    level TEXT NOT NULL,
+    file_id INTEGER NOT NULL REFERENCES source_files(id) ON DELETE CASCADE,
+    month TEXT,
+    project_name TEXT,
+    position TEXT,
+    ic_number TEXT,
+    full_name TEXT,
+    bank_name TEXT,
+    records INTEGER,
+    days_worked REAL,
+    total_wages REAL,
+    total_ot REAL,
+    total_allowance REAL,
+    total_claim REAL,
+    total_payment REAL
+);
+
+CREATE INDEX IF NOT EXISTS idx_rollups_level ON rollups (level);
+CREATE INDEX IF NOT EXISTS idx_rollups_file ON rollups (file_id);
+
+CREATE TABLE IF NOT EXISTS validation_results (
+    record_id INTEGER NOT NULL REFERENCES records(id) ON DELETE CASCADE,
+    validator TEXT NOT NULL,
+    status TEXT,
+    details TEXT,
+    validated_at TEXT,
+    PRIMARY KEY (record_id, validator)
+);
+
+CREATE INDEX IF NOT EXISTS idx_validation_status ON validation_results (validator, status);
+
+-- Decoded IC per record (mykad.decode_ics): integer blocking keys for de-duplication and lookups
+CREATE TABLE IF NOT EXISTS ic_index (
+    record_id INTEGER PRIMARY KEY REFERENCES records(id) ON DELETE CASCADE,
+    status INTEGER NOT NULL,
+    ic_key INTEGER,
+    birth_date INTEGER,
+    place INTEGER,
+    gender INTEGER
+);
+
+CREATE INDEX IF NOT EXISTS idx_ic_index_key ON ic_index (ic_key);
+CREATE INDEX IF NOT EXISTS idx_ic_index_born ON ic_index (birth_date, gender);
+
+CREATE TABLE IF NOT EXISTS vision_results (
+    id INTEGER PRIMARY KEY,
+    file_name TEXT NOT NULL,
+    success INTEGER,
+    error TEXT,
+    record_count INTEGER,
+    structure TEXT,
+    verification TEXT,
+    receipts TEXT,
+    extracted_at TEXT
+);
+
+CREATE TABLE IF NOT EXISTS vision_candidates (
+    id INTEGER PRIMARY KEY,
+    vision_id INTEGER NOT NULL REFERENCES vision_results(id) ON DELETE CASCADE,
+    full_name TEXT,
+    ic_number TEXT,
+    bank_name TEXT,
+    account_number TEXT,
+    project_name TEXT,
+    payload TEXT
+);
+
+CREATE INDEX IF NOT EXISTS idx_vision_candidates_ic ON vision_candidates (ic_number);
+"""
+
+
+def _ic_key(ic):
+    """IC as indexed by idx_records_ic_key (no dashes or spaces)."""
+    text = str(ic).strip()
+    return text.replace('-', '').replace(' ', '')
+
+
+def _label_months(label):
+    """Month numbers covered by a month label ('March' -> {3}, 'March-June' -> {3, 4, 5, 6})."""
+    range_match = MONTH_RANGE_PATTERN.search(str(label))
+    if range_match:
+        first = MONTH_ALIASES[range_match.group(1).lower()]
+        last = MONTH_ALIASES[range_match.group(2).lower()]
+        return set(range(first, last + 1))
+    match = MONTH_PATTERN.search(str(label))
+    return {MONTH_ALIASES[match.group(1).lower()]} if match else set()
+
+
+def parse_month_filter(values):
+    """Month numbers for '--month' values: month names ('Mar', 'March') and quarters ('Q2')."""
+    months = set()
+    for value in values:
+        for part in str(value).split(','):
+            part = part.strip()
+            quarter = re.fullmatch(r'[Qq]([1-4])', part)
+            if quarter:
+                q = int(quarter.group(1))
+                months |= {3 * q - 2, 3 * q - 1, 3 * q}
+            elif part:
+                found = _label_months(part)
+                if not found:
+                    raise ValueError(f"Unknown month or quarter: {part}")
+                months |= found
+    return months
+
+
+def parse_born_filter(value):
+    """'1995', '1990-1995' or '19950314' -> inclusive (from, to) YYYYMMDD range."""
+    match = re.fullmatch(r'\s*(\d{4}(?:\d{4})?)\s*(?:-\s*(\d{4}(?:\d{4})?)\s*)?', str(value))
+    if not match:
+        raise ValueError(f"Birth date filter must be YYYY, YYYYMMDD or a range like 1990-1995: {value}")
+    start, end = match.group(1), match.group(2) or match.group(1)
+    return (int(start) * 10000 + 101 if len(start) == 4 else int(start),
+            int(end) * 10000 + 1231 if len(end) == 4 else int(end))
+
+
+def is_store_path(path):
+    """True if a master-list path points at a store rather than an xlsx."""
+    return Path(str(path)).suffix.lower() in STORE_SUFFIXES
+
+
+def _value(value, column=None):
+    """Python value for sqlite: lists joined, NaN -> NULL, numpy -> python."""
+    if isinstance(value, (list, tuple)):
+        return LIST_SEPARATORS.get(column, '; ').join(str(v) for v in value) if value else None
+    if value is None:
+        return None
+    if hasattr(value, 'item') and not isinstance(value, str):
+        value = value.item()
+    if isinstance(value, float) and value != value:
+        return None
+    if isinstance(value, (str, int, float)):
+        return value
+    return str(value)
+
+
+def _roster_entries(record):
+    """(ISO date, shift code) pairs: the extractor's full roster, else parsed from the roster_info preview."""
+    roster = record.get('roster')
+    if isinstance(roster, (list, tuple)) and roster:
+        return roster
+
+    # Columnar extractors join the full roster like roster_info
+    info = roster if isinstance(roster, str) and roster else record.get('roster_info')
+    if isinstance(info, (list, tuple)):
+        info = '; '.join(info)
+    if isinstance(info, str):
+        return [(d, code.strip()) for d, code in ROSTER_INFO_PATTERN.findall(info)]
+    return []
+
+
+def _json(value):
+    return json.dumps(value, default=str) if value is not None else None
+
+
+class PaymentStore:
+    """SQLite-backed interchange between extraction, validation and reporting."""
+
+    def __init__(self, path=DEFAULT_STORE):
+        self.path = str(path)
+        self.conn = sqlite3.connect(self.path)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute('PRAGMA foreign_keys = ON')
+        self.conn.execute('PRAGMA journal_mode = WAL')
+        self.conn.executescript(SCHEMA)
+        self._ensure_rollups()
+        self._ensure_ic_index()
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # ------------------------------------------------------------------
+    # Extraction
+    # ------------------------------------------------------------------
+
+    def _file_id(self, source):
+        # Workbooks are identified by file name, as in the master list 'source_file' column
+        path = Path(source['path']) if source.get('path') else None
+        file_name = source.get('file_name') or path.name
+        stat = path.stat() if path and path.exists() else None
+        self.conn.execute(
+            """INSERT INTO source_files (company, year, month, path, file_name, size, mtime_ns, extracted_at)
+               VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+               ON CONFLICT (file_name) DO UPDATE SET
+                   company = COALESCE(excluded.company, company), year = COALESCE(excluded.year, year),
+                   month = excluded.month, path = COALESCE(excluded.path, path),
+                   size = COALESCE(excluded.size, size), mtime_ns = COALESCE(excluded.mtime_ns, mtime_ns),
+                   extracted_at = excluded.extracted_at""",
+            (source.get('company'), source.get('year'), source.get('month'), str(path) if path else None, file_name,
+             stat.st_size if stat else None, stat.st_mtime_ns if stat else None,
+             datetime.now().isoformat(timespec='seconds'))
+        )
+        return self.conn.execute('SELECT id FROM source_files WHERE file_name = ?', (file_name,)).fetchone()['id']
+
+    def _sheet_id(self, file_id, sheet_name):
+        self.conn.execute('INSERT OR IGNORE INTO source_sheets (file_id, sheet_name) VALUES (?, ?)', (file_id, sheet_name))
+        return self.conn.execute('SELECT id FROM source_sheets WHERE file_id = ? AND sheet_name = ?',
+                                 (file_id, sheet_name)).fetchone()['id']
+
+    def save_extraction(self, source, records):
+        """
+        Replace everything stored for one source workbook with a fresh extraction.
+
+        Args:
+            source: Source dict from source_manifest (company, year, month, path)
+            records: Extractor records for that workbook (list fields allowed)
+
+        Returns: number of records written
+        """
+        with self.conn:
+            file_id = self._file_id(source)
+            # Re-extraction replaces the file's records (validation results cascade)
+            self.conn.execute('DELETE FROM source_sheets WHERE file_id = ?', (file_id,))
+
+            sheet_ids = {}
+            rows = []
+            for record in records:
+                sheet = record.get('source_sheet')
+                if sheet not in sheet_ids:
+                    sheet_ids[sheet] = self._sheet_id(file_id, sheet)
+                rows.append([sheet_ids[sheet]] + [_value(record.get(col), col) for col in RECORD_COLUMNS] +
+                            [_value(record.get('first_row')), _value(record.get('last_row'))])
+
+            placeholders = ', '.join('?' * (len(RECORD_COLUMNS) + 3))
+            self.conn.executemany(
+                f"INSERT INTO records (sheet_id, {', '.join(RECORD_COLUMNS)}, first_row, last_row) VALUES ({placeholders})",
+                rows
+            )
+
+            # The file's records were just replaced, so its ids in order are the rows above
+            record_ids = [row['id'] for row in self.conn.execute(
+                'SELECT r.id FROM records r JOIN source_sheets s ON s.id = r.sheet_id WHERE s.file_id = ? ORDER BY r.id',
+                (file_id,))]
+            rosters = [_roster_entries(record) for record in records]
+            if any(rosters):
+                self._save_roster(record_ids, rosters)
+            self._save_ic_index(record_ids, [row[1 + RECORD_COLUMNS.index('ic_number')] for row in rows])
+
+            self._refresh_rollups(file_id)
+        return len(rows)
+
+    def _code_id(self, code):
+        self.conn.execute('INSERT OR IGNORE INTO roster_codes (code) VALUES (?)', (code,))
+        return self.conn.execute('SELECT id FROM roster_codes WHERE code = ?', (code,)).fetchone()['id']
+
+    def _save_roster(self, record_ids, rosters):
+        code_ids = {}
+        rows = []
+        for record_id, roster in zip(record_ids, rosters):
+            for day, code in roster:
+                try:
+                    ordinal = datetime.strptime(str(day)[:10], '%Y-%m-%d').toordinal()
+                except ValueError:
+                    continue
+                code = str(code).strip()
+                if code not in code_ids:
+                    code_ids[code] = self._code_id(code)
+                rows.append((record_id, ordinal, code_ids[code]))
+
+        self.conn.executemany('INSERT OR REPLACE INTO roster_entries (record_id, day, code_id) VALUES (?, ?, ?)', rows)
+
+    def _save_ic_index(self, record_ids, ics):
+        decoded = decode_ics(pd.Series(ics, dtype=object))
+        columns = ['status', 'ic_key', 'birth_date', 'place', 'gender']
+        rows = zip(record_ids, *(decoded[c].tolist() for c in columns))
+        self.conn.executemany(f"INSERT OR REPLACE INTO ic_index (record_id, {', '.join(columns)}) VALUES (?, ?, ?, ?, ?, ?)",
+                              rows)
+
+    def _ensure_ic_index(self):
+        """Decode ICs for stores created before the IC index existed."""
+        has_records = self.conn.execute('SELECT 1 FROM records LIMIT 1').fetchone()
+        has_index = self.conn.execute('SELECT 1 FROM ic_index LIMIT 1').fetchone()
+        if has_records and not has_index:
+            self.rebuild_ic_index()
+
+    def rebuild_ic_index(self):
+        """Re-decode every record's IC."""
+        with self.conn:
+            self.conn.execute('DELETE FROM ic_index')
+            rows = self.conn.execute('SELECT id, ic_number FROM records').fetchall()
+            self._save_ic_index([row['id'] for row in rows], [row['ic_number'] for row in rows])
+        return len(rows)
+
+    def ic_frame(self):
+        """Decoded ICs: record_id, ic_number and the ic_index integer columns."""
+        return pd.read_sql_query(
+            'SELECT i.record_id, r.ic_number, i.status, i.ic_key, i.birth_date, i.place, i.gender '
+            'FROM ic_index i JOIN records r ON r.id = i.record_id ORDER BY i.record_id', self.conn)
+
+    def import_master(self, masterlist_path, company=None, year=None):
+        """Load an existing xlsx master (All Candidates) into the store, one source file at a time."""
+        df = pd.read_excel(masterlist_path, sheet_name='All Candidates',
+                           dtype={'account_number': str, 'ic_number': str})
+        count = 0
+        for source_file, group in df.groupby('source_file', sort=False):
+            records = group.to_dict('records')
+            source = {'company': company, 'year': year, 'month': records[0].get('month'), 'file_name': source_file}
+            count += self.save_extraction(source, records)
+        return count
+
+    # ------------------------------------------------------------------
+    # Rollups
+    # ------------------------------------------------------------------
+
+    def _refresh_rollups(self, file_id):
+        """Recompute one source file's partial rollups (called inside save_extraction's transaction)."""
+        self.conn.execute('DELETE FROM rollups WHERE file_id = ?', (file_id,))
+
+        sums = ', '.join(f"TOTAL(r.{m})" for m in ROLLUP_MEASURES)
+        for level in ROLLUP_LEVELS:
+            columns = [ROLLUP_DIMENSIONS[d] for d in level]
+            name_column = ['full_name'] if 'candidate' in level else []
+            select = ', '.join([f"r.{c}" for c in columns] + [f"MAX(r.{c})" for c in name_column])
+            self.conn.execute(
+                f"""INSERT INTO rollups (level, file_id, {', '.join(columns + name_column)}, records,
+                                       {', '.join(ROLLUP_MEASURES)})
+                   SELECT ?, s.file_id, {select}, COUNT(*), {sums}
+                   FROM records r JOIN source_sheets s ON s.id = r.sheet_id
+                   WHERE s.file_id = ?
+                   GROUP BY {', '.join(f"r.{c}" for c in columns)}""",
+                (','.join(level), file_id)
+            )
+
+    def _ensure_rollups(self):
+        """Build rollups for stores created before they existed."""
+        has_records = self.conn.execute('SELECT 1 FROM records LIMIT 1').fetchone()
+        has_rollups = self.conn.execute('SELECT 1 FROM rollups LIMIT 1').fetchone()
+        if has_records and not has_rollups:
+            self.rebuild_rollups()
+
+    def rebuild_rollups(self):
+        """Recompute every file's rollups from the records table."""
+        with self.conn:
+            file_ids = [row['id'] for row in self.conn.execute('SELECT id FROM source_files')]
+            for file_id in file_ids:
+                self._refresh_rollups(file_id)
+        return len(file_ids)
+
+    def rollup(self, by, company=None, year=None, **filters):
+        """
+        Payroll totals grouped by any of month, project, position, candidate and bank.
+
+        Args:
+            by: Dimension names to group by, e.g. ['month', 'project']
+            company, year: Source-file filters
+            **filters: Dimension filters, e.g. month='March', bank='Maybank'
+
+        Returns: DataFrame of the dimensions (candidate adds full_name), records and measure totals
+        """
+        by = list(by)
+        filters = {d: v for d, v in filters.items() if v is not None}
+        unknown = [d for d in by + list(filters) if d not in ROLLUP_DIMENSIONS]
+        if unknown:
+            raise ValueError(f"Unknown rollup dimension(s): {', '.join(unknown)} (use {', '.join(ROLLUP_DIMENSIONS)})")
+
+        needed = set(by) | set(filters)
+        level = min((lv for lv in ROLLUP_LEVELS if needed <= set(lv)), key=len)
+
+        where, params = ['u.level = ?'], [','.join(level)]
+        for dim, value in filters.items():
+            where.append(f"u.{ROLLUP_DIMENSIONS[dim]} = ?")
+            params.append(value)
+        for column, value in (('f.company', company), ('f.year', year)):
+            if value is not None:
+                where.append(f"{column} = ?")
+                params.append(value)
+
+        group = [f"u.{ROLLUP_DIMENSIONS[d]}" for d in by]
+        select = [f"{c} AS {d}" for c, d in zip(group, by)]
+        if 'candidate' in by:
+            select.append('MAX(u.full_name) AS full_name')
+        select += ['SUM(u.records) AS records'] + [f"SUM(u.{m}) AS {m}" for m in ROLLUP_MEASURES]
+
+        sql = (f"SELECT {', '.join(select)} FROM rollups u JOIN source_files f ON f.id = u.file_id "
+               f"WHERE {' AND '.join(where)}")
+        if group:
+            sql += f" GROUP BY {', '.join(group)} ORDER BY {', '.join(group)}"
+
+        return pd.read_sql_query(sql, self.conn, params=params)
+
+    # ------------------------------------------------------------------
+    # Queries
+    # ------------------------------------------------------------------
+
+    def read_master(self, month=None, company=None, year=None, project=None, ic=None, source_file=None):
+        """
+        Master list as a DataFrame with the same columns as the xlsx, plus record_id, first_row and last_row.
+        """
+        where, params = [], []
+        for column, value in (('r.month', month), ('f.company', company), ('f.year', year),
+                              ('r.project_name', project), ('r.ic_number', ic), ('f.file_name', source_file)):
+            if value is not None:
+                where.append(f"{column} = ?")
+                params.append(value)
+
+        return self._select_records(where, params)
+
+    def _select_records(self, where, params, limit=None):
+        select = ', '.join(
+            'f.file_name AS source_file' if col == 'source_file' else
+            's.sheet_name AS source_sheet' if col == 'source_sheet' else
+            f"r.{col}" for col in MASTER_COLUMNS
+        )
+        sql = (f"SELECT r.id AS record_id, {select}, r.first_row, r.last_row "
+               "FROM records r JOIN source_sheets s ON s.id = r.sheet_id JOIN source_files f ON f.id = s.file_id")
+        if where:
+            sql += ' WHERE ' + ' AND '.join(where)
+        sql += ' ORDER BY r.id'
+        if limit:
+            sql += f" LIMIT {int(limit)}"
+
+        return pd.read_sql_query(sql, self.conn, params=params)
+
+    def _categories(self, column):
+        """Distinct values of a low-cardinality records column (read from its index)."""
+        return [row[0] for row in self.conn.execute(f"SELECT DISTINCT {column} FROM records WHERE {column} IS NOT NULL")]
+
+    def query(self, ic=None, name=None, project=None, months=None, bank=None, min_payment=None, max_payment=None,
+              company=None, year=None, born=None, gender=None, ic_status=None, limit=None):
+        """
+        Find master-list records; every filter is served by an index.
+
+        Args:
+            ic: IC number, with or without dashes (expression index on the normalized IC)
+            name: Case-insensitive prefix of full_name (range scan on the NOCASE name index)
+            project: Case-insensitive part of the project name
+            months: Month numbers (see parse_month_filter); multi-month labels match any month they cover
+            bank: Case-insensitive part of the bank name
+            min_payment, max_payment: total_payment range (inclusive)
+            company, year: Source-file filters
+            born: Inclusive (from, to) YYYYMMDD birth-date range decoded from the IC (see parse_born_filter)
+            gender: 'male' or 'female', decoded from the IC's last digit
+            ic_status: IC_STATUSES names, e.g. ['BAD_DATE', 'BAD_PLACE']
+
+        Returns: DataFrame shaped like read_master()
+        """
+        where, params = [], []
+
+        # Decoded-IC filters go through ic_index's (birth_date, gender) index
+        ic_where = []
+        if born:
+            ic_where.append('birth_date BETWEEN ? AND ?')
+            params += list(born)
+        if gender:
+            if gender not in ('male', 'female'):
+                raise ValueError(f"Unknown gender '{gender}' (use male or female)")
+            ic_where.append('gender = ?')
+            params.append(1 if gender == 'male' else 2)
+        if ic_status:
+            unknown = [s for s in ic_status if s not in IC_STATUSES]
+            if unknown:
+                raise ValueError(f"Unknown IC status {', '.join(unknown)} (use {', '.join(IC_STATUSES)})")
+            ic_where.append(f"status IN ({', '.join('?' * len(ic_status))})")
+            params += [IC_STATUSES.index(s) for s in ic_status]
+        if ic_where:
+            where.append(f"r.id IN (SELECT record_id FROM ic_index WHERE {' AND '.join(ic_where)})")
+
+        if ic:
+            where.append("REPLACE(REPLACE(r.ic_number, '-', ''), ' ', '') = ?")
+            params.append(_ic_key(ic))
+
+        if name:
+            # Prefix as a range: 'ah' <= name < 'ah' + highest character
+            where.append('r.full_name >= ? COLLATE NOCASE AND r.full_name < ? COLLATE NOCASE')
+            params += [name, name + '\uffff']
+
+        # Project, month and bank have few distinct values: resolve the filter against them,
+        # then look the matching values up through the column's index
+        for column, wanted in (('project_name', project), ('bank_name', bank)):
+            if wanted:
+                values = [v for v in self._categories(column) if str(wanted).lower() in str(v).lower()]
+                if not values:
+                    return self._select_records(['0'], [])
+                where.append(f"r.{column} IN ({', '.join('?' * len(values))})")
+                params += values
+
+        if months:
+            labels = [v for v in self._categories('month') if _label_months(v) & set(months)]
+            if not labels:
+                return self._select_records(['0'], [])
+            where.append(f"r.month IN ({', '.join('?' * len(labels))})")
+            params += labels
+
+        for clause, value in (('r.total_payment >= ?', min_payment), ('r.total_payment <= ?', max_payment),
+                              ('f.company = ?', company), ('f.year = ?', year)):
+            if value is not None:
+                where.append(clause)
+                params.append(value)
+
+        return self._select_records(where, params, limit=limit)
+
+    def export_master(self, output_file, **filters):
+        """Write the stored master list as the usual xlsx (All Candidates + Monthly Summary)."""
+        df = self.read_master(**filters)
+        return write_master_workbook(df[MASTER_COLUMNS].itertuples(index=False, name=None), output_file, MASTER_COLUMNS)
+
+    # ------------------------------------------------------------------
+    # Validation and vision
+    # ------------------------------------------------------------------
+
+    def save_validation(self, validator, record_ids, results, status_key='status'):
+        """Store one validator's results (latest result per record and validator)."""
+        now = datetime.now().isoformat(timespec='seconds')
+        rows = [(int(record_id), validator, result.get(status_key), _json(result), now)
+                for record_id, result in zip(record_ids, results) if record_id is not None]
+        with self.conn:
+            self.conn.executemany(
+                'INSERT OR REPLACE INTO validation_results (record_id, validator, status, details, validated_at) '
+                'VALUES (?, ?, ?, ?, ?)', rows
+            )
+        return len(rows)
+
+    def validation_summary(self):
+        """{validator: {status: count}}"""
+        summary = {}
+        for row in self.conn.execute('SELECT validator, status, COUNT(*) AS n FROM validation_results GROUP BY 1, 2'):
+            summary.setdefault(row['validator'], {})[row['status']] = row['n']
+        return summary
+
+    def save_vision_result(self, result):
+        """Store one excel_extraction_complete result (file-level outputs plus its candidates)."""
+        with self.conn:
+            cursor = self.conn.execute(
+                """INSERT INTO vision_results (file_name, success, error, record_count, structure, verification,
+                                               receipts, extracted_at)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?)""",
+                (result.get('filename'), int(bool(result.get('success'))), result.get('error'),
+                 result.get('recordCount'), _json(result.get('structure')), _json(result.get('verification')),
+                 _json(result.get('receipts')), datetime.now().isoformat(timespec='seconds'))
+            )
+            vision_id = cursor.lastrowid
+            self.conn.executemany(
+                """INSERT INTO vision_candidates (vision_id, full_name, ic_number, bank_name, account_number,
+                                                 project_name, payload)
+                   VALUES (?, ?, ?, ?, ?, ?, ?)""",
+                [(vision_id, c.get('fullname'), _value(c.get('ic')), c.get('bank'), _value(c.get('bank_no')),
+                  c.get('project_name'), _json(c)) for c in result.get('candidates') or []]
+            )
+        return vision_id
+
+    def roster_frame(self):
+        """Roster cells: record_id, ic_number, day (date ordinal) and shift code."""
+        return pd.read_sql_query(
+            'SELECT e.record_id, r.ic_number, e.day, c.code FROM roster_entries e '
+            'JOIN records r ON r.id = e.record_id JOIN roster_codes c ON c.id = e.code_id', self.conn)
+
+    def source_index(self):
+        """{file name: path} for stored workbooks (same shape as source_manifest.source_file_index)."""
+        return {row['file_name']: row['path'] for row in
+                self.conn.execute('SELECT file_name, path FROM source_files WHERE path IS NOT NULL')}
+
+    def source_stats(self):
+        """{file name: (size, mtime_ns)} of each workbook when it was last extracted."""
+        return {row['file_name']: (row['size'], row['mtime_ns']) for row in
+                self.conn.execute('SELECT file_name, size, mtime_ns FROM source_files')}
+
+    def stats(self):
+        """Row counts per table."""
+        tables = ['source_files', 'source_sheets', 'records', 'roster_entries', 'rollups', 'ic_index',
+                  'validation_results', 'vision_results', 'vision_candidates']
+        return {t: self.conn.execute(f'SELECT COUNT(*) FROM {t}').fetchone()[0] for t in tables}
+
+
+def read_master(masterlist_path):
+    """
+    Load the master list for validators and reports.
+
+    A store path (.db/.sqlite) is queried; anything else is read as the xlsx master.
+    """
+    if is_store_path(masterlist_path):
+        with PaymentStore(masterlist_path) as store:
+            return store.read_master()
+    return pd.read_excel(masterlist_path, sheet_name='All Candidates', dtype={'account_number': str})
+
+
+def store_source_index(masterlist_path):
+    """Source workbook paths recorded in the store, None for an xlsx master."""
+    if not is_store_path(masterlist_path):
+        return None
+    with PaymentStore(masterlist_path) as store:
+        return store.source_index() or None
+
+
+def save_validation_results(masterlist_path, validator, df, results, status_key='status'):
+    """Write validator results back to the store when the master came from one (no-op for xlsx)."""
+    if not is_store_path(masterlist_path) or 'record_id' not in df.columns:
+        return 0
+    with PaymentStore(masterlist_path) as store:
+        return store.save_validation(validator, df['record_id'].tolist(), results, status_key=status_key)
+
+
+def main():
+    """Main CLI entry point."""
+    parser = argparse.ArgumentParser(description='Manage the SQLite payment store.')
+    parser.add_argument('--store', default=DEFAULT_STORE, help=f"Store path (default: {DEFAULT_STORE})")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    p_import = sub.add_parser('import', help='Import an xlsx master list')
+    p_import.add_argument('masterlist')
+    p_import.add_argument('--company')
+    p_import.add_argument('--year', type=int)
+
+    p_export = sub.add_parser('export', help='Export the master list as xlsx')
+    p_export.add_argument('output')
+    p_export.add_argument('--month')
+    p_export.add_argument('--company')
+    p_export.add_argument('--year', type=int)
+
+    sub.add_parser('stats', help='Show table sizes and validation status counts')
+
+    p_query = sub.add_parser('query', help='Find records by IC, name, project, month, bank or payment')
+    p_query.add_argument('--ic', help='IC number (dashes optional)')
+    p_query.add_argument('--name', help='Name prefix (case-insensitive)')
+    p_query.add_argument('--project', help='Part of the project name')
+    p_query.add_argument('--month', action='append', help='Month or quarter, e.g. March, Q2 (repeatable or comma-separated)')
+    p_query.add_argument('--bank', help='Part of the bank name')
+    p_query.add_argument('--min-payment', type=float)
+    p_query.add_argument('--max-payment', type=float)
+    p_query.add_argument('--company')
+    p_query.add_argument('--year', type=int)
+    p_query.add_argument('--born', help='Birth year, date or range decoded from the IC, e.g. 1995, 1990-1995, 19950314')
+    p_query.add_argument('--gender', choices=['male', 'female'], help='Gender decoded from the IC')
+    p_query.add_argument('--ic-status', help=f"Comma-separated: {', '.join(IC_STATUSES)}")
+    p_query.add_argument('--limit', type=int)
+    p_query.add_argument('--format', choices=['table', 'csv', 'json'], default='table')
+    p_query.add_argument('--output', help='Write csv/json here instead of stdout')
+
+    p_rollup = sub.add_parser('rollup', help='Payroll totals by month, project, position, candidate and/or bank')
+    p_rollup.add_argument('--by', default='month', help=f"Comma-separated dimensions: {', '.join(ROLLUP_DIMENSIONS)}")
+    for dim in ROLLUP_DIMENSIONS:
+        p_rollup.add_argument(f"--{dim}", help=f"Only this {dim}" + (' (IC number)' if dim == 'candidate' else ''))
+    p_rollup.add_argument('--company')
+    p_rollup.add_argument('--year', type=int)
+    p_rollup.add_argument('--output', help='Also write the rollup to .xlsx or .csv')
+    p_rollup.add_argument('--rebuild', action='store_true', help='Recompute all rollups from the records first')
+
+    args = parser.parse_args()
+
+    with PaymentStore(args.store) as store:
+        if args.command == 'import':
+            count = store.import_master(args.masterlist, company=args.company, year=args.year)
+            print(f"✅ Imported {count:,} record(s) from {args.masterlist} into {args.store}")
+
+        elif args.command == 'export':
+            count = store.export_master(args.output, month=args.month, company=args.company, year=args.year)
+            print(f"✅ Exported {count:,} record(s) to {args.output}")
+
+        elif args.command == 'stats':
+            print(f"📦 {args.store}")
+            for table, count in store.stats().items():
+                print(f"   {table:20} {count:>8,}")
+            for validator, statuses in store.validation_summary().items():
+                print(f"\n   {validator}:")
+                for status, count in sorted(statuses.items(), key=lambda x: str(x[0])):
+                    print(f"     {str(status):20} {count:>6,}")
+
+        elif args.command == 'query':
+            start = time.perf_counter()
+            try:
+                df = store.query(ic=args.ic, name=args.name, project=args.project,
+                                 months=parse_month_filter(args.month) if args.month else None, bank=args.bank,
+                                 min_payment=args.min_payment, max_payment=args.max_payment,
+                                 company=args.company, year=args.year,
+                                 born=parse_born_filter(args.born) if args.born else None, gender=args.gender,
+                                 ic_status=[s.strip().upper() for s in args.ic_status.split(',')] if args.ic_status else None,
+                                 limit=args.limit)
+            except ValueError as e:
+                print(f"❌ {e}")
+                return 1
+            elapsed_ms = (time.perf_counter() - start) * 1000
+
+            if args.format == 'table':
+                with pd.option_context('display.max_rows', 500, 'display.width', 250, 'display.max_colwidth', 40):
+                    print(df[QUERY_TABLE_COLUMNS].to_string(index=False) if len(df) else 'No records match.')
+                print(f"\n   {len(df):,} record(s) | total payment RM {df['total_payment'].sum():,.2f} | "
+                      f"{elapsed_ms:.1f} ms")
+            else:
+                text = (df.to_csv(index=False) if args.format == 'csv' else
+                        df.to_json(orient='records', indent=2, force_ascii=False))
+                if args.output:
+                    Path(args.output).write_text(text, encoding='utf-8')
+                    print(f"💾 {len(df):,} record(s) saved: {args.output} ({elapsed_ms:.1f} ms)")
+                else:
+                    sys.stdout.write(text if text.endswith('\n') else text + '\n')
+
+        elif args.command == 'rollup':
+            if args.rebuild:
+                print(f"⟳ Rebuilt rollups for {store.rebuild_rollups():,} source file(s)")
+
+            by = [d.strip() for d in args.by.split(',') if d.strip()]
+            try:
+                df = store.rollup(by, company=args.company, year=args.year,
+                                  **{dim: getattr(args, dim) for dim in ROLLUP_DIMENSIONS})
+            except ValueError as e:
+                print(f"❌ {e}")
+                return 1
+
+            with pd.option_context('display.max_rows', 200, 'display.width', 200, 'display.float_format', '{:,.2f}'.format):
+                print(df.to_string(index=False) if len(df) else 'No records match.')
+            print(f"\n   {len(df):,} row(s) | records {int(df['records'].sum()) if len(df) else 0:,} | "
+                  f"total payment RM {df['total_payment'].sum() if len(df) else 0:,.2f}")
+
+            if args.output:
+                if args.output.lower().endswith('.csv'):
+                    df.to_csv(args.output, index=False)
+                else:
+                    df.to_excel(args.output, sheet_name='Rollup', index=False)
+                print(f"💾 Saved: {args.output}")
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
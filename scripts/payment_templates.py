@@ -0,0 +1,328 @@
+#!/usr/bin/env python3
+"""
+Payment Template Cache
+Loads DuitNow/ECP templates once per process and renders each output file from the cached copy.
+"""
+
+import numbers
+import re
+import zipfile
+from pathlib import Path
+from xml.sax.saxutils import escape
+
+import openpyxl
+from openpyxl.utils import column_index_from_string, get_column_letter
+
+
+# Data rows start after headers and specs in rows 1-3
+START_ROW = 4
+
+SHEET_NS = 'http://schemas.openxmlformats.org/spreadsheetml/2006/main'
+
+# Excel's last row: whole-column validations in old templates must not be pushed past it
+MAX_ROW = 1048576
+
+ROW_PATTERN = re.compile(r'<row\b[^>]*?\br="(\d+)"[^>]*?(?:/>|>.*?</row>)', re.S)
+CELL_PATTERN = re.compile(r'<c\b[^>]*?\br="([A-Z]+)\d+"[^>]*?(?:/>|>.*?</c>)', re.S)
+STYLE_PATTERN = re.compile(r'\bs="(\d+)"')
+REF_PATTERN = re.compile(r'(?<![A-Za-z0-9_.])(\$?)([A-Z]{1,3})(\$?)([1-9]\d*)(?::(\$?)([A-Z]{1,3})(\$?)([1-9]\d*))?(?![A-Za-z0-9_(])')
+
+# Where cell references live in sheet, table and calc-chain XML: row numbers, ref/sqref attributes and formulas
+REF_CONTEXT = re.compile(r'(<row\b[^>]*?\br=")(\d+)(")|(\b(?:r|ref|sqref)=")([^"]*)(")|(<(?:f|formula[12]?)\b[^>]*>)([^<]*)(<)')
+
+_cache = {}
+
+
+def load_template(path, kind='serialized', start_row=START_ROW):
+    """
+    Cached template for `path`: parsed on first use, reused until the file changes.
+
+    kind: 'serialized' (SerializedTemplate) or 'workbook' (WorkbookTemplate)
+    """
+    path = Path(path).resolve()
+    key = (str(path), path.stat().st_mtime_ns, kind, start_row)
+    template = _cache.get(key)
+    if template is None:
+        template = TEMPLATE_KINDS[kind](path, start_row)
+        _cache[key] = template
+    return template
+
+
+def part_path(output_path, part):
+    """Numbered output file for a split batch: payments.xlsx -> payments_001.xlsx."""
+    output_path = Path(output_path)
+    return output_path.with_name(f"{output_path.stem}_{part:03d}{output_path.suffix}")
+
+
+class ShiftableXml:
+    """
+    XML whose cell references can be moved down past the data area.
+
+    The text is tokenized once into literals and row numbers (row attributes,
+    ref/sqref attributes, formulas - never names or messages), so shifting for
+    each output file only re-formats integers. A range ending on the last data
+    row grows with it (SUM(E4:E11) -> SUM(E4:E20)); anything after the data
+    area moves, anything above it stays.
+    """
+
+    def __init__(self, xml):
+        self.xml = xml
+        self.literals = []
+        self.rows = []  # (row, is range end)
+        pos = 0
+        for context in REF_CONTEXT.finditer(xml):
+            if context.group(1):
+                pos = self._slot(xml, pos, context.start(2), context.end(2), False)
+                continue
+            group = 5 if context.group(4) else 8
+            offset = context.start(group)
+            for ref in REF_PATTERN.finditer(context.group(group)):
+                pos = self._slot(xml, pos, offset + ref.start(4), offset + ref.end(4), False)
+                if ref.group(8):
+                    pos = self._slot(xml, pos, offset + ref.start(8), offset + ref.end(8), True)
+        self.literals.append(xml[pos:])
+
+    def _slot(self, xml, pos, start, end, range_end):
+        self.literals.append(xml[pos:start])
+        self.rows.append((int(xml[start:end]), range_end))
+        return end
+
+    def render(self, data_end, delta):
+        if not delta:
+            return self.xml
+        out = [self.literals[0]]
+        for (row, range_end), literal in zip(self.rows, self.literals[1:]):
+            out.append(str(min(row + delta, MAX_ROW) if row > data_end or (range_end and row == data_end) else row))
+            out.append(literal)
+        return ''.join(out)
+
+
+class SerializedTemplate:
+    """
+    Template pre-split into static XML so only data rows are generated per file.
+
+    The sheet is cut into header rows, the reserved data rows and the footer
+    (totals row and below), with each data column's style taken from the first
+    data row. Rendering streams the header, one generated <row> per payment
+    and the footer, and zips that with the untouched parts of the template.
+    Batches longer than the template's table grow the table: the footer, its
+    SUM ranges, data validations and the table range move down with the data.
+    """
+
+    def __init__(self, path, start_row=START_ROW):
+        self.path = Path(path)
+        self.start_row = start_row
+        with zipfile.ZipFile(self.path) as z:
+            self.parts = {info.filename: z.read(info) for info in z.infolist()}
+
+        # Totals are SUM formulas holding the template's cached results: have Excel recalculate on open
+        workbook = self.parts['xl/workbook.xml'].decode('utf-8')
+        self.parts['xl/workbook.xml'] = re.sub(r'<calcPr\b(?![^>]*fullCalcOnLoad)', '<calcPr fullCalcOnLoad="1"',
+                                               workbook, count=1).encode('utf-8')
+
+        self.sheet_name = self._first_sheet()
+        sheet = self.parts[self.sheet_name].decode('utf-8')
+        data_open = sheet.index('<sheetData')
+        data_start = sheet.index('>', data_open) + 1
+        if sheet[data_start - 2] == '/':
+            # <sheetData/>: re-open it so rows can go in
+            head, tail, data = sheet[:data_open] + '<sheetData>', '</sheetData>' + sheet[data_start:], ''
+        else:
+            data_close = sheet.index('</sheetData>')
+            head, tail, data = sheet[:data_start], sheet[data_close:], sheet[data_start:data_close]
+        self.sheet_head = ShiftableXml(head)
+        self.sheet_tail = ShiftableXml(tail)
+        rows = [(int(m.group(1)), m.group(0)) for m in ROW_PATTERN.finditer(data)]
+
+        self.table_name, table_xml = self._table()
+        self.shiftable_parts = {name: ShiftableXml(self.parts[name].decode('utf-8'))
+                                for name in (self.table_name, 'xl/calcChain.xml') if name in self.parts}
+        self.data_end = self._data_end(rows, table_xml)
+        self.header_rows = [xml for row, xml in rows if row < start_row]
+        self.data_rows = {row: xml for row, xml in rows if start_row <= row <= self.data_end}
+        self.footer = ShiftableXml(''.join(xml for row, xml in rows if row > self.data_end))
+
+        first = self.data_rows.get(start_row, '')
+        attrs = re.match(r'<row\b([^>]*?)/?>', first)
+        self.row_attrs = re.sub(r'\s*\br="\d+"', '', attrs.group(1)) if attrs else ''
+        self.column_styles = {}
+        for cell in CELL_PATTERN.finditer(first):
+            style = STYLE_PATTERN.search(cell.group(0)[:cell.group(0).find('>') + 1])
+            if style:
+                self.column_styles[column_index_from_string(cell.group(1))] = style.group(1)
+
+        sst = self.parts.get('xl/sharedStrings.xml', b'').decode('utf-8')
+        self.sst_count = len(re.findall(r'<si[ >]', sst))
+        self.sst_refs = int(re.search(r'\bcount="(\d+)"', sst).group(1)) if 'count="' in sst else self.sst_count
+        self.sst_body = sst[sst.index('>', sst.index('<sst')) + 1:sst.rindex('</sst>')] if sst else ''
+        self.sst_links = {} if sst else self._shared_strings_links()
+
+    def _first_sheet(self):
+        workbook = self.parts['xl/workbook.xml'].decode('utf-8')
+        rel_id = re.search(r'<sheet\b[^>]*\br:id="([^"]+)"', workbook).group(1)
+        rels = self.parts['xl/_rels/workbook.xml.rels'].decode('utf-8')
+        target = re.search(rf'<Relationship\b[^>]*\bId="{rel_id}"[^>]*\bTarget="([^"]+)"', rels) or \
+            re.search(rf'<Relationship\b[^>]*\bTarget="([^"]+)"[^>]*\bId="{rel_id}"', rels)
+        target = target.group(1).lstrip('/')
+        return target if target.startswith('xl/') else f"xl/{target}"
+
+    def _shared_strings_links(self):
+        """Content-type override and workbook relationship a template without shared strings needs once text is added."""
+        links = {}
+        types = self.parts['[Content_Types].xml'].decode('utf-8')
+        if '/xl/sharedStrings.xml' not in types:
+            links['[Content_Types].xml'] = types.replace('</Types>', (
+                '<Override PartName="/xl/sharedStrings.xml" ContentType="application/'
+                'vnd.openxmlformats-officedocument.spreadsheetml.sharedStrings+xml"/></Types>')).encode('utf-8')
+
+        rels = self.parts['xl/_rels/workbook.xml.rels'].decode('utf-8')
+        if 'relationships/sharedStrings"' not in rels:
+            ids = set(re.findall(r'\bId="([^"]+)"', rels))
+            rel_id = next(f"rId{n}" for n in range(len(ids) + 1, len(ids) + 1000) if f"rId{n}" not in ids)
+            links['xl/_rels/workbook.xml.rels'] = rels.replace('</Relationships>', (
+                f'<Relationship Id="{rel_id}" Type="http://schemas.openxmlformats.org/officeDocument/2006/'
+                'relationships/sharedStrings" Target="sharedStrings.xml"/></Relationships>')).encode('utf-8')
+        return links
+
+    def _table(self):
+        """(part name, xml) of the sheet's first table, or (None, None)."""
+        sheet_dir, sheet_file = self.sheet_name.rsplit('/', 1)
+        rels = self.parts.get(f"{sheet_dir}/_rels/{sheet_file}.rels", b'').decode('utf-8')
+        match = re.search(r'Target="([^"]*tables/[^"]+)"', rels)
+        if not match:
+            return None, None
+        name = str(Path(sheet_dir, match.group(1))).replace('\\', '/')
+        name = re.sub(r'[^/]+/\.\./', '', name)
+        return name, self.parts[name].decode('utf-8')
+
+    def _data_end(self, rows, table_xml):
+        """Last reserved data row: the table's last row, else the row before the first filled one."""
+        if table_xml:
+            ref = re.search(r'\bref="[A-Z]+(\d+):[A-Z]+(\d+)"', table_xml)
+            if ref and int(ref.group(1)) < self.start_row <= int(ref.group(2)):
+                return int(ref.group(2))
+        filled = [row for row, xml in rows if row >= self.start_row and ('<v>' in xml or '<f' in xml or '<is>' in xml)]
+        return min(filled) - 1 if filled else max([row for row, _ in rows] + [self.start_row - 1])
+
+    def render(self, output_path, rows, cells=None):
+        """
+        Write one output file.
+
+        Args:
+            output_path: xlsx to write
+            rows: Row tuples (column A onwards) for start_row down
+            cells: Extra single values, e.g. {'B1': '20/10/2026'}
+        """
+        strings = {}
+        sst_refs = 0
+
+        def cell_xml(ref, value, style):
+            nonlocal sst_refs
+            s = f' s="{style}"' if style else ''
+            if value is None or value == '' or value != value:
+                return f'<c r="{ref}"{s}/>' if style else ''
+            if isinstance(value, bool):
+                return f'<c r="{ref}"{s} t="b"><v>{int(value)}</v></c>'
+            if isinstance(value, numbers.Integral):
+                return f'<c r="{ref}"{s}><v>{int(value)}</v></c>'
+            if isinstance(value, numbers.Real):
+                return f'<c r="{ref}"{s}><v>{float(value)!r}</v></c>'
+            text = str(value)
+            index = strings.get(text)
+            if index is None:
+                index = strings[text] = self.sst_count + len(strings)
+            sst_refs += 1
+            return f'<c r="{ref}"{s} t="s"><v>{index}</v></c>'
+
+        last = self.start_row + len(rows) - 1
+        delta = max(0, last - self.data_end)
+        letters = [get_column_letter(i) for i in range(1, max([len(r) for r in rows] + list(self.column_styles) + [1]) + 1)]
+        styles = [self.column_styles.get(i) for i in range(1, len(letters) + 1)]
+
+        header = self.header_rows
+        if cells:
+            header = [self._set_cells(xml, cells, cell_xml) for xml in header]
+
+        body = []
+        for row_num, row in enumerate(rows, self.start_row):
+            values = ''.join(cell_xml(f"{letter}{row_num}", value, style)
+                             for letter, value, style in zip(letters, tuple(row) + ('',) * (len(letters) - len(row)), styles))
+            body.append(f'<row r="{row_num}"{self.row_attrs}>{values}</row>')
+        body.extend(xml for row, xml in sorted(self.data_rows.items()) if row > last)
+
+        sheet = ''.join([self.sheet_head.render(self.data_end, delta), *header, *body,
+                         self.footer.render(self.data_end, delta), self.sheet_tail.render(self.data_end, delta)])
+
+        parts = dict(self.parts)
+        parts[self.sheet_name] = sheet.encode('utf-8')
+        if strings:
+            added = ''.join(f'<si><t xml:space="preserve">{escape(text)}</t></si>' for text in strings)
+            parts['xl/sharedStrings.xml'] = (
+                '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+                f'<sst xmlns="{SHEET_NS}" count="{self.sst_refs + sst_refs}" uniqueCount="{self.sst_count + len(strings)}">'
+                f'{self.sst_body}{added}</sst>').encode('utf-8')
+            parts.update(self.sst_links)
+        if delta:
+            for name, xml in self.shiftable_parts.items():
+                parts[name] = xml.render(self.data_end, delta).encode('utf-8')
+
+        with zipfile.ZipFile(output_path, 'w', zipfile.ZIP_DEFLATED) as z:
+            for name, data in parts.items():
+                z.writestr(name, data)
+        return output_path
+
+    @staticmethod
+    def _set_cells(row_xml, cells, cell_xml):
+        """Put values into existing cells of a header row, keeping each cell's style."""
+        for ref, value in cells.items():
+            match = re.search(rf'<c\b[^>]*?\br="{ref}"[^>]*?(?:/>|>.*?</c>)', row_xml, re.S)
+            if match:
+                style = STYLE_PATTERN.search(match.group(0)[:match.group(0).find('>') + 1])
+                row_xml = row_xml[:match.start()] + cell_xml(ref, value, style.group(1) if style else None) + row_xml[match.end():]
+        return row_xml
+
+
+class WorkbookTemplate:
+    """
+    Template parsed once with openpyxl and reused for every file.
+
+    Values are written over the template cells, the workbook is saved, and
+    the written cells are put back (rows past the template deleted) so the
+    same workbook serves the next file.
+    """
+
+    def __init__(self, path, start_row=START_ROW):
+        self.path = Path(path)
+        self.start_row = start_row
+        self.wb = openpyxl.load_workbook(self.path)
+        self.ws = self.wb.active
+        self.max_row = self.ws.max_row
+
+    def render(self, output_path, rows, cells=None):
+        ws = self.ws
+        saved = {ref: ws[ref].value for ref in (cells or {})}
+        for ref, value in (cells or {}).items():
+            ws[ref] = value
+
+        written = []
+        cell = ws.cell
+        for row_num, row in enumerate(rows, self.start_row):
+            for col_num, value in enumerate(row, 1):
+                if value is not None and value != '':
+                    current = cell(row=row_num, column=col_num)
+                    written.append((current, current.value))
+                    current.value = value
+
+        try:
+            self.wb.save(output_path)
+        finally:
+            for current, value in written:
+                current.value = value
+            for ref, value in saved.items():
+                ws[ref] = value
+            if ws.max_row > self.max_row:
+                ws.delete_rows(self.max_row + 1, ws.max_row - self.max_row)
+        return output_path
+
+
+TEMPLATE_KINDS = {'serialized': SerializedTemplate, 'workbook': WorkbookTemplate}
@@ -1,31 +1,31 @@
 #!/usr/bin/env python3
 """
 Process Full Year 2025 Payment Data
-Converts all monthly Excel files to CSV, then creates comprehensive master file.
+Converts every monthly Excel file listed in the source manifest to CSV, then creates comprehensive master file.
 """
 
 import os
 import sys
 import glob
+import argparse
 import subprocess
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from datetime import datetime
 
-# Month mapping
-MONTHS = {
-    'jan': 'Baito Jan Payment Details 2025.xlsx',
-    'feb': 'Baito Feb Payment Details 2025.xlsx',
-    'march': 'Baito March Payment Details 2025.xlsx',
-    'april': 'Baito April Payment Details 2025.xlsx',
-    'may': 'Baito May Payment Details 2025.xlsx',
-    'june': 'Baito June Payment Details 2025.xlsx',
-    'july': 'Baito July Payment Details 2025.xlsx',
-    'aug': 'Baito Aug Payment Details 2025.xlsx',
-    'sep': 'Baito Sep Payment Details 2025.xlsx'
-}
+from source_manifest import DEFAULT_MANIFEST, load_manifest, resolve_sources
 
-SOURCE_DIR = '/Users/baito.kevin/Downloads/PROMOTER PAYMENT & CLAIMS 2025/Baito Promoter 2025/'
-OUTPUT_DIR = 'excel_imports/full_year_2025/'
+OUTPUT_DIR = 'excel_imports/'
+
+
+def partition_folder(source):
+    """CSV output folder for a source, e.g. excel_imports/full_year_2025/march."""
+    # Baito keeps its historical folder name; other companies get <company>_<year>
+    if source['company'].lower() == 'baito':
+        partition = f"full_year_{source['year']}"
+    else:
+        partition = f"{source['company'].lower()}_{source['year']}"
+    return Path(OUTPUT_DIR) / partition / source['month'].lower().replace('-', '_')
 
 
 def print_header(text):
@@ -76,72 +76,81 @@ def convert_excel_to_csv(month_name, excel_file, output_folder):
 
 def main():
     """Main processing function."""
-    print_header("BAITO FULL YEAR 2025 - BATCH PROCESSING")
+    parser = argparse.ArgumentParser(description='Convert every workbook in the source manifest to CSV.')
+    parser.add_argument('--manifest', default=str(DEFAULT_MANIFEST), help='Source manifest JSON (default: payment_sources.json)')
+    parser.add_argument('--company', help='Only process this company (e.g. Baito, Zenevento)')
+    parser.add_argument('--year', type=int, help='Only process this year')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='Parallel conversions (default: one per core)')
+    parser.add_argument('--force', action='store_true', help='Re-convert months that already have CSV output')
+    parser.add_argument('-y', '--yes', action='store_true', help='Do not ask for confirmation')
+    args = parser.parse_args()
+
+    print_header("BAITO PAYMENT WORKBOOKS - BATCH PROCESSING")
+
+    sources = resolve_sources(load_manifest(args.manifest), company=args.company,
+                              year=args.year, existing_only=False)
 
     print("📊 Overview:")
-    print(f"   Source: {SOURCE_DIR}")
+    print(f"   Manifest: {args.manifest}")
     print(f"   Output: {OUTPUT_DIR}")
-    print(f"   Months: {len(MONTHS)} (Jan - Sep 2025)")
-
-    # Check if source directory exists
-    if not Path(SOURCE_DIR).exists():
-        print(f"\n❌ Error: Source directory not found: {SOURCE_DIR}")
-        return
+    print(f"   Sources: {len(sources)}")
 
     # Survey files
     print("\n📋 Survey of available files:")
     total_size = 0
-    available_months = []
-
-    for month, filename in MONTHS.items():
-        file_path = Path(SOURCE_DIR) / filename
-        if file_path.exists():
-            size_mb = file_path.stat().st_size / 1024 / 1024
-            total_size += size_mb
-            available_months.append(month)
-            status = "✓" if month == 'april' else "⏳"
-            note = " (already processed)" if month == 'april' else ""
-            print(f"   {status} {month.capitalize():10} - {size_mb:6.1f} MB{note}")
+    pending = []
+    skip_count = 0
+
+    for source in sources:
+        file_path = Path(source['path'])
+        label = f"{source['company']} {source['month']} {source['year']}"
+        if not file_path.exists():
+            print(f"   ✗ {label:25} - NOT FOUND")
+            continue
+
+        size_mb = file_path.stat().st_size / 1024 / 1024
+        total_size += size_mb
+        done = bool(glob.glob(f"{partition_folder(source)}/*.csv"))
+
+        if done and not args.force:
+            skip_count += 1
+            print(f"   ✓ {label:25} - {size_mb:6.1f} MB (already processed)")
         else:
-            print(f"   ✗ {month.capitalize():10} - NOT FOUND")
+            pending.append(source)
+            print(f"   ⏳ {label:25} - {size_mb:6.1f} MB")
 
     print(f"\n   Total size: {total_size:.1f} MB")
-    print(f"   Files to process: {len(available_months) - 1}")  # -1 for April already done
+    print(f"   Files to process: {len(pending)}")
+
+    if not pending:
+        print("\n✅ Nothing to convert.")
+        return
 
     # Confirm
-    print(f"\n{'='*100}")
-    response = input(f"\nProceed with converting {len(available_months) - 1} Excel files to CSV? (yes/no): ")
+    if not args.yes:
+        print(f"\n{'='*100}")
+        response = input(f"\nProceed with converting {len(pending)} Excel files to CSV? (yes/no): ")
 
-    if response.lower() not in ['yes', 'y']:
-        print("\n❌ Processing cancelled.")
-        return
+        if response.lower() not in ['yes', 'y']:
+            print("\n❌ Processing cancelled.")
+            return
 
-    # Process each month
     print_header("CONVERTING EXCEL FILES TO CSV")
 
     start_time = datetime.now()
-    success_count = 0
-    skip_count = 0
-    error_count = 0
 
-    for month in available_months:
-        # Skip April (already processed)
-        if month == 'april':
-            print(f"\n📁 {month.upper()}: Skipping (already processed)")
-            skip_count += 1
-            continue
-
-        excel_file = Path(SOURCE_DIR) / MONTHS[month]
-        output_folder = Path(OUTPUT_DIR) / month
-
-        # Create output folder
+    def convert(source):
+        output_folder = partition_folder(source)
         output_folder.mkdir(parents=True, exist_ok=True)
+        return convert_excel_to_csv(f"{source['company']} {source['month']} {source['year']}",
+                                    source['path'], str(output_folder))
 
-        # Convert
-        if convert_excel_to_csv(month, str(excel_file), str(output_folder)):
-            success_count += 1
-        else:
-            error_count += 1
+    # Each conversion is a subprocess, so threads are enough to use every core
+    with ThreadPoolExecutor(max_workers=max(1, args.workers)) as pool:
+        outcomes = list(pool.map(convert, pending))
+
+    success_count = sum(1 for ok in outcomes if ok)
+    error_count = len(outcomes) - success_count
 
     # Summary
     end_time = datetime.now()
@@ -157,7 +166,7 @@ def main():
         print("\n" + "="*100)
         print("\n✅ CSV conversion complete!")
         print("\n📊 Next step: Run the extraction script to create master file")
-        print("   Command: python3 scripts/create_yearly_master_excel.py")
+        print("   Command: python3 scripts/create_master_excel_v3_fixed.py")
         print()
 
 
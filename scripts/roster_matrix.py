@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+"""
+Roster Matrix
+Candidate × date roster as a sparse matrix with categorical shift codes: headcount per day, days per candidate and roster-vs-days_worked reconciliation.
+"""
+
+import argparse
+import sys
+from datetime import date
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from payment_store import PaymentStore, DEFAULT_STORE
+
+
+# Shift codes that mean the candidate was rostered but did not work
+NON_WORKING_CODES = {'OFF', 'O', '-', 'X', 'NA', 'N/A', 'NIL', '0', 'REST', 'RD', 'LEAVE', 'AL', 'MC', 'CANCEL', 'CANCELLED'}
+
+
+def normalize_ic(ic):
+    if ic is None or (isinstance(ic, float) and ic != ic):
+        return None
+    return str(ic).strip().replace('-', '').replace(' ', '') or None
+
+
+class RosterMatrix:
+    """
+    Sparse candidate × day matrix.
+
+    Only rostered cells are kept, as parallel numpy arrays sorted by
+    (candidate, day) - CSR layout with `indptr` giving each candidate's
+    slice. Days are offsets from `origin`, shift codes index into `codes`,
+    so a cell costs 13 bytes however many years the roster spans.
+    """
+
+    def __init__(self, candidates, codes, origin, cand, day, code, record):
+        order = np.lexsort((day, cand))
+        self.candidates = np.asarray(candidates, dtype=object)
+        self.codes = np.asarray(codes, dtype=object)
+        self.origin = origin
+        self.cand = cand[order].astype(np.int32)
+        self.day = day[order].astype(np.int32)
+        self.code = code[order].astype(np.int8 if len(codes) < 128 else np.int16)
+        self.record = record[order].astype(np.int32)
+        self.n_days = int(self.day.max()) + 1 if len(self.day) else 0
+        self.indptr = np.searchsorted(self.cand, np.arange(len(self.candidates) + 1))
+        self.working_codes = np.array([str(c).strip().upper() not in NON_WORKING_CODES for c in self.codes], dtype=bool)
+        self._index = {ic: i for i, ic in enumerate(self.candidates)}
+
+    @classmethod
+    def from_frame(cls, df):
+        """Build from cells with record_id, ic_number, day (date ordinal) and code - see PaymentStore.roster_frame()."""
+        # Normalize each distinct IC once, then map cells through the two factorizations
+        raw, raw_ics = pd.factorize(df['ic_number'])
+        ic_index, candidates = pd.factorize(pd.Series([normalize_ic(ic) for ic in raw_ics], dtype=object))
+        cand = np.where(raw >= 0, ic_index[raw], -1) if len(raw_ics) else raw
+        keep = cand >= 0
+        df, cand = df[keep], cand[keep]
+        code, codes = pd.factorize(df['code'].astype(str))
+        days = df['day'].to_numpy(dtype=np.int64)
+        origin = int(days.min()) if len(days) else date.today().toordinal()
+        return cls(candidates, codes, origin, cand, days - origin, code, df['record_id'].to_numpy())
+
+    @classmethod
+    def from_store(cls, store_path):
+        with PaymentStore(store_path) as store:
+            return cls.from_frame(store.roster_frame())
+
+    @property
+    def nbytes(self):
+        return sum(a.nbytes for a in (self.cand, self.day, self.code, self.record, self.indptr))
+
+    def _dates(self, offsets):
+        return pd.to_datetime([date.fromordinal(self.origin + int(d)) for d in offsets])
+
+    def _mask(self, codes=None, start=None, end=None):
+        """Cells with a working code (or one of `codes`) between start and end dates."""
+        if codes:
+            wanted = {str(c).upper() for c in codes}
+            mask = np.array([str(c).upper() in wanted for c in self.codes], dtype=bool)[self.code]
+        else:
+            mask = self.working_codes[self.code]
+        if start is not None:
+            mask &= self.day >= start.toordinal() - self.origin
+        if end is not None:
+            mask &= self.day <= end.toordinal() - self.origin
+        return mask
+
+    def _distinct_days(self, mask):
+        """
+        Unique (candidate, day) cells - two projects on one day are one day worked.
+
+        Cells are sorted by (candidate, day), so duplicates are neighbours: one linear pass, no sort or hash.
+        """
+        cand, day = self.cand[mask], self.day[mask]
+        keep = np.ones(len(cand), dtype=bool)
+        keep[1:] = (cand[1:] != cand[:-1]) | (day[1:] != day[:-1])
+        return cand[keep], day[keep]
+
+    def headcount(self, start=None, end=None, codes=None):
+        """Candidates working per day (Series indexed by date, zero-headcount days included)."""
+        if not len(self.day):
+            return pd.Series(dtype=int)
+        _, days = self._distinct_days(self._mask(codes, start, end))
+        counts = np.bincount(days, minlength=self.n_days)
+        first = start.toordinal() - self.origin if start else 0
+        last = end.toordinal() - self.origin + 1 if end else self.n_days
+        first, last = max(first, 0), min(last, self.n_days)
+        return pd.Series(counts[first:last], index=self._dates(range(first, last)), name='headcount')
+
+    def days_per_candidate(self, start=None, end=None, codes=None):
+        """Distinct days worked per candidate IC."""
+        cands, _ = self._distinct_days(self._mask(codes, start, end))
+        counts = np.bincount(cands, minlength=len(self.candidates))
+        return pd.Series(counts, index=self.candidates, name='roster_days').sort_values(ascending=False)
+
+    def code_counts(self):
+        """Cells per shift code."""
+        return pd.Series(np.bincount(self.code, minlength=len(self.codes)), index=self.codes, name='cells')
+
+    def candidate_roster(self, ic):
+        """One candidate's cells (date, code, record_id), read from its CSR slice."""
+        i = self._index.get(normalize_ic(ic))
+        if i is None:
+            return pd.DataFrame(columns=['date', 'code', 'record_id'])
+        lo, hi = self.indptr[i], self.indptr[i + 1]
+        return pd.DataFrame({'date': self._dates(self.day[lo:hi]), 'code': self.codes[self.code[lo:hi]],
+                             'record_id': self.record[lo:hi]})
+
+    def reconcile(self, master):
+        """
+        Compare working roster days per record with the record's days_worked.
+
+        Args:
+            master: Master list with record_id and days_worked (PaymentStore.read_master())
+
+        Returns: DataFrame of rostered records with roster_days, difference and status
+        """
+        mask = self.working_codes[self.code]
+        order = np.lexsort((self.day[mask], self.record[mask]))
+        record, day = self.record[mask][order], self.day[mask][order]
+        keep = np.ones(len(record), dtype=bool)
+        keep[1:] = (record[1:] != record[:-1]) | (day[1:] != day[:-1])
+        worked = pd.Series(record[keep]).value_counts()
+
+        result = master[master['record_id'].isin(pd.unique(self.record))].copy()
+        result['roster_days'] = result['record_id'].map(worked).fillna(0)
+        result['difference'] = result['days_worked'].fillna(0) - result['roster_days']
+        result['status'] = np.where(result['difference'].abs() < 0.01, 'MATCH',
+                                    np.where(result['difference'] > 0, 'MORE_DAYS_THAN_ROSTER', 'FEWER_DAYS_THAN_ROSTER'))
+        return result[['record_id', 'month', 'source_file', 'project_name', 'full_name', 'ic_number',
+                       'days_worked', 'roster_days', 'difference', 'status']]
+
+
+def main():
+    """Main CLI entry point."""
+    parser = argparse.ArgumentParser(description='Roster analysis from the payment store.')
+    parser.add_argument('store', nargs='?', default=DEFAULT_STORE, help=f"Payment store (default: {DEFAULT_STORE})")
+    parser.add_argument('--from', dest='start', type=date.fromisoformat, help='First date (YYYY-MM-DD)')
+    parser.add_argument('--to', dest='end', type=date.fromisoformat, help='Last date (YYYY-MM-DD)')
+    parser.add_argument('--candidate', help='Show one candidate\'s roster (IC number)')
+    parser.add_argument('--output', default='roster_report.xlsx', help='Headcount, days and reconciliation workbook')
+    args = parser.parse_args()
+
+    print("="*120)
+    print(" "*45 + "ROSTER MATRIX")
+    print("="*120)
+
+    if not Path(args.store).exists():
+        print(f"❌ Error: {args.store} not found!")
+        return 1
+
+    with PaymentStore(args.store) as store:
+        frame = store.roster_frame()
+        master = store.read_master()
+
+    if not len(frame):
+        print("\n⚠️  No roster entries stored - re-extract with --store to capture date-pattern columns.")
+        return 1
+
+    matrix = RosterMatrix.from_frame(frame)
+    print(f"\n📅 {len(matrix.candidates):,} candidates × {matrix.n_days:,} days, {len(matrix.day):,} rostered cells "
+          f"({matrix.nbytes / 1024:.0f} KB)")
+    print(f"   Shift codes: " + ', '.join(f"{code} ({n:,})" for code, n in matrix.code_counts().items()))
+
+    if args.candidate:
+        roster = matrix.candidate_roster(args.candidate)
+        print(f"\n👤 {args.candidate}: {len(roster)} rostered day(s)")
+        for r in roster.itertuples():
+            print(f"   {r.date:%Y-%m-%d}  {r.code}")
+        return 0
+
+    headcount = matrix.headcount(args.start, args.end)
+    days = matrix.days_per_candidate(args.start, args.end)
+    reconciliation = matrix.reconcile(master)
+
+    print(f"\n👥 Headcount: peak {headcount.max():,} on {headcount.idxmax():%Y-%m-%d}, "
+          f"{(headcount > 0).sum():,} staffed day(s)")
+    print(f"   Busiest candidates: " + ', '.join(f"{ic} ({n})" for ic, n in days.head(5).items()))
+
+    print(f"\n🔍 Roster vs days_worked ({len(reconciliation):,} rostered records):")
+    for status, count in reconciliation['status'].value_counts().items():
+        print(f"   {status:25} {count:>6,}")
+
+    with pd.ExcelWriter(args.output, engine='openpyxl') as writer:
+        headcount.rename_axis('date').reset_index().to_excel(writer, sheet_name='Headcount', index=False)
+        days.rename_axis('ic_number').reset_index().to_excel(writer, sheet_name='Days per Candidate', index=False)
+        reconciliation.to_excel(writer, sheet_name='Reconciliation', index=False)
+    print(f"\n💾 Report saved: {args.output}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+"""
+Run Metrics
+Lightweight spans and counters for the extraction, validation and vision scripts, written as a JSON-lines run report.
+"""
+
+import cProfile
+import io
+import json
+import os
+import pstats
+import threading
+import time
+import tracemalloc
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+
+
+# Report path is passed through the environment so worker processes write to the same file
+METRICS_ENV = 'BAITO_METRICS_FILE'
+RUN_ENV = 'BAITO_METRICS_RUN'
+
+# Numeric attributes that identify a span rather than count something
+IDENTITY_KEYS = {'section', 'status', 'index'}
+
+_local = threading.local()
+_handles = {}
+
+
+def _stack():
+    if not hasattr(_local, 'stack'):
+        _local.stack = []
+    return _local.stack
+
+
+def enabled():
+    """True when a run report is being written."""
+    return bool(os.environ.get(METRICS_ENV))
+
+
+def enable(report_path):
+    """Start a new run report (truncates the file). Worker processes inherit it."""
+    Path(report_path).parent.mkdir(parents=True, exist_ok=True)
+    open(report_path, 'w', encoding='utf-8').close()
+    os.environ[METRICS_ENV] = str(report_path)
+    os.environ[RUN_ENV] = uuid.uuid4().hex[:12]
+
+
+def _emit(record):
+    """Append one JSON line (line-buffered: one write per line, safe across processes)."""
+    path = os.environ.get(METRICS_ENV)
+    if not path:
+        return
+
+    key = (os.getpid(), path)
+    handle = _handles.get(key)
+    if handle is None:
+        handle = open(path, 'a', encoding='utf-8', buffering=1)
+        _handles[key] = handle
+
+    handle.write(json.dumps(record, default=str) + '\n')
+
+
+def start_span(name, **attrs):
+    """
+    Open a span. Prefer `with span(...)`; use start/end where a block is too large to indent.
+
+    Returns the span's attribute dict - set counts on it directly.
+    """
+    stack = _stack()
+    current = {
+        'span': name,
+        'parent': stack[-1]['span'] if stack else None,
+        '_start': time.perf_counter(),
+        '_wall': time.time(),
+    }
+    current.update(attrs)
+    stack.append(current)
+    return current
+
+
+def end_span(current, **attrs):
+    """Close a span (and any child left open by an exception) and write it to the report."""
+    stack = _stack()
+    while stack:
+        if stack.pop() is current:
+            break
+
+    current.update(attrs)
+    seconds = time.perf_counter() - current.pop('_start')
+    wall = current.pop('_wall')
+
+    if enabled():
+        record = {'run': os.environ.get(RUN_ENV), 'pid': os.getpid(), 'start': round(wall, 6),
+                  'seconds': round(seconds, 6)}
+        record.update(current)
+        _emit(record)
+    return seconds
+
+
+@contextmanager
+def span(name, **attrs):
+    """Time a block: `with span('extract.headers', sheet=name) as s: ... s['sections'] = 3`."""
+    current = start_span(name, **attrs)
+    try:
+        yield current
+    except Exception as e:
+        current['error'] = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        end_span(current)
+
+
+def incr(key, n=1):
+    """Add to a counter on the innermost open span (no-op outside a span)."""
+    stack = _stack()
+    if stack:
+        stack[-1][key] = stack[-1].get(key, 0) + n
+
+
+def load_report(report_path):
+    """Read a JSON-lines run report."""
+    with open(report_path, 'r', encoding='utf-8') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def summarize(records):
+    """
+    Aggregate spans by name.
+
+    Returns: list of {span, count, total_s, mean_ms, p95_ms, max_ms, errors, counters}
+    ordered by total time.
+    """
+    groups = {}
+    for record in records:
+        groups.setdefault(record['span'], []).append(record)
+
+    skip = {'run', 'pid', 'start', 'seconds', 'span', 'parent', 'error'} | IDENTITY_KEYS
+    rows = []
+    for name, spans in groups.items():
+        durations = sorted(s['seconds'] for s in spans)
+        counters = {}
+        for s in spans:
+            for key, value in s.items():
+                if key not in skip and isinstance(value, (int, float)) and not isinstance(value, bool):
+                    counters[key] = counters.get(key, 0) + value
+
+        rows.append({
+            'span': name,
+            'count': len(spans),
+            'total_s': sum(durations),
+            'mean_ms': sum(durations) / len(durations) * 1000,
+            'p95_ms': durations[min(len(durations) - 1, int(len(durations) * 0.95))] * 1000,
+            'max_ms': durations[-1] * 1000,
+            'errors': sum(1 for s in spans if s.get('error')),
+            'counters': counters
+        })
+
+    rows.sort(key=lambda r: r['total_s'], reverse=True)
+    return rows
+
+
+def print_summary(report_path):
+    """Print the per-span summary table for a run report."""
+    rows = summarize(load_report(report_path))
+
+    print(f"\n{'='*120}")
+    print("RUN METRICS")
+    print(f"{'='*120}")
+    print(f"{'Span':<28} {'Count':>7} {'Total (s)':>10} {'Mean (ms)':>10} {'p95 (ms)':>10} {'Max (ms)':>10} {'Err':>4}  Counters")
+    print(f"{'─'*120}")
+    for row in rows:
+        counters = ', '.join(f"{k}={v:,.0f}" if float(v).is_integer() else f"{k}={v:,.2f}"
+                             for k, v in sorted(row['counters'].items()))
+        print(f"{row['span']:<28} {row['count']:>7} {row['total_s']:>10.2f} {row['mean_ms']:>10.1f} "
+              f"{row['p95_ms']:>10.1f} {row['max_ms']:>10.1f} {row['errors']:>4}  {counters}")
+    print(f"\n   Report: {report_path}")
+
+
+@contextmanager
+def profiling(output_prefix, top=20):
+    """cProfile + tracemalloc around a block; writes <prefix>.prof and prints the hot spots."""
+    tracemalloc.start()
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        snapshot = tracemalloc.take_snapshot()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        prof_file = f"{output_prefix}.prof"
+        profiler.dump_stats(prof_file)
+
+        out = io.StringIO()
+        pstats.Stats(profiler, stream=out).sort_stats('cumulative').print_stats(top)
+        print(f"\n{'='*120}")
+        print(f"PROFILE (top {top} by cumulative time) - full stats: {prof_file}")
+        print(f"{'='*120}")
+        print(out.getvalue())
+
+        print(f"Python heap peak: {peak / (1024 * 1024):.1f} MB - top allocation sites:")
+        for stat in snapshot.statistics('lineno')[:10]:
+            print(f"   {stat}")
+
+
+def add_arguments(parser):
+    """Add --metrics/--profile to a script's argparse parser."""
+    parser.add_argument('--metrics', metavar='REPORT.jsonl', help='Write a JSON-lines span report and print a summary table')
+    parser.add_argument('--profile', action='store_true',
+                        help='Also run cProfile and tracemalloc (main process only) and print the hot spots')
+
+
+@contextmanager
+def metrics_session(report_path=None, profile=False):
+    """
+    Wrap a script's run: start the report, optionally profile, print the summary at the end.
+
+    With neither option set this does nothing, so scripts behave exactly as before.
+    """
+    if report_path:
+        enable(report_path)
+
+    try:
+        if profile:
+            prefix = str(Path(report_path).with_suffix('')) if report_path else 'run_profile'
+            with profiling(prefix):
+                yield
+        else:
+            yield
+    finally:
+        if report_path:
+            for key in [k for k in _handles if k[0] == os.getpid()]:
+                _handles.pop(key).close()
+            print_summary(report_path)
@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+"""
+Source Manifest
+Loads the payment-workbook manifest (payment_sources.json), discovers the monthly files and schedules them across cores.
+"""
+
+import glob
+import json
+import os
+import re
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+
+DEFAULT_MANIFEST = Path(__file__).resolve().parent.parent / 'payment_sources.json'
+
+# Month labels as they appear in the master list 'month' column
+MONTH_LABELS = {
+    1: 'Jan', 2: 'Feb', 3: 'March', 4: 'April', 5: 'May', 6: 'June',
+    7: 'July', 8: 'Aug', 9: 'Sep', 10: 'Oct', 11: 'Nov', 12: 'Dec'
+}
+
+MONTH_ALIASES = {
+    'jan': 1, 'january': 1,
+    'feb': 2, 'february': 2,
+    'mar': 3, 'march': 3,
+    'apr': 4, 'april': 4,
+    'may': 5,
+    'jun': 6, 'june': 6,
+    'jul': 7, 'july': 7,
+    'aug': 8, 'august': 8,
+    'sep': 9, 'sept': 9, 'september': 9,
+    'oct': 10, 'october': 10,
+    'nov': 11, 'november': 11,
+    'dec': 12, 'december': 12,
+}
+
+# Whole-word month tokens only: "Mayban" or "Decathlon" must not match
+MONTH_PATTERN = re.compile(r'(?<![a-z])(' + '|'.join(sorted(MONTH_ALIASES, key=len, reverse=True)) + r')(?![a-z])', re.IGNORECASE)
+MONTH_RANGE_PATTERN = re.compile(MONTH_PATTERN.pattern + r'\s*-\s*' + MONTH_PATTERN.pattern, re.IGNORECASE)
+YEAR_PATTERN = re.compile(r'(?<!\d)(20\d{2})(?!\d)')
+
+
+def parse_month(text):
+    """
+    Parse the month from a file name or label.
+
+    Returns: (month_num, label) - e.g. (3, 'March') or (3, 'March-June') for
+    multi-month workbooks - or (None, 'Unknown').
+    """
+    name = Path(str(text)).name
+
+    range_match = MONTH_RANGE_PATTERN.search(name)
+    if range_match:
+        first = MONTH_ALIASES[range_match.group(1).lower()]
+        last = MONTH_ALIASES[range_match.group(2).lower()]
+        return first, f"{MONTH_LABELS[first]}-{MONTH_LABELS[last]}"
+
+    match = MONTH_PATTERN.search(name)
+    if match:
+        month_num = MONTH_ALIASES[match.group(1).lower()]
+        return month_num, MONTH_LABELS[month_num]
+
+    return None, 'Unknown'
+
+
+def parse_year(text):
+    """Parse a 20xx year from a file name, None if absent."""
+    match = YEAR_PATTERN.search(Path(str(text)).name)
+    return int(match.group(1)) if match else None
+
+
+def make_source(company, path, year=None, month=None):
+    """Build a source dict, filling year/month from the file name when not given."""
+    if month:
+        month_num, month_label = parse_month(month)
+    else:
+        month_num, month_label = parse_month(path)
+
+    return {
+        'company': company,
+        'year': int(year) if year else parse_year(path),
+        'month': month_label,
+        'month_num': month_num,
+        'path': str(path)
+    }
+
+
+def discover_sources(rule):
+    """
+    Expand a discovery rule into sources.
+
+    Rule: {"company": "Baito", "dir": "...", "pattern": "Baito * Payment Details *.xlsx", "year": 2025 (optional)}
+    """
+    source_dir = Path(os.path.expanduser(rule['dir']))
+    if not source_dir.exists():
+        print(f"   ⊘ {rule['company']}: directory not found: {source_dir}")
+        return []
+
+    sources = []
+    for path in sorted(glob.glob(str(source_dir / rule.get('pattern', '*.xlsx')))):
+        if Path(path).name.startswith('~$'):
+            continue  # Excel lock file
+        sources.append(make_source(rule['company'], path, year=rule.get('year')))
+    return sources
+
+
+def load_manifest(manifest_path=DEFAULT_MANIFEST):
+    """Read the manifest JSON."""
+    with open(manifest_path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def resolve_sources(manifest, company=None, year=None, existing_only=True):
+    """
+    Resolve explicit and discovered sources, ordered by company, year and month.
+
+    Explicit "sources" entries win over discovered files with the same path.
+    """
+    by_path = {}
+
+    for rule in manifest.get('discover', []):
+        for source in discover_sources(rule):
+            by_path[os.path.normpath(source['path'])] = source
+
+    for entry in manifest.get('sources', []):
+        source = make_source(entry['company'], os.path.expanduser(entry['path']),
+                             year=entry.get('year'), month=entry.get('month'))
+        by_path[os.path.normpath(source['path'])] = source
+
+    sources = []
+    for source in by_path.values():
+        if company and source['company'].lower() != company.lower():
+            continue
+        if year and source['year'] != int(year):
+            continue
+        if source['year'] is None:
+            # Outputs are named and partitioned by year
+            print(f"   ⊘ {Path(source['path']).name}: no year in the file name - set 'year' in the manifest")
+            continue
+        if existing_only and not Path(source['path']).exists():
+            print(f"   ⊘ {source['company']} {source['month']} {source['year']}: file not found")
+            continue
+        sources.append(source)
+
+    sources.sort(key=lambda s: (s['company'], s['year'], s['month_num'] or 99, s['path']))
+    return sources
+
+
+def source_file_index(sources):
+    """Map source file name -> full path (validators look files up by master 'source_file')."""
+    return {Path(s['path']).name: s['path'] for s in sources}
+
+
+def locate_source(source_dir, filename):
+    """
+    Locate a source workbook.
+
+    source_dir may be a directory (legacy) or a source_file_index() mapping.
+    """
+    if isinstance(source_dir, dict):
+        return Path(source_dir.get(filename, filename))
+    return Path(source_dir) / filename
+
+
+def partition_key(source):
+    """Output partition for a source: one master per company and year."""
+    return source['company'], source['year']
+
+
+def run_sources(sources, process_fn, workers=None):
+    """
+    Run process_fn(path, month) for every source across worker processes.
+
+    process_fn must be a module-level function (it is pickled to workers).
+    Returns: {(company, year): [records...]} in manifest order; extractors returning a
+    DataFrame get one concatenated DataFrame per partition instead.
+    """
+    partitions = defaultdict(list)
+    if not sources:
+        return partitions
+
+    workers = workers or min(len(sources), os.cpu_count() or 1)
+
+    if workers <= 1:
+        results = [process_fn(s['path'], s['month']) for s in sources]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(process_fn, [s['path'] for s in sources], [s['month'] for s in sources]))
+
+    for source, records in zip(sources, results):
+        if hasattr(records, 'columns'):
+            partitions[partition_key(source)].append(records)
+        else:
+            partitions[partition_key(source)].extend(records)
+
+    for key, parts in partitions.items():
+        if parts and hasattr(parts[0], 'columns'):
+            partitions[key] = concat_frames(parts)
+
+    return partitions
+
+
+def concat_frames(frames):
+    """Concatenate columnar extractor results, keeping their categorical columns categorical."""
+    import pandas as pd
+
+    categorical = [name for name, dtype in frames[0].dtypes.items() if isinstance(dtype, pd.CategoricalDtype)]
+    df = pd.concat(frames, ignore_index=True)
+    # Categories differ per workbook, so concat falls back to object; re-encode once over the union
+    return df.astype({name: 'category' for name in categorical})
@@ -6,6 +6,7 @@ Detects issues in extracted data and cross-references with original CSV files to
 
 import os
 import sys
+import time
 import pandas as pd
 import numpy as np
 from pathlib import Path
@@ -18,111 +19,190 @@ from create_master_excel_v2 import (
     clean_ic_number, clean_name, clean_bank_name, clean_account,
     safe_float, find_header_rows
 )
+from mykad import IC_STATUSES, MYKAD, PASSPORT, decode_ics
+
+
+# Payment components that should add up to total_payment
+PAYMENT_COMPONENTS = ['total_wages', 'total_ot', 'total_allowance', 'total_claim']
+
+# Bank names used for claim-only rows (no account expected)
+CLAIM_ONLY_BANKS = ['sammy claim', 'claim']
+
+# Rule registry: each rule is a boolean mask over the whole master DataFrame
+VALIDATION_RULES = []
+
+
+def register_rule(name, severity, mask, fix, describe):
+    """
+    Register a validation rule.
+
+    Args:
+        name: Issue type, e.g. 'MISSING_ACCOUNT'
+        severity: 'HIGH' / 'MEDIUM' / 'LOW'
+        mask: fn(df, ctx) -> boolean Series, True where the rule fires
+        fix: fn(df, ctx) -> Series of suggested fixes, or a constant suggestion
+        describe: fn(record) -> description text (only built for issues that get reported)
+    """
+    VALIDATION_RULES.append({
+        'name': name,
+        'severity': severity,
+        'mask': mask,
+        'fix': fix,
+        'describe': describe
+    })
+
+
+def component_sum(df):
+    """Row-wise sum of payment components (NaN if any component is missing, as with +)."""
+    return df[PAYMENT_COMPONENTS].sum(axis=1, skipna=False)
+
+
+def _record_component_sum(record):
+    return sum(record[col] for col in PAYMENT_COMPONENTS)
+
+
+def _lost_zero(df):
+    """11-digit ICs: a MyKad whose leading zero Excel dropped."""
+    return df['ic_number'].astype(str).str.replace(r'\.0$|[\s\-]', '', regex=True).str.fullmatch(r'\d{11}')
+
+
+def _invalid_ic_mask(df, ctx):
+    ic = df['ic_number']
+    ic_str = ic.astype(str)
+    # Same truthiness as `if record['ic_number']`: '' and 0 are skipped, NaN is not
+    present = ~((ic_str == '') | (ic.isin([0])))
+    # Neither a decodable MyKad (real birth date, assigned place code) nor a passport-style ID
+    return present & (~ctx['ic']['status'].isin([MYKAD, PASSPORT]) | _lost_zero(df))
+
+
+def _ic_fix(df, ctx):
+    """The 12-digit IC when only the leading zero was lost, otherwise manual review."""
+    restored = _lost_zero(df) & (ctx['ic']['status'] == MYKAD)
+    return ctx['ic']['ic'].where(restored, 'Manual review required').astype(object)
+
+
+def _ic_problem(ic):
+    decoded = decode_ics(pd.Series([ic]))
+    status = IC_STATUSES[decoded['status'].iloc[0]]
+    return 'leading zero lost' if status == 'MYKAD' else status.replace('_', ' ').lower()
+
+
+def _missing_account_mask(df, ctx):
+    bank = df['bank_name']
+    claim_only = bank.astype(str).str.lower().isin(CLAIM_ONLY_BANKS)
+    return bank.notna() & df['account_number'].isna() & ~claim_only
+
+
+# Rule 1: Zero payment with non-zero components
+register_rule(
+    'ZERO_PAYMENT_WITH_COMPONENTS', 'HIGH',
+    mask=lambda df, ctx: (df['total_payment'] == 0) & (ctx['component_sum'] > 0),
+    fix=lambda df, ctx: ctx['component_sum'],
+    describe=lambda r: f"total_payment=0 but components sum to {_record_component_sum(r)}"
+)
+
+# Rule 2: Payment without days worked
+register_rule(
+    'PAYMENT_WITHOUT_DAYS', 'MEDIUM',
+    mask=lambda df, ctx: (df['days_worked'] == 0) & (df['total_payment'] > 0),
+    fix='Check original CSV for days data',
+    describe=lambda r: f"days_worked=0 but payment={r['total_payment']}"
+)
+
+# Rule 3: Missing bank account when bank exists
+register_rule(
+    'MISSING_ACCOUNT', 'HIGH',
+    mask=_missing_account_mask,
+    fix='Cross-reference with original CSV',
+    describe=lambda r: f"Has bank '{r['bank_name']}' but no account number"
+)
+
+# Rule 4: Total payment less than component sum
+register_rule(
+    'TOTAL_LESS_THAN_COMPONENTS', 'MEDIUM',
+    mask=lambda df, ctx: (df['total_payment'] > 0) & (ctx['component_sum'] > df['total_payment']),
+    fix=lambda df, ctx: ctx['component_sum'],
+    describe=lambda r: f"total_payment={r['total_payment']} < components={_record_component_sum(r)}"
+)
+
+# Rule 5: Suspicious IC number
+register_rule(
+    'INVALID_IC', 'HIGH',
+    mask=_invalid_ic_mask,
+    fix=_ic_fix,
+    describe=lambda r: f"IC number '{r['ic_number']}' looks invalid ({_ic_problem(r['ic_number'])})"
+)
+
+# Rule 6: All payment fields are zero
+register_rule(
+    'ALL_PAYMENTS_ZERO', 'HIGH',
+    mask=lambda df, ctx: (df[['total_payment'] + PAYMENT_COMPONENTS] == 0).all(axis=1),
+    fix='Cross-reference with original CSV',
+    describe=lambda r: "All payment fields are 0"
+)
 
 
 class DataValidator:
     """Validates and corrects extracted candidate data."""
 
-    def __init__(self):
+    def __init__(self, rules=None):
+        self.rules = VALIDATION_RULES if rules is None else rules
         self.issues_found = []
         self.corrections_made = []
         self.manual_review_needed = []
 
+    def validate_frame(self, df):
+        """
+        Run every rule over the whole DataFrame at once.
+
+        Returns: issues table with columns record_idx, rule, severity, suggested_fix,
+        ordered by record and then by rule (same order as record-by-record validation)
+        """
+        ctx = {'component_sum': component_sum(df), 'ic': decode_ics(df['ic_number'])}
+        frames = []
+
+        for order, rule in enumerate(self.rules):
+            mask = rule['mask'](df, ctx).fillna(False).to_numpy(dtype=bool)
+            if not mask.any():
+                continue
+
+            fix = rule['fix'](df, ctx)[mask].to_numpy() if callable(rule['fix']) else rule['fix']
+            frames.append(pd.DataFrame({
+                'position': np.flatnonzero(mask),
+                'rule_order': order,
+                'record_idx': df.index[mask],
+                'rule': rule['name'],
+                'severity': rule['severity'],
+                'suggested_fix': pd.Series(fix, index=range(int(mask.sum())), dtype=object)
+            }))
+
+        if not frames:
+            return pd.DataFrame(columns=['record_idx', 'rule', 'severity', 'suggested_fix'])
+
+        issues = pd.concat(frames, ignore_index=True)
+        issues = issues.sort_values(['position', 'rule_order'], kind='mergesort')
+        return issues.drop(columns=['position', 'rule_order']).reset_index(drop=True)
+
+    def issue_details(self, issue, record):
+        """Expand one row of the issues table into the issue dict used for cross-referencing."""
+        rule = next(r for r in self.rules if r['name'] == issue['rule'])
+        return {
+            'record_idx': issue['record_idx'],
+            'type': issue['rule'],
+            'severity': issue['severity'],
+            'description': rule['describe'](record),
+            'record': record,
+            'suggested_fix': issue['suggested_fix']
+        }
+
     def validate_record(self, record, record_idx):
         """
         Validate a single record and identify issues.
 
         Returns: List of issues found
         """
-        issues = []
-
-        # Rule 1: Zero payment with non-zero components
-        if record['total_payment'] == 0:
-            component_sum = (
-                record['total_wages'] +
-                record['total_ot'] +
-                record['total_allowance'] +
-                record['total_claim']
-            )
-            if component_sum > 0:
-                issues.append({
-                    'record_idx': record_idx,
-                    'type': 'ZERO_PAYMENT_WITH_COMPONENTS',
-                    'severity': 'HIGH',
-                    'description': f"total_payment=0 but components sum to {component_sum}",
-                    'record': record,
-                    'suggested_fix': component_sum
-                })
-
-        # Rule 2: Payment without days worked
-        if record['days_worked'] == 0 and record['total_payment'] > 0:
-            issues.append({
-                'record_idx': record_idx,
-                'type': 'PAYMENT_WITHOUT_DAYS',
-                'severity': 'MEDIUM',
-                'description': f"days_worked=0 but payment={record['total_payment']}",
-                'record': record,
-                'suggested_fix': 'Check original CSV for days data'
-            })
-
-        # Rule 3: Missing bank account when bank exists
-        if pd.notna(record['bank_name']) and pd.isna(record['account_number']):
-            if str(record['bank_name']).lower() not in ['sammy claim', 'claim']:
-                issues.append({
-                    'record_idx': record_idx,
-                    'type': 'MISSING_ACCOUNT',
-                    'severity': 'HIGH',
-                    'description': f"Has bank '{record['bank_name']}' but no account number",
-                    'record': record,
-                    'suggested_fix': 'Cross-reference with original CSV'
-                })
-
-        # Rule 4: Total payment less than component sum
-        component_sum = (
-            record['total_wages'] +
-            record['total_ot'] +
-            record['total_allowance'] +
-            record['total_claim']
-        )
-        if record['total_payment'] > 0 and component_sum > record['total_payment']:
-            issues.append({
-                'record_idx': record_idx,
-                'type': 'TOTAL_LESS_THAN_COMPONENTS',
-                'severity': 'MEDIUM',
-                'description': f"total_payment={record['total_payment']} < components={component_sum}",
-                'record': record,
-                'suggested_fix': component_sum
-            })
-
-        # Rule 5: Suspicious IC number
-        if record['ic_number']:
-            ic = str(record['ic_number'])
-            if len(ic) < 6 or not any(char.isdigit() for char in ic):
-                issues.append({
-                    'record_idx': record_idx,
-                    'type': 'INVALID_IC',
-                    'severity': 'HIGH',
-                    'description': f"IC number '{ic}' looks invalid",
-                    'record': record,
-                    'suggested_fix': 'Manual review required'
-                })
-
-        # Rule 6: All payment fields are zero
-        if (record['total_payment'] == 0 and
-            record['total_wages'] == 0 and
-            record['total_ot'] == 0 and
-            record['total_allowance'] == 0 and
-            record['total_claim'] == 0):
-            issues.append({
-                'record_idx': record_idx,
-                'type': 'ALL_PAYMENTS_ZERO',
-                'severity': 'HIGH',
-                'description': "All payment fields are 0",
-                'record': record,
-                'suggested_fix': 'Cross-reference with original CSV'
-            })
-
-        return issues
+        issues = self.validate_frame(pd.DataFrame([record], index=[record_idx]))
+        return [self.issue_details(issue, record) for issue in issues.to_dict('records')]
 
     def find_csv_source(self, record):
         """Find the original CSV file for a record."""
@@ -366,27 +446,25 @@ def validate_and_correct_master_file(input_file, output_file):
     print("PHASE 1: DETECTING ISSUES")
     print(f"{'─'*120}\n")
 
-    all_issues = []
-    for idx, row in df.iterrows():
-        issues = validator.validate_record(row, idx)
-        if issues:
-            all_issues.extend(issues)
+    start = time.perf_counter()
+    issues = validator.validate_frame(df)
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    validator.issues_found = issues
 
-    # Summarize issues
-    issue_types = defaultdict(int)
-    for issue in all_issues:
-        issue_types[issue['type']] += 1
-
-    print(f"✓ Validation complete!")
-    print(f"  Total issues found: {len(all_issues)}")
+    print(f"✓ Validation complete! ({len(validator.rules)} rules, {elapsed_ms:.1f} ms)")
+    print(f"  Total issues found: {len(issues)}")
     print(f"\n  Issue Breakdown:")
-    for issue_type, count in sorted(issue_types.items(), key=lambda x: -x[1]):
+    for issue_type, count in issues['rule'].value_counts().items():
         print(f"    - {issue_type:30} {count:>4}")
 
-    if len(all_issues) == 0:
+    if len(issues) == 0:
         print("\n🎉 No issues found! Data is perfect.")
         return
 
+    # Full issue dicts (with the record) are only built for the cross-reference phase
+    all_issues = [validator.issue_details(issue, df.loc[issue['record_idx']])
+                  for issue in issues.to_dict('records')]
+
     # Phase 2: Cross-reference and fix
     print(f"\n{'─'*120}")
     print("PHASE 2: CROSS-REFERENCING WITH ORIGINAL CSV FILES")
@@ -421,6 +499,9 @@ def validate_and_correct_master_file(input_file, output_file):
         # Save corrected data
         df.to_excel(writer, sheet_name='All Candidates (Corrected)', index=False)
 
+        # Save issues table (record_idx refers to the row in All Candidates)
+        validator.issues_found.to_excel(writer, sheet_name='Issues', index=False)
+
         # Save correction log
         if validator.corrections_made:
             corrections_df = pd.DataFrame(validator.corrections_made)
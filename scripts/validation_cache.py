@@ -0,0 +1,244 @@
+#!/usr/bin/env python3
+"""
+Validation Cache
+Persists validator results with record and source-sheet fingerprints so reruns only re-check what changed.
+"""
+
+import hashlib
+import json
+import math
+import os
+from pathlib import Path
+
+import openpyxl
+
+from source_manifest import locate_source
+
+
+DEFAULT_CACHE_DIR = '.validation_cache'
+CACHE_VERSION = 1
+
+# Store-assigned ids change on every re-extraction, the record itself may not
+UNFINGERPRINTED = {'record_id'}
+
+
+def _plain(value):
+    """JSON-safe scalar: numpy -> python, NaN/NaT -> None."""
+    if value is None:
+        return None
+    if hasattr(value, 'item') and not isinstance(value, (str, bytes)):
+        try:
+            value = value.item()
+        except (ValueError, AttributeError):
+            pass
+    if isinstance(value, float) and math.isnan(value):
+        return None
+    if value != value:  # NaT and friends
+        return None
+    if isinstance(value, (str, int, float, bool)):
+        return value
+    return str(value)
+
+
+def _to_json(value):
+    """Fallback for json.dump on numpy / pandas values inside results."""
+    return _plain(value)
+
+
+def record_fingerprint(record):
+    """Hash of every extracted field of a master-list record."""
+    items = sorted((str(k), _plain(v)) for k, v in dict(record).items() if k not in UNFINGERPRINTED)
+    return hashlib.sha1(json.dumps(items, default=str).encode('utf-8')).hexdigest()
+
+
+def code_fingerprint(path):
+    """Hash of a validator's source, so a changed validator invalidates its cache."""
+    with open(path, 'rb') as f:
+        return hashlib.sha1(f.read()).hexdigest()
+
+
+def record_keys(df):
+    """
+    Stable keys for master-list records: file|sheet|IC|occurrence.
+
+    Position in the master list changes when other months are re-extracted, so it is not used.
+    """
+    seen = {}
+    keys = []
+    for source_file, source_sheet, ic in zip(df['source_file'], df['source_sheet'], df['ic_number']):
+        base = f"{source_file}|{source_sheet}|{_plain(ic)}"
+        seen[base] = seen.get(base, 0) + 1
+        keys.append(f"{base}|{seen[base]}")
+    return keys
+
+
+class ValidationCache:
+    """Results of one validator, keyed by record, reused while record and sheet are unchanged."""
+
+    def __init__(self, name, source_dir, code_file, cache_dir=DEFAULT_CACHE_DIR, enabled=True):
+        self.name = name
+        self.source_dir = source_dir
+        self.path = Path(cache_dir) / f"{name}.json"
+        self.code_fp = code_fingerprint(code_file)
+        self.enabled = enabled
+        self.files = {}
+        self.results = {}
+        self.hits = 0
+        self.misses = 0
+        self._open_books = {}
+
+        if enabled and self.path.exists():
+            self.load()
+
+    def load(self):
+        """Read the cache; a different validator version starts from scratch."""
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+
+        if data.get('version') != CACHE_VERSION or data.get('code') != self.code_fp:
+            print(f"   ⟳ {self.name}: validator changed - full revalidation")
+            return
+
+        self.files = data.get('files', {})
+        self.results = data.get('results', {})
+
+    def save(self):
+        """Write the cache (results for records no longer in the master are dropped by prune())."""
+        for wb in self._open_books.values():
+            wb.close()
+        self._open_books = {}
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix('.tmp')
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump({
+                'version': CACHE_VERSION,
+                'validator': self.name,
+                'code': self.code_fp,
+                'files': self.files,
+                'results': self.results
+            }, f, default=_to_json)
+        os.replace(tmp, self.path)
+
+    def sheet_fingerprint(self, source_file, source_sheet):
+        """
+        Hash of a source sheet's cell values.
+
+        Sheet hashes are kept per file with the file's size and mtime, so an
+        untouched workbook is never reopened and a re-saved one only has its
+        sheets re-hashed - unchanged sheets keep their fingerprint.
+        """
+        excel_file = locate_source(self.source_dir, source_file)
+        if not excel_file.exists():
+            return 'missing'
+
+        stat = excel_file.stat()
+        file_key = str(excel_file)
+        file_stat = [stat.st_size, stat.st_mtime_ns]
+
+        entry = self.files.get(file_key)
+        if not entry or entry.get('stat') != file_stat:
+            entry = {'stat': file_stat, 'sheets': {}}
+            self.files[file_key] = entry
+
+        sheets = entry['sheets']
+        if source_sheet not in sheets:
+            sheets[source_sheet] = self._hash_sheet(excel_file, source_sheet)
+        return sheets[source_sheet]
+
+    def _hash_sheet(self, excel_file, source_sheet):
+        wb = self._open_books.get(str(excel_file))
+        if wb is None:
+            wb = openpyxl.load_workbook(excel_file, read_only=True, data_only=True)
+            self._open_books[str(excel_file)] = wb
+
+        if source_sheet not in wb.sheetnames:
+            return 'no-sheet'
+
+        digest = hashlib.sha1()
+        for row in wb[source_sheet].iter_rows(values_only=True):
+            digest.update(repr(row).encode('utf-8'))
+            digest.update(b'\n')
+        return digest.hexdigest()
+
+    def fingerprints(self, record):
+        """(record fingerprint, sheet fingerprint) for a record."""
+        return record_fingerprint(record), self.sheet_fingerprint(record['source_file'], record['source_sheet'])
+
+    def lookup(self, key, fingerprints):
+        """Cached result if the record and its sheet are unchanged, else None."""
+        if not self.enabled:
+            self.misses += 1
+            return None
+
+        cached = self.results.get(key)
+        if cached and cached['record'] == fingerprints[0] and cached['sheet'] == fingerprints[1]:
+            self.hits += 1
+            return cached['result']
+
+        self.misses += 1
+        return None
+
+    def store(self, key, fingerprints, result):
+        self.results[key] = {'record': fingerprints[0], 'sheet': fingerprints[1], 'result': result}
+
+    def prune(self, keys):
+        """Forget records that are no longer in the master list."""
+        keep = set(keys)
+        self.results = {k: v for k, v in self.results.items() if k in keep}
+
+    def summary(self):
+        total = self.hits + self.misses
+        return f"{self.hits:,}/{total:,} record(s) unchanged, {self.misses:,} to validate"
+
+
+def add_arguments(parser):
+    """Add the incremental-validation options to a validator's parser."""
+    parser.add_argument('--revalidate', action='store_true', help='Ignore cached results and validate every record')
+    parser.add_argument('--cache-dir', default=DEFAULT_CACHE_DIR, help=f"Validation cache directory (default: {DEFAULT_CACHE_DIR})")
+
+
+def run_incremental(cache, df, validate_fn, prune=True):
+    """
+    Validate only records whose fields or source sheet changed since the last run.
+
+    Args:
+        cache: ValidationCache, or None to validate everything
+        df: Master-list records
+        validate_fn: fn(sub_df) -> results in sub_df order
+        prune: Drop cached records missing from df (off for sample runs)
+
+    Returns: results for all of df, in df order
+    """
+    if cache is None:
+        return validate_fn(df)
+
+    keys = record_keys(df)
+    results = [None] * len(df)
+    stale = []
+    stale_fps = []
+
+    for pos, (key, record) in enumerate(zip(keys, df.to_dict('records'))):
+        fingerprints = cache.fingerprints(record)
+        result = cache.lookup(key, fingerprints)
+        if result is None:
+            stale.append(pos)
+            stale_fps.append(fingerprints)
+        else:
+            results[pos] = result
+
+    print(f"  ♻️  {cache.summary()}")
+
+    if stale:
+        for pos, fingerprints, result in zip(stale, stale_fps, validate_fn(df.iloc[stale])):
+            results[pos] = result
+            cache.store(keys[pos], fingerprints, result)
+
+    if prune:
+        cache.prune(keys)
+    cache.save()
+
+    return results
@@ -8,37 +8,22 @@ import pandas as pd
 import numpy as np
 from pathlib import Path
 
+from source_manifest import load_manifest, resolve_sources, source_file_index, locate_source
+from run_metrics import span, add_arguments, metrics_session
+import validation_cache
+from validation_cache import ValidationCache, run_incremental
+from payment_store import read_master, save_validation_results, store_source_index
 
-def create_visual_validation_report(masterlist_path, source_dir, sample_size=None):
-    """
-    Create a visual validation report showing extracted vs raw Excel data.
-    """
-    print("="*120)
-    print(" "*35 + "VISUAL VALIDATION REPORT GENERATOR")
-    print("="*120)
-
-    # Read masterlist
-    print(f"\n📂 Loading masterlist: {masterlist_path}")
-    df = pd.read_excel(masterlist_path, sheet_name='All Candidates', dtype={'account_number': str})
-
-    if sample_size:
-        df = df.head(sample_size)
-        print(f"   Processing SAMPLE: {len(df)} records")
-    else:
-        print(f"   Processing ALL: {len(df):,} records")
 
-    source_path = Path(source_dir)
+def extract_raw_rows(df, source_dir):
+    """Build one report row (extracted values next to the raw Excel rows) per record in df."""
     report_data = []
 
-    print(f"\n{'─'*120}")
-    print("EXTRACTING RAW EXCEL DATA...")
-    print(f"{'─'*120}\n")
-
     for idx, record in df.iterrows():
         if idx > 0 and idx % 100 == 0:
             print(f"  Progress: {idx}/{len(df)}...")
 
-        excel_file = source_path / record['source_file']
+        excel_file = locate_source(source_dir, record['source_file'])
 
         if not excel_file.exists():
             report_data.append({
@@ -57,7 +42,9 @@ def create_visual_validation_report(masterlist_path, source_dir, sample_size=Non
 
         try:
             # Read sheet
-            sheet_df = pd.read_excel(excel_file, sheet_name=record['source_sheet'], header=None)
+            with span('validate.read_sheet', sheet=record['source_sheet']) as s:
+                sheet_df = pd.read_excel(excel_file, sheet_name=record['source_sheet'], header=None)
+                s['rows'] = len(sheet_df)
 
             # Search for IC
             target_ic = str(record['ic_number']).replace('-', '').replace(' ', '')
@@ -116,6 +103,43 @@ def create_visual_validation_report(masterlist_path, source_dir, sample_size=Non
                 'Raw_Excel_Data': f"Error: {str(e)}"
             })
 
+    return report_data
+
+
+def create_visual_validation_report(masterlist_path, source_dir, sample_size=None, cache=None):
+    """
+    Create a visual validation report showing extracted vs raw Excel data.
+
+    cache: ValidationCache - raw rows are only re-read for records whose fields or source sheet changed
+    """
+    print("="*120)
+    print(" "*35 + "VISUAL VALIDATION REPORT GENERATOR")
+    print("="*120)
+
+    # Read masterlist
+    print(f"\n📂 Loading masterlist: {masterlist_path}")
+    df = read_master(masterlist_path)
+
+    if sample_size:
+        df = df.head(sample_size)
+        print(f"   Processing SAMPLE: {len(df)} records")
+    else:
+        print(f"   Processing ALL: {len(df):,} records")
+
+    print(f"\n{'─'*120}")
+    print("EXTRACTING RAW EXCEL DATA...")
+    print(f"{'─'*120}\n")
+
+    report_data = run_incremental(cache, df, lambda records: extract_raw_rows(records, source_dir),
+                                  prune=not sample_size)
+
+    # Cached rows carry the row number from the run that produced them
+    for idx, row in zip(df.index, report_data):
+        row['Row'] = idx + 1
+
+    # Master loaded from the payment store: keep the results with the records
+    save_validation_results(masterlist_path, 'visual_validator', df, report_data, status_key='Status')
+
     # Create report
     report_df = pd.DataFrame(report_data)
 
@@ -135,7 +159,8 @@ def create_visual_validation_report(masterlist_path, source_dir, sample_size=Non
     print(f"\n{'─'*120}")
     print(f"💾 Saving visual validation report: {output_file}")
 
-    with pd.ExcelWriter(output_file, engine='openpyxl') as writer:
+    with span('validate.write_report', file=output_file, rows=len(report_df)), \
+            pd.ExcelWriter(output_file, engine='openpyxl') as writer:
         # All records
         report_df.to_excel(writer, sheet_name='All Records', index=False)
 
@@ -170,8 +195,20 @@ def create_visual_validation_report(masterlist_path, source_dir, sample_size=Non
 
 
 if __name__ == '__main__':
-    masterlist_path = 'baito_2025_COMPLETE_v3.xlsx'
-    source_dir = '/Users/baito.kevin/Downloads/PROMOTER PAYMENT & CLAIMS 2025/Baito Promoter 2025/'
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Build a side-by-side report of extracted vs raw Excel data.')
+    parser.add_argument('masterlist', nargs='?', default='baito_2025_COMPLETE_v3.xlsx')
+    add_arguments(parser)
+    validation_cache.add_arguments(parser)
+    args = parser.parse_args()
+
+    masterlist_path = args.masterlist
+    # Source workbooks come from the store, or the manifest (payment_sources.json), looked up by file name
+    source_dir = store_source_index(masterlist_path) or source_file_index(resolve_sources(load_manifest()))
+    cache = ValidationCache('visual_validator', source_dir, __file__, cache_dir=args.cache_dir,
+                            enabled=not args.revalidate)
 
     # Generate report for ALL records
-    report = create_visual_validation_report(masterlist_path, source_dir)
+    with metrics_session(args.metrics, profile=args.profile):
+        report = create_visual_validation_report(masterlist_path, source_dir, cache=cache)
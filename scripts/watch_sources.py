@@ -0,0 +1,352 @@
+#!/usr/bin/env python3
+"""
+Watch Sources
+Watches the manifest's payment workbook folders and re-extracts, validates and re-exports a month as soon as its workbook is saved.
+"""
+
+import argparse
+import os
+import signal
+import sys
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+
+import pandas as pd
+
+import logic_validator
+import validation_cache
+from create_master_excel_v3_fixed import frame_records, process_excel_fixed, write_master
+from payment_store import DEFAULT_STORE, PaymentStore
+from process_full_year_2025 import convert_excel_to_csv, partition_folder
+from run_metrics import span, incr, add_arguments, metrics_session
+from source_manifest import DEFAULT_MANIFEST, load_manifest, parse_month, resolve_sources, source_file_index, partition_key
+from validation_cache import ValidationCache, run_incremental
+
+try:
+    from watchdog.events import FileSystemEventHandler
+    from watchdog.observers import Observer
+    HAS_WATCHDOG = True
+except ImportError:
+    HAS_WATCHDOG = False
+
+
+# A workbook is picked up once it has not been modified for this many seconds (Excel writes in several steps)
+DEFAULT_DEBOUNCE = 3.0
+DEFAULT_INTERVAL = 2.0
+
+
+def file_stat(path):
+    """(size, mtime_ns) of a file, None if it is gone."""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_size, stat.st_mtime_ns
+
+
+def source_label(source):
+    return f"{source['company']} {source['month']} {source['year']}"
+
+
+class SourceWatcher:
+    """Polls the manifest's workbooks and reports each new or changed one once it has settled."""
+
+    def __init__(self, manifest_path, company=None, year=None, debounce=DEFAULT_DEBOUNCE, known=None):
+        """
+        Args:
+            manifest_path: Source manifest JSON
+            company, year: Only watch these sources
+            debounce: Seconds a workbook must be left alone before it is reported
+            known: {file name: (size, mtime_ns)} already processed, e.g. PaymentStore.source_stats()
+        """
+        self.manifest_path = str(manifest_path)
+        self.company = company
+        self.year = year
+        self.debounce = debounce
+        self.known = dict(known or {})
+        self.sources = []
+        self.folders = set()
+        self.next_due = None
+        self._stamps = None
+
+    def _folder_stamps(self):
+        return {path: file_stat(path) for path in [self.manifest_path, *sorted(self.folders)]}
+
+    def refresh(self):
+        """
+        Re-resolve the manifest when it or a watched folder changed.
+
+        Adding, removing or renaming a workbook changes its folder's mtime, so
+        discover rules are only re-globbed when something actually happened.
+        """
+        if self._stamps is not None and self._folder_stamps() == self._stamps:
+            return False
+
+        try:
+            manifest = load_manifest(self.manifest_path)
+        except (OSError, ValueError) as e:
+            print(f"   ⚠️  Cannot read {self.manifest_path}: {e}")
+            manifest = None
+
+        if manifest is not None:
+            self.sources = resolve_sources(manifest, company=self.company, year=self.year, existing_only=False)
+            self.folders = ({os.path.normpath(os.path.expanduser(rule['dir'])) for rule in manifest.get('discover', [])} |
+                            {os.path.normpath(os.path.dirname(s['path'])) for s in self.sources})
+        self._stamps = self._folder_stamps()
+        return True
+
+    def poll(self, now=None):
+        """
+        Sources whose workbook is new or changed and has not been modified for `debounce` seconds.
+
+        Each returned source carries the 'stat' it was reported with. A workbook
+        still being written sets next_due to when it will have settled.
+        """
+        self.refresh()
+        now = time.time() if now is None else now
+        self.next_due = None
+
+        ready = []
+        for source in self.sources:
+            name = Path(source['path']).name
+            stat = file_stat(source['path'])
+            if stat is None or stat == self.known.get(name):
+                continue
+
+            due = stat[1] / 1e9 + self.debounce
+            if now < due:
+                self.next_due = due if self.next_due is None else min(self.next_due, due)
+                continue
+
+            self.known[name] = stat
+            ready.append(dict(source, stat=stat))
+        return ready
+
+    def forget(self, file_name):
+        """Report this workbook again on the next poll."""
+        self.known.pop(file_name, None)
+
+
+def start_observer(folders, wake):
+    """File-system notifications (inotify/FSEvents via watchdog) set `wake`; None when watchdog is not installed."""
+    if not HAS_WATCHDOG:
+        return None
+
+    class WakeHandler(FileSystemEventHandler):
+        def on_any_event(self, event):
+            wake.set()
+
+    observer = Observer()
+    for folder in folders:
+        if os.path.isdir(folder):
+            observer.schedule(WakeHandler(), folder, recursive=False)
+    observer.start()
+    return observer
+
+
+def init_worker():
+    """Workers leave Ctrl+C and SIGTERM to the watcher, which cancels their work."""
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+
+
+def extract_source(source, csv=False):
+    """Worker: CSV conversion (optional), then the v3 extraction of one workbook."""
+    if csv:
+        output_folder = partition_folder(source)
+        output_folder.mkdir(parents=True, exist_ok=True)
+        convert_excel_to_csv(source_label(source), source['path'], str(output_folder))
+    # A workbook that cannot be read must not replace its stored records with nothing
+    return process_excel_fixed(source['path'], source['month'], raise_errors=True)
+
+
+def validate_file(store, cache, source_index, file_name, workers=None):
+    """
+    Logic-validate one workbook's stored records and save the results with them.
+
+    Returns: {status: count}
+    """
+    df = store.read_master(source_file=file_name)
+    if df.empty:
+        return {}
+
+    # Hit/miss counts are per workbook here, not per daemon lifetime
+    cache.hits = cache.misses = 0
+    with span('watch.validate', file=file_name, rows=len(df)):
+        results = run_incremental(cache, df, lambda records: logic_validator.run_sheet_groups(
+            records, source_index, workers=workers), prune=False)
+    store.save_validation('logic_validator', df['record_id'].tolist(), results)
+    return pd.Series([r['status'] for r in results]).value_counts().to_dict()
+
+
+def export_partition(store, company, year, output_dir):
+    """Rewrite one company/year master from the store and print its monthly totals."""
+    df = store.read_master(company=company, year=year)
+    if df.empty:
+        print(f"\n⊘ {company} {year}: no records stored")
+        return
+
+    output_file = Path(output_dir) / f"{company.lower()}_{year}_FIXED_v3.2.xlsx"
+    with span('watch.export', file=str(output_file), rows=len(df)):
+        write_master(df, str(output_file))
+
+    summary = store.rollup(['month'], company=company, year=year).fillna(0)
+    # Calendar order; months the name cannot be read from go last
+    summary = summary.sort_values('month', key=lambda months: months.map(lambda m: parse_month(m)[0] or 13),
+                                  kind='stable')
+    print(f"\n📊 {company} {year}:")
+    for row in summary.itertuples():
+        print(f"   {row.month:20} {row.records:>7,} record(s)  {row.days_worked:>9,.1f} day(s)  "
+              f"RM {row.total_payment:>14,.2f}")
+    print(f"   {'Total':20} {summary['records'].sum():>7,} record(s)  {summary['days_worked'].sum():>9,.1f} day(s)  "
+          f"RM {summary['total_payment'].sum():>14,.2f}")
+
+
+def main():
+    """Main CLI entry point."""
+    parser = argparse.ArgumentParser(description='Watch the source workbooks and keep the store, validation and masters current.')
+    parser.add_argument('--manifest', default=str(DEFAULT_MANIFEST), help='Source manifest JSON (default: payment_sources.json)')
+    parser.add_argument('--company', help='Only watch this company (e.g. Baito, Zenevento)')
+    parser.add_argument('--year', type=int, help='Only watch this year')
+    parser.add_argument('--store', default=DEFAULT_STORE, help=f"SQLite payment store (default: {DEFAULT_STORE})")
+    parser.add_argument('--output-dir', default='.', help='Folder for the <company>_<year>_FIXED_v3.2.xlsx masters')
+    parser.add_argument('--workers', type=int, default=None, help='Worker processes (default: one per core)')
+    parser.add_argument('--interval', type=float, default=DEFAULT_INTERVAL,
+                        help=f"Seconds between polls (default: {DEFAULT_INTERVAL})")
+    parser.add_argument('--debounce', type=float, default=DEFAULT_DEBOUNCE,
+                        help=f"Seconds a workbook must be unchanged before it is processed (default: {DEFAULT_DEBOUNCE})")
+    parser.add_argument('--csv', action='store_true', help='Also convert each changed workbook to CSV (excel_imports/)')
+    parser.add_argument('--no-validate', action='store_true', help='Skip logic validation')
+    parser.add_argument('--once', action='store_true', help='Process new and changed workbooks, then exit')
+    add_arguments(parser)
+    validation_cache.add_arguments(parser)
+    args = parser.parse_args()
+
+    with metrics_session(args.metrics, profile=args.profile):
+        return run(args)
+
+
+def run(args):
+    """Poll the sources and run extraction -> store -> validation -> master export for each changed workbook."""
+    print("="*120)
+    print(" "*50 + "WATCH SOURCES")
+    print("="*120)
+
+    if not Path(args.manifest).exists():
+        print(f"❌ Error: {args.manifest} not found!")
+        return 1
+
+    store = PaymentStore(args.store)
+    # Workbooks unchanged since their last extraction are not redone on start-up
+    watcher = SourceWatcher(args.manifest, company=args.company, year=args.year, debounce=args.debounce,
+                            known=store.source_stats())
+    watcher.refresh()
+
+    # Shared with the cache, updated in place when the manifest changes
+    source_index = {}
+    cache = ValidationCache('logic_validator', source_index, logic_validator.__file__, cache_dir=args.cache_dir,
+                            enabled=not args.revalidate)
+
+    wake = threading.Event()
+    observer = start_observer(watcher.folders, wake)
+    pool = ProcessPoolExecutor(max_workers=args.workers, initializer=init_worker)
+
+    print(f"\n👀 Watching {len(watcher.sources)} workbook(s) in {len(watcher.folders)} folder(s) "
+          f"({'file-system events' if observer else f'polling every {args.interval:g}s'}, debounce {args.debounce:g}s)")
+    print(f"   Store: {args.store}")
+    if not args.once:
+        print("   Press Ctrl+C to stop")
+
+    # file name -> latest settled source, waiting for a free slot (a newer save replaces an older one)
+    queued = {}
+    running = {}
+    dirty = set()
+
+    def stop(signum, frame):
+        raise KeyboardInterrupt
+
+    # Stopped by a service manager the same way as by Ctrl+C
+    signal.signal(signal.SIGTERM, stop)
+
+    try:
+        while True:
+            for source in watcher.poll():
+                incr('watch_changes')
+                queued[Path(source['path']).name] = source
+            source_index.update(source_file_index(watcher.sources))
+
+            # One extraction per workbook at a time; the pool queues the rest
+            busy = {Path(s['path']).name for s in running.values()}
+            for name in [name for name in queued if name not in busy]:
+                source = queued.pop(name)
+                print(f"\n🔄 {source_label(source)}: {name}")
+                running[pool.submit(extract_source, source, args.csv)] = source
+
+            if running:
+                done, _ = wait(running, timeout=args.interval, return_when=FIRST_COMPLETED)
+            else:
+                done = set()
+                if args.once and watcher.next_due is None:
+                    break
+                timeout = args.interval if watcher.next_due is None else max(0.1, watcher.next_due - time.time())
+                wake.wait(min(args.interval, timeout))
+                wake.clear()
+
+            for future in done:
+                source = running.pop(future)
+                name = Path(source['path']).name
+                try:
+                    df = future.result()
+                except BrokenProcessPool:
+                    print(f"   ✗ {name}: worker process died - restarting the pool")
+                    pool.shutdown(wait=False, cancel_futures=True)
+                    pool = ProcessPoolExecutor(max_workers=args.workers, initializer=init_worker)
+                    for lost in running.values():
+                        watcher.forget(Path(lost['path']).name)
+                    running.clear()
+                    watcher.forget(name)
+                    continue
+                except Exception as e:
+                    # Stored records and the master stay as they were; the next save retries it
+                    incr('watch_failures')
+                    print(f"   ✗ {name}: {e} - keeping its stored records, will retry when it changes")
+                    continue
+
+                # Saved again while it was being read: the next poll picks up the newer version
+                if file_stat(source['path']) != source['stat']:
+                    print(f"   ↻ {name} changed during extraction - waiting for it to settle")
+                    continue
+
+                with span('watch.store', file=name) as s:
+                    s['rows'] = store.save_extraction(source, frame_records(df))
+                print(f"   📦 Stored {s['rows']:,} record(s)")
+
+                if not args.no_validate:
+                    counts = validate_file(store, cache, source_index, name, workers=args.workers)
+                    print("   ✓ Validated: " + ', '.join(f"{status} {n:,}" for status, n in sorted(counts.items())))
+                dirty.add(partition_key(source))
+
+            # Masters are rewritten once the burst of saves has been processed
+            if dirty and not running and not queued:
+                for company, year in sorted(dirty):
+                    export_partition(store, company, year, args.output_dir)
+                dirty.clear()
+                print(f"\n👀 Up to date ({time.strftime('%H:%M:%S')}) - watching for changes")
+
+    except KeyboardInterrupt:
+        print("\n⏹  Stopped")
+    finally:
+        pool.shutdown(cancel_futures=True)
+        if observer:
+            observer.stop()
+            observer.join()
+        store.close()
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Workbook Reader
+Reads raw cell text straight from the xlsx so account and IC numbers never pass through float.
+"""
+
+import re
+
+
+# Number formats like '000000000000' pad the stored integer with leading zeros on display
+ZERO_PAD_FORMAT = re.compile(r'^0+$')
+
+
+def cell_text(value, number_format=None):
+    """
+    Render a cell value as text without going through float.
+
+    Text cells (shared or inline strings) are returned exactly as stored.
+    Numeric cells are rendered from the stored number itself, so a 16-digit
+    account keeps every digit, and a zero-padded number format restores the
+    leading zeros Excel only shows on screen.
+    """
+    if value is None:
+        return None
+
+    if isinstance(value, str):
+        text = value.strip()
+        return text if text else None
+
+    if isinstance(value, bool):
+        return str(value)
+
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+
+    if isinstance(value, int):
+        text = str(value)
+        if number_format and ZERO_PAD_FORMAT.match(number_format):
+            text = text.zfill(len(number_format))
+        return text
+
+    return str(value)
+
+
+def clean_account(account):
+    """
+    Account number as digits only, from the raw cell text cell_text() returns.
+
+    Only separators (spaces, hyphens, dots) are stripped - the digits are never
+    re-derived from a float. None unless what is left is all digits.
+    """
+    if account is None or (isinstance(account, float) and account != account):
+        return None
+
+    account_str = str(account).strip().replace(' ', '').replace('-', '').replace('.', '')
+    return account_str if account_str and account_str.isdigit() else None
+
+
+def read_text_grid(worksheet):
+    """
+    Read every cell of a worksheet as lossless text.
+
+    Rows and columns line up with pd.read_excel(header=None) on the same
+    sheet, so grid[r][c] is the raw text behind df.iloc[r, c].
+    """
+    # Same as pandas: stored dimensions are often wrong in read-only mode
+    if hasattr(worksheet, 'reset_dimensions'):
+        worksheet.reset_dimensions()
+
+    grid = []
+    for row in worksheet.iter_rows():
+        grid.append([cell_text(cell.value, getattr(cell, 'number_format', None)) for cell in row])
+    return grid
+
+
+def grid_value(grid, row_idx, col_idx):
+    """Get raw text at (row, col), None when outside the grid."""
+    if row_idx < 0 or row_idx >= len(grid):
+        return None
+    row = grid[row_idx]
+    return row[col_idx] if col_idx < len(row) else None
+
+
+def overlay_text_columns(section_df, grid, first_row, columns):
+    """
+    Replace section columns with their raw text from the grid.
+
+    Args:
+        section_df: Section read with pd.read_excel(skiprows=header_row_idx)
+        grid: Output of read_text_grid() for the same sheet
+        first_row: Sheet row (0-based) of the section's first data row
+        columns: Column names to replace (None entries are ignored)
+    """
+    for col in columns:
+        if not col or col not in section_df.columns:
+            continue
+
+        pos = section_df.columns.get_loc(col)
+        if not isinstance(pos, int):
+            continue  # Duplicate header names - leave as read by pandas
+
+        section_df[col] = [grid_value(grid, first_row + i, pos) for i in range(len(section_df))]
+
+    return section_df